@@ -6,94 +6,163 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 
+# Names of the resources, by their ResourceType value
+RESOURCE_NAMES = {
+    0 : "coal",
+    1 : "oil",
+    2 : "trash",
+    3 : "uranium"
+}
+
+# Percentiles reported for every round
+DEFAULT_PERCENTILES = (5, 50, 95)
+
 def parse_results_files(results_dir):
 
     ResultsList = []
-    for file in os.listdir(results_dir):
+    for file in sorted(os.listdir(results_dir)):
+
+        path = os.path.join(results_dir, file)
+
+        if file.endswith("_usage.npy"):
+            ResultsList.append(load_result_arrays(path))
+
+        elif file.endswith("_usage.ndjson"):
+            ResultsList.append(parse_ndjson_file(path))
 
-        with open(os.path.join(results_dir, file), 'r') as f:
-            json_results = json.loads(f.read())
-            ResultsList.append(json_results)
+        elif file.endswith("_usage.json"):
+            with open(path, 'r') as f:
+                json_results = json.loads(f.read())
+                ResultsList.append(json_results)
 
     return ResultsList
 
 
-def parse_result(report):
+def load_result_arrays(usage_file):
+    """
+    Memory-map the binary results of one player count
+    :param usage_file: Path to the {n}_player_usage.npy file
+    :return: Dictionary with "Players", "Seed", "Resources", "Usage"
+        (simulations x rounds x resources) and "Rounds" (rounds per game)
+    """
+
+    prefix = usage_file[:-len("_usage.npy")]
+
+    with open(prefix + "_meta.json", 'r') as f:
+        report = json.loads(f.read())
+
+    report["Usage"] = np.load(usage_file, mmap_mode='r')
+    report["Rounds"] = np.load(prefix + "_rounds.npy", mmap_mode='r')
+
+    return report
 
 
-    num_players = report["Players"]
-    results = report["Results"]
+def parse_ndjson_file(path):
+    """
+    Read a streamed result file into the same structure as a JSON report
+    :param path: Path to the .ndjson file
+    :return: Dictionary with "Players", "Seed" and "Results"
+    """
 
-    # What we should do is create a 2d array
-    # rows are simulations
-    # columns are rounds
-    # fill it out as best as possible, then go through and extend the ones
-    # that don't fit to the end
-    # Goal is to create 5 element dictionary:
-    #
-    # rounds : [0:num_rounds]
-    # coal: []
-    # ...
-    #
-    #
+    report = {"Results": {}}
+    with open(path, 'r') as f:
+        for line in f:
 
-    # Determine max number of rounds from all simulations
-    num_sims = len(results)
-    max_rounds = max([len(v) for (k, v) in results.items()])
+            # A killed run can leave a half written last line
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
 
-    results_array = np.empty((num_sims, max_rounds), dtype=dict)
+            report["Players"] = record["Players"]
+            report["Seed"] = record["Seed"]
+            report["Results"][str(record["Simulation"])] = record["Results"]
 
-    # Extend all simulations to match the maximum number of rounds if less
-    for i, (sim_num, replicate) in enumerate(results.items()):
+    return report
 
-        last_item = None
-        for j, (round, usage) in enumerate(replicate.items()):
 
-            results_array[i][j] = replicate[round]
-            last_item = replicate[round]
+def results_to_arrays(results):
+    """
+    Turn the per-round results of a JSON report into a dense array. Games
+    that end early are padded with their last round.
+    :param results: The "Results" of a report, {sim: {round: {resource: amount}}}
+    :return: Tuple of (usage, rounds). usage is (simulations x rounds x resources)
+        in RESOURCE_NAMES order, rounds is the number of rounds of each game
+    """
 
-        # Extend to fill out array
-        for j in range(max_rounds - len(replicate)):
-            results_array[i][j + len(replicate)] = last_item
+    resources = [str(resource) for resource in sorted(RESOURCE_NAMES)]
+    games = [[replicate[round] for round in sorted(replicate, key=int)]
+             for replicate in results.values()]
 
-    # Iterate over all the rounds.
-    plot_data = {
-        "rounds" : [],
-        "coal" : [],
-        "coal_error" : [],
-        "oil" : [],
-        "oil_error" : [],
-        "trash" : [],
-        "trash_error" : [],
-        "uranium" : [],
-        "uranium_error": []
-    }
-    for i in range(max_rounds):
+    rounds = np.array([len(game) for game in games], dtype=np.intp)
+    num_sims = len(games)
+    max_rounds = int(rounds.max()) if num_sims else 0
 
-        round_data = results_array[:, i]
-        round_data = [x for x in round_data]
+    # All rounds of all games back to back, in one flat (total rounds x resources) array
+    flat = np.fromiter(
+        (usage[resource] for game in games for usage in game for resource in resources),
+        dtype=np.int64, count=int(rounds.sum()) * len(resources)
+    ).reshape(-1, len(resources))
 
+    # Index of every (game, round) cell in flat. Rounds past the end of a game
+    # point at its last round, which forward-fills the padding.
+    offsets = np.cumsum(rounds) - rounds
+    last = np.maximum(rounds - 1, 0)
+    index = offsets[:, np.newaxis] + np.minimum(np.arange(max_rounds), last[:, np.newaxis])
 
-        coal    = [x["0"] for x in round_data]
-        oil     = [x["1"] for x in round_data]
-        trash   = [x["2"] for x in round_data]
-        uranium = [x["3"] for x in round_data]
+    return flat[index], rounds
 
-        plot_data["rounds"].append(i)
 
-        plot_data["coal"].append(np.mean(coal))
-        plot_data["coal_error"].append(np.std(coal))
+def usage_statistics(usage, resources, percentiles=DEFAULT_PERCENTILES):
+    """
+    Compute the per-round statistics of every resource over all simulations
+    :param usage: Array of (simulations x rounds x resources)
+    :param resources: ResourceType value of each entry of the resource axis
+    :param percentiles: Percentiles to report for every round
+    :return: plot_data dictionary with "rounds", "<name>" (mean), "<name>_error"
+        (standard deviation) and "<name>_p<q>" for each percentile q
+    """
 
-        plot_data["oil"].append(np.mean(oil))
-        plot_data["oil_error"].append(np.std(oil))
+    mean = usage.mean(axis=0)
+    error = usage.std(axis=0)
+    bands = np.percentile(usage, percentiles, axis=0)
+
+    plot_data = {"rounds" : list(range(usage.shape[1]))}
+    for i, resource in enumerate(resources):
+
+        name = RESOURCE_NAMES[resource]
+        plot_data[name] = mean[:, i].tolist()
+        plot_data[name + "_error"] = error[:, i].tolist()
+
+        for j, q in enumerate(percentiles):
+            plot_data["{0:s}_p{1:d}".format(name, q)] = bands[j, :, i].tolist()
+
+    return plot_data
+
+
+def parse_result_arrays(report):
+    """
+    Compute the statistics of binary results without parsing anything
+    :param report: A report from load_result_arrays
+    :return: Tuple of (num_players, plot_data)
+    """
+
+    return (report["Players"], usage_statistics(report["Usage"], report["Resources"]))
+
+
+def parse_result(report):
+    """
+    Compute the per-round statistics of a report
+    :param report: A report from parse_results_files
+    :return: Tuple of (num_players, plot_data)
+    """
 
-        plot_data["trash"].append(np.mean(trash))
-        plot_data["trash_error"].append(np.std(trash))
+    if "Usage" in report:
+        return parse_result_arrays(report)
 
-        plot_data["uranium"].append(np.mean(uranium))
-        plot_data["uranium_error"].append(np.std(uranium))
+    usage, _ = results_to_arrays(report["Results"])
 
-    return (num_players, plot_data)
+    return (report["Players"], usage_statistics(usage, sorted(RESOURCE_NAMES)))
 
 
 
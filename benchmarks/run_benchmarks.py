@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from powergrid import GameConfig, ResourcePool, ResourceType, PlantMarket, PlantDeck, PlayerBoard
+from powergrid.powergrid_utils import spawn_rng
+from simulation import NaiveResourceAnalysisSim
+
+"""
+    Micro and macro benchmarks of the core engine.
+
+    Every benchmark is a setup function returning (run, ops): run() does ops
+    operations and is timed as a whole. Benchmarks are seeded, so every run
+    does exactly the same work. Results can be written as JSON and compared
+    against a stored baseline to flag regressions.
+
+    python -m benchmarks.run_benchmarks -o current.json
+    python -m benchmarks.run_benchmarks -b baseline.json
+"""
+
+DEFAULT_CONFIG = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "powergrid", "settings", "powergrid_config.json")
+
+DEFAULT_SEED = 1234
+DEFAULT_WARMUP = 2
+DEFAULT_REPEAT = 7
+
+# A benchmark is flagged when its best time is this much slower than the
+# baseline. The minimum is the timing least affected by other load.
+DEFAULT_TOLERANCE = 0.20
+
+# Number of games per macro benchmark
+MACRO_GAMES = 20
+
+
+def bench_pool_calculate_cost(config, seed):
+
+    pool = ResourcePool(ResourceType.COAL, 24, 18)
+    rng = random.Random(seed)
+    amounts = [rng.randrange(0, 20) for _ in range(20000)]
+
+    def run():
+        for amount in amounts:
+            pool.calculate_cost(amount)
+
+    return run, len(amounts)
+
+
+def bench_pool_buy_replenish(config, seed):
+
+    pool = ResourcePool(ResourceType.OIL, 24, 18)
+    rng = random.Random(seed)
+    amounts = [rng.randrange(1, 5) for _ in range(10000)]
+
+    def run():
+        for amount in amounts:
+            pool.buy(amount)
+            pool.replenish(amount)
+
+    return run, 2 * len(amounts)
+
+
+def bench_plant_market_churn(config, seed):
+
+    rng = random.Random(seed)
+    market = PlantMarket()
+    for plant in config.plants[:8]:
+        market.add_plant_to_market(plant)
+
+    # Replace the highest plant with a random one from outside the market
+    spare = list(config.plants[8:])
+    draws = [rng.randrange(len(spare)) for _ in range(5000)]
+
+    def run():
+        for i in draws:
+            removed = market.remove_highest()
+            market.add_plant_to_market(spare[i])
+            spare[i] = removed
+            market.layout()
+
+    return run, len(draws)
+
+
+def bench_plant_deck_draw(config, seed):
+
+    deck = PlantDeck(config, random.Random(seed))
+
+    def run():
+        for _ in range(200):
+            deck.reset()
+            deck.setup_deck()
+            while deck.draw() is not None:
+                pass
+
+    return run, 200 * (len(deck.deck) + 1)
+
+
+def bench_player_board_power(config, seed):
+
+    board = PlayerBoard(4)
+    plants = [plant for plant in config.plants if plant.get_resource_type() != ResourceType.HYBRID]
+    for plant in random.Random(seed).sample(plants, 4):
+        board.add_plant(plant)
+
+    def run():
+        for _ in range(2000):
+            for plant in board.get_plants():
+
+                resource = plant.get_resource_type()
+                if resource == ResourceType.RENEWABLE:
+                    continue
+
+                board.add_resources_to_plant(plant, resource, plant.get_required_fuel())
+                board.add_resource_usage_to_plan(plant, resource, plant.get_required_fuel())
+
+            board.power_plants()
+
+    return run, 2000
+
+
+def bench_simulator_snapshot(config, seed):
+
+    # A 6 player game a few rounds in, the largest state there is
+    sim = NaiveResourceAnalysisSim(6, config, spawn_rng(seed, 6, 0))
+    for round in range(3):
+        sim.phase_1(round == 0)
+        sim.phase_2()
+        sim.phase_3()
+        sim.phase_4()
+        sim.phase_5()
+
+    def run():
+        for _ in range(2000):
+            sim.restore(sim.snapshot())
+
+    return run, 2000
+
+
+def make_macro_benchmark(num_players):
+
+    def bench_simulate(config, seed):
+
+        def run():
+            for i in range(MACRO_GAMES):
+                sim = NaiveResourceAnalysisSim(num_players, config, spawn_rng(seed, num_players, i))
+                sim.simulate()
+
+        return run, MACRO_GAMES
+
+    return bench_simulate
+
+
+MICRO_BENCHMARKS = [
+    ("micro.ResourcePool.calculate_cost", bench_pool_calculate_cost),
+    ("micro.ResourcePool.buy_replenish", bench_pool_buy_replenish),
+    ("micro.PlantMarket.churn_layout", bench_plant_market_churn),
+    ("micro.PlantDeck.draw", bench_plant_deck_draw),
+    ("micro.PlayerBoard.power_plants", bench_player_board_power),
+    ("micro.Simulator.snapshot_restore", bench_simulator_snapshot)
+]
+
+MACRO_BENCHMARKS = [
+    ("macro.simulate.{0:d}_players".format(n), make_macro_benchmark(n)) for n in range(2, 7)
+]
+
+
+def run_benchmark(setup, config, seed, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT):
+    """
+    Time one benchmark
+    :param setup: The setup function of the benchmark
+    :param config: The GameConfig to use
+    :param seed: Seed of the benchmark's random choices
+    :param warmup: Untimed runs before measuring
+    :param repeat: Timed runs
+    :return: Dictionary of timings in microseconds per operation
+    """
+
+    run, ops = setup(config, seed)
+
+    for _ in range(warmup):
+        run()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1e6 / ops)
+
+    times.sort()
+
+    return {
+        "ops": ops,
+        "repeat": repeat,
+        "min_us": times[0],
+        "median_us": times[len(times) // 2],
+        "max_us": times[-1]
+    }
+
+
+def run_benchmarks(config, seed=DEFAULT_SEED, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT,
+                   pattern=None):
+    """
+    Run the whole suite
+    :param config: The GameConfig to use
+    :param seed: Seed of every benchmark
+    :param warmup: Untimed runs before measuring
+    :param repeat: Timed runs
+    :param pattern: Only run benchmarks whose name contains this
+    :return: Report dictionary with the environment and the timings
+    """
+
+    results = {}
+    for name, setup in MICRO_BENCHMARKS + MACRO_BENCHMARKS:
+
+        if pattern is not None and pattern not in name:
+            continue
+
+        results[name] = run_benchmark(setup, config, seed, warmup, repeat)
+
+    return {
+        "Python": platform.python_version(),
+        "Platform": platform.platform(),
+        "Seed": seed,
+        "Benchmarks": results
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare the best times of a report with a baseline report
+    :param report: Report from run_benchmarks
+    :param baseline: Report from an earlier run
+    :param tolerance: Allowed slowdown, as a fraction of the baseline
+    :return: List of (name, baseline min, min, ratio, regressed) for every
+        benchmark in both reports
+    """
+
+    rows = []
+    for name, timing in sorted(report["Benchmarks"].items()):
+
+        base = baseline["Benchmarks"].get(name)
+        if base is None:
+            continue
+
+        ratio = timing["min_us"] / base["min_us"] if base["min_us"] > 0 else 1.0
+        rows.append((name, base["min_us"], timing["min_us"], ratio, ratio > 1.0 + tolerance))
+
+    return rows
+
+
+def format_report(report):
+
+    lines = ["{0:<40s} {1:>12s} {2:>12s}".format("Benchmark", "Median (us)", "Min (us)")]
+    for name, timing in sorted(report["Benchmarks"].items()):
+        lines.append("{0:<40s} {1:>12.2f} {2:>12.2f}".format(name, timing["median_us"], timing["min_us"]))
+
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+
+    lines = ["{0:<40s} {1:>12s} {2:>12s} {3:>8s}".format("Benchmark", "Base (us)", "Now (us)", "Ratio")]
+    for name, base, now, ratio, regressed in rows:
+        lines.append("{0:<40s} {1:>12.2f} {2:>12.2f} {3:>8.2f}{4:s}".format(
+            name, base, now, ratio, "  REGRESSION" if regressed else ""))
+
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark the core engine", add_help=True)
+    parser.add_argument('-c', dest='config_file', type=str, default=DEFAULT_CONFIG,
+                        help="Path to the config file")
+    parser.add_argument('-o', dest='output', type=str, default=None,
+                        help="Write the results as JSON to this file")
+    parser.add_argument('-b', dest='baseline', type=str, default=None,
+                        help="Compare against the results in this JSON file")
+    parser.add_argument('-k', dest='pattern', type=str, default=None,
+                        help="Only run benchmarks whose name contains this")
+    parser.add_argument('--seed', dest='seed', type=int, default=DEFAULT_SEED,
+                        help="Seed of the benchmarks")
+    parser.add_argument('--warmup', dest='warmup', type=int, default=DEFAULT_WARMUP,
+                        help="Untimed runs before measuring")
+    parser.add_argument('--repeat', dest='repeat', type=int, default=DEFAULT_REPEAT,
+                        help="Timed runs per benchmark")
+    parser.add_argument('--tolerance', dest='tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown against the baseline, e.g. 0.1 for 10%%")
+
+    args = parser.parse_args()
+
+    config = GameConfig(args.config_file)
+    report = run_benchmarks(config, args.seed, args.warmup, max(1, args.repeat), args.pattern)
+
+    print(format_report(report))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline is not None:
+
+        with open(args.baseline, 'r') as f:
+            baseline = json.loads(f.read())
+
+        rows = compare(report, baseline, args.tolerance)
+
+        print("")
+        print(format_comparison(rows))
+
+        if any(row[-1] for row in rows):
+            sys.exit(1)
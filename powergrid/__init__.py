@@ -1,4 +1,5 @@
 from powergrid.resourcetype import ResourceType
+from powergrid.resourcevector import ResourceVector, MARKET_RESOURCES
 from powergrid.powergrid_constants import GameStep
 from powergrid.powergrid_constants import MARKET_ACT_SIZE, MARKET_S3_ACT_SIZE, MARKET_FUT_SIZE
 from powergrid.resourcepool import ResourcePool
@@ -8,4 +9,5 @@ from powergrid.powerplant_deck import PlantDeck
 from powergrid.plant_market import PlantMarket
 import powergrid.powergrid_utils
 from powergrid.player_board import PlayerBoard
+from powergrid.game_config import GameConfig
 from powergrid.powergrid_settings import PowerGridSettings
\ No newline at end of file
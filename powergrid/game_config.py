@@ -0,0 +1,206 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from powergrid import powergrid_utils, ResourceType, GameStep, Plant
+
+"""
+Game Config
+    a: Plant cards
+    a: Resource tracks
+    a: Per player count settings
+    a: Payout table
+    a: Player profiles
+
+    m: Get the settings for a number of players
+    m: Copy with other settings for a number of players
+"""
+
+# Value of the step 3 card. It sorts after every real plant.
+STEP3_VALUE = 100
+
+# Size, initial fill and price schedule of a resource track. prices is None
+# if the settings don't define one.
+ResourceSpec = namedtuple("ResourceSpec", ["type", "total", "initial", "prices"])
+
+# Settings for one number of players. replenish is a tuple of
+# (GameStep, ((ResourceType, rate), ...)) pairs.
+PlayerSettings = namedtuple("PlayerSettings", [
+    "regions", "discard", "max_plants", "step2_trigger", "end_condition", "replenish"])
+
+# Order of the resource tracks in the market
+RESOURCE_TRACKS = (ResourceType.COAL, ResourceType.OIL, ResourceType.TRASH, ResourceType.URANIUM)
+
+STEPS = {
+    "1" : GameStep.STEP1,
+    "2" : GameStep.STEP2,
+    "3" : GameStep.STEP3
+}
+
+
+class GameConfig(object):
+    """
+    Everything a game needs from the settings files, parsed once.
+
+    The config is built from a powergrid_config.json bundle and is immutable:
+    every field is a tuple, namedtuple or Plant, so one instance can be shared
+    by every simulation of a run and shipped to worker processes by pickling it.
+
+    The Plant cards are built here once. Every deck made from this config
+    deals out these same card objects.
+    """
+
+    def __init__(self, config_file):
+        """
+        :param config_file: Path to the config file
+        """
+
+        config_path = os.path.dirname(config_file)
+        with open(config_file, 'r') as f:
+            config_map = json.loads(f.read())
+
+        def path(key):
+            return os.path.join(config_path, config_map[key])
+
+        self._set("plants", self._read_plants(path("PlantDeck")))
+        self._set("step3_plant", Plant(STEP3_VALUE, ResourceType.COAL, 0, 0, True))
+        self._set("resources", self._read_resources(path("InitResources")))
+        self._set("payout", self._read_payout(path("Payout")))
+        self._set("profiles", self._read_profiles(path("Players")))
+        self._set("_settings", self._read_settings(path("MainSettings")))
+
+
+    def get_settings(self, num_players):
+        """
+        Get the settings for a number of players
+        :param num_players: Number of players in the game
+        :return: PlayerSettings
+        """
+
+        for settings_players, settings in self._settings:
+            if settings_players == num_players:
+                return settings
+
+        raise KeyError(num_players)
+
+    def get_player_counts(self):
+        """
+        :return: Sorted tuple of the numbers of players the settings support
+        """
+        return tuple(num_players for num_players, _ in self._settings)
+
+    def with_settings(self, num_players, **fields):
+        """
+        Get a copy of the config with some settings of a number of players
+        replaced. The copy shares the plant cards, resource tracks, payout
+        and profiles with this config, so variants are cheap to make.
+        :param num_players: Number of players the settings are for
+        :param fields: PlayerSettings fields to replace, e.g. step2_trigger=8
+        :return: A new GameConfig
+        """
+
+        replaced = self.get_settings(num_players)._replace(**fields)
+        settings = tuple(
+            (settings_players, replaced if settings_players == num_players else player_settings)
+            for settings_players, player_settings in self._settings
+        )
+
+        config = object.__new__(GameConfig)
+        for name, value in self.__dict__.items():
+            config._set(name, value)
+        config._set("_settings", settings)
+
+        return config
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameConfig is immutable")
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+
+    def _read_plants(self, plant_def_file):
+
+        plants = []
+        with open(plant_def_file, 'r') as f:
+
+            PlantReader = csv.DictReader(f, delimiter=',')
+
+            for row in PlantReader:
+                plants.append(Plant(
+                    value=int(row['value']),
+                    type=powergrid_utils.resource_type_from_value(int(row['type'])),
+                    fuel=int(row['fuel']),
+                    output=int(row['output'])
+                ))
+
+        return tuple(plants)
+
+    def _read_resources(self, resource_file):
+
+        with open(resource_file, 'r') as f:
+            resource_settings = json.loads(f.read())
+
+        prices = resource_settings.get("Prices", {})
+
+        resources = []
+        for resource in RESOURCE_TRACKS:
+
+            name = powergrid_utils.string_from_type(resource)
+            resource_prices = prices.get(name)
+
+            resources.append(ResourceSpec(
+                type=resource,
+                total=resource_settings["Total"][name],
+                initial=resource_settings["Initial"][name],
+                prices=tuple(resource_prices) if resource_prices is not None else None
+            ))
+
+        return tuple(resources)
+
+    def _read_payout(self, payout_file):
+        """
+        :return: Tuple of the payout for each number of powered cities
+        """
+
+        payout = {}
+        with open(payout_file, 'r') as f:
+            for row in csv.DictReader(f, delimiter=','):
+                payout[int(row['output'])] = int(row['payout'])
+
+        return tuple(payout[cities] for cities in range(len(payout)))
+
+    def _read_profiles(self, player_file):
+
+        with open(player_file, 'r') as f:
+            return tuple(json.loads(f.read()))
+
+    def _read_settings(self, settings_file):
+
+        with open(settings_file, 'r') as f:
+            all_settings = json.loads(f.read())
+
+        settings = {}
+        for num_players, player_settings in all_settings.items():
+
+            replenish = []
+            for step, rates in player_settings["Replenish"].items():
+
+                step_rates = tuple(
+                    (powergrid_utils.resource_type_from_string(resource), rate)
+                    for resource, rate in rates.items()
+                )
+                replenish.append((STEPS.get(step, GameStep.STEP3), step_rates))
+
+            settings[int(num_players)] = PlayerSettings(
+                regions=player_settings["Regions"],
+                discard=player_settings["Discard"],
+                max_plants=player_settings["MaxPlants"],
+                step2_trigger=player_settings["Step2Trigger"],
+                end_condition=player_settings["GameEnd"],
+                replenish=tuple(replenish)
+            )
+
+        # Sorted (number of players, PlayerSettings) pairs, immutable like
+        # every other field
+        return tuple(sorted(settings.items()))
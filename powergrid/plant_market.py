@@ -1,8 +1,76 @@
+from bisect import bisect_left, bisect_right
+from itertools import islice
 from powergrid import PlantDeck
 from powergrid import Plant
 from powergrid import GameStep
 from powergrid import MARKET_ACT_SIZE, MARKET_FUT_SIZE, MARKET_S3_ACT_SIZE
 
+
+class MarketView(object):
+    """
+    A read-only window on the actual or future part of a PlantMarket.
+
+    The view holds no plants of its own. Its bounds are worked out from the
+    market every time it is used, so it always shows the current market and
+    never needs to be rebuilt when a card moves.
+    """
+
+    __slots__ = ("plant_market", "future")
+
+    def __init__(self, plant_market, future=False):
+        """
+        :param plant_market: The market to look at
+        :param future: True for the future market, False for the actual market
+        """
+
+        self.plant_market = plant_market
+        self.future = future
+
+    def _bounds(self):
+        """
+        :return: Tuple of (start, stop) of this view in the market list
+        """
+
+        size = len(self.plant_market.market)
+
+        # In step 3, there is no future market.
+        if self.plant_market.game_step == GameStep.STEP3:
+            split = size
+        else:
+            split = min(size, MARKET_ACT_SIZE)
+
+        if self.future:
+            return split, size
+
+        return 0, split
+
+    def __len__(self):
+        start, stop = self._bounds()
+        return stop - start
+
+    def __getitem__(self, index):
+
+        start, stop = self._bounds()
+
+        if isinstance(index, slice):
+            return self.plant_market.market[start:stop][index]
+
+        if index < 0:
+            index += stop - start
+
+        if not 0 <= index < stop - start:
+            raise IndexError("market index out of range")
+
+        return self.plant_market.market[start + index]
+
+    def __iter__(self):
+        start, stop = self._bounds()
+        return islice(self.plant_market.market, start, stop)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class PlantMarket(object):
     """
     This class is not responsible for enforcing any of the policy of the game.
@@ -12,52 +80,88 @@ class PlantMarket(object):
     is up for auction. It is up to the moderator to make sure that the market is
     properly organized.
 
+    The market is always sorted by value. Cards are put in place with a
+    bisect on the keys of the plants, and the actual and future markets are
+    views on the sorted list, so moving a card never sorts or copies it.
     """
 
     def __init__(self):
 
         self.market = []
-        self.actual = []
-        self.future = []
+
+        # Sort keys of the plants in market, in the same order
+        self.keys = []
+
+        self.actual = MarketView(self)
+        self.future = MarketView(self, future=True)
 
         self.game_step = GameStep.STEP1
 
+    def reset(self):
+        """
+        Empty the market for a new game
+        """
+
+        del self.market[:]
+        del self.keys[:]
+
+        self.game_step = GameStep.STEP1
+
+    def snapshot(self):
+        """
+        Get the state of the market. Plants are immutable and shared, so the
+        state only holds references to them.
+        :return: Tuple of (plants, keys, game step)
+        """
+        return tuple(self.market), tuple(self.keys), self.game_step
+
+    def restore(self, state):
+        """
+        Put the market back to a snapshot
+        :param state: A state from snapshot()
+        """
+        self.market[:], self.keys[:], self.game_step = state
+
     def remove_highest(self):
         """
         Remove highest card from actual/future market and add to bottom of deck
         :return: The highest value power plant in the market
         """
-        plant = self.market.pop(-1)
-        self.layout()
-        return plant
+        self.keys.pop()
+        return self.market.pop()
 
     def remove_lowest(self):
         """
         Remove lowest plant from actual/future market and discard
         :return: The lowest value power plant in the market
         """
-        plant = self.market.pop(0)
-        self.layout()
-        return plant
+        del self.keys[0]
+        return self.market.pop(0)
 
     def auction_plant(self, plant):
         """
         Buy the specified plant from the actual market
         :param plant: The plant to buy from the market
         """
-        self.market.remove(plant)
+
+        i = bisect_left(self.keys, plant.key)
+        if i == len(self.keys) or self.keys[i] != plant.key:
+            raise ValueError("{0} is not in the market".format(plant))
+
+        del self.keys[i]
+        del self.market[i]
 
     def get_actual_market(self):
         """
         Get the actual market
-        :return: The actual market
+        :return: A view of the actual market
         """
         return self.actual
 
     def get_future_market(self):
         """
         Get the futures market
-        :return: The future market
+        :return: A view of the future market
         """
 
         return self.future
@@ -78,11 +182,11 @@ class PlantMarket(object):
         # If the new plant is empty, it means the draw stack is empty.
         # Don't do anything in this case.
         if new_plant is None:
-            self.layout()
             return
 
-        self.market.append(new_plant)
-        self.layout()
+        i = bisect_right(self.keys, new_plant.key)
+        self.keys.insert(i, new_plant.key)
+        self.market.insert(i, new_plant)
 
 
     def set_game_step(self, step):
@@ -95,46 +199,18 @@ class PlantMarket(object):
 
     def layout(self):
         """
-        Layout the plant market based on the current game step
+        Check the layout of the plant market based on the current game step.
+        The market is always sorted and the views always follow it, so there
+        is nothing to rearrange.
         :return: True if everything is okay, False if there is some error (too many plants)
         """
 
-        # Sort the market to order by increasing value
-        self.market.sort()
-
-        # Layout the market based on the step of the game
+        # In step 3, every plant is in the actual market
         if self.game_step == GameStep.STEP3:
-            return self.layout_step3()
-        else:
-            return self.layout_step1_2()
-
-
-    def layout_step1_2(self):
-        """
-        Layout actual and future markets based on steps 1 and 2 of game
-        :return: False if the number of plants in market don't equal actual + future size. True otherwise
-        """
-
-        if len(self.market) != MARKET_FUT_SIZE + MARKET_ACT_SIZE:
-            return False
-
-        # Actual market is lowest cards, future market is everything else
-        self.actual = self.market[0:MARKET_ACT_SIZE]
-        self.future = self.market[-MARKET_FUT_SIZE:]
-
-        return True
-
-    def layout_step3(self):
-        """
-        Layout the actual market for step 3
-        :return: False if market size is not equal to s3 actual size. True otherwise
-        """
+            return True
 
-        # We do this to make a deep copy.
-        # In step 3, there is no future market.
-        self.actual = self.market[:]
-
-        return True
+        # Otherwise the actual and future markets should both be full
+        return len(self.market) == MARKET_FUT_SIZE + MARKET_ACT_SIZE
 
     def remove_plants_below_value(self, value):
         """
@@ -145,21 +221,10 @@ class PlantMarket(object):
         :return: The number of plants removed
         """
 
-        # Get number of plants to remove from actual market
-        self.layout()
+        # The market is sorted, so the plants to remove are the first ones
+        num_removed = min(bisect_right(self.keys, value), len(self.actual))
 
-        num_removed = 0
-        for plant in self.actual:
-
-            # If the value of plant in actual market is less than specified,
-            # remove from main market and add one to the counter
-            if plant.get_value() <= value:
-                num_removed += 1
-                self.market.remove(plant)
+        del self.keys[:num_removed]
+        del self.market[:num_removed]
 
         return num_removed
-
-
-
-
-
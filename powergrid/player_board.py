@@ -1,4 +1,5 @@
-from powergrid import ResourceType
+from powergrid import ResourceType, ResourceVector
+from powergrid.resourcevector import as_vector, vector_from_values, RENEWABLE
 
 """
     Although in PowerGrid, a player does not have a specific board that is theirs,
@@ -16,6 +17,7 @@ from powergrid import ResourceType
     a: Resource Map (Plant : Resources on plant)
 
     m: Get number of cities
+    m: Snapshot / restore
     m: Remove elektro
 
     Phase 2: Auction Power Plants
@@ -47,6 +49,51 @@ class PlayerBoard(object):
         self.id = id
         self.usage_plan = {}
 
+    def reset(self, id=None):
+        """
+        Clear the board for a new game
+        :param id: The id of the player in the new game
+        """
+
+        del self.cities[:]
+        del self.plants[:]
+        self.elektro = 0
+        self.resource_map.clear()
+        self.usage_plan.clear()
+        self.id = id
+
+
+    def snapshot(self):
+        """
+        Get the state of the board. The resources and usage plan of each
+        plant are stored in the order of the board's dictionaries, so a
+        restored board powers its plants in the same order.
+        :return: Tuple of (cities, plants, ((plant, resources, plan), ...), elektro, id)
+        """
+
+        usage_plan = self.usage_plan
+        plants = tuple([(plant, tuple(resources), tuple(usage_plan[plant]))
+                        for plant, resources in self.resource_map.items()])
+
+        return tuple(self.cities), tuple(self.plants), plants, self.elektro, self.id
+
+    def restore(self, state):
+        """
+        Put the board back to a snapshot
+        :param state: A state from snapshot()
+        """
+
+        self.cities[:], self.plants[:], plants, self.elektro, self.id = state
+
+        resource_map = self.resource_map
+        usage_plan = self.usage_plan
+        resource_map.clear()
+        usage_plan.clear()
+
+        for plant, resources, plan in plants:
+            resource_map[plant] = vector_from_values(resources)
+            usage_plan[plant] = vector_from_values(plan)
+
 
     def spend_elektro(self, amount):
         """
@@ -109,16 +156,8 @@ class PlayerBoard(object):
         self.plants.append(plant)
 
         # Add the new plant to the resource map
-        resource_dict = {}
-
-        if plant.get_resource_type() == ResourceType.HYBRID:
-            resource_dict[ResourceType.COAL] = 0
-            resource_dict[ResourceType.OIL] = 0
-        else:
-            resource_dict[plant.get_resource_type()] = 0
-
-        self.resource_map[plant] = resource_dict
-        self.usage_plan[plant] = resource_dict.copy()
+        self.resource_map[plant] = ResourceVector()
+        self.usage_plan[plant] = ResourceVector()
 
         self.plants.sort()
 
@@ -154,6 +193,28 @@ class PlayerBoard(object):
 
         self.resource_map[plant][resource_type] += amount
 
+    def get_fuel_demand(self, plants=None):
+        """
+        Get the fuel needed to power the given plants once
+        :param plants: The plants to fuel. Defaults to every plant on the board
+        :return: A ResourceVector of the fuel. Fuel for hybrid plants is
+            under ResourceType.HYBRID, since it can be any mix of coal and oil.
+        """
+
+        if plants is None:
+            plants = self.plants
+
+        demand = ResourceVector()
+        for plant in plants:
+
+            resource_type = plant.get_resource_type()
+            if resource_type == RENEWABLE:
+                continue
+
+            demand[resource_type] += plant.get_required_fuel()
+
+        return demand
+
     def add_resource_usage_to_plan(self, plant, resource_type, amount):
         """
         Add a usage plan for what resources to use for each plant when it
@@ -184,15 +245,11 @@ class PlayerBoard(object):
                 Plant 5: {ResourceType.COAL : 1, ResourceType.OIL : 1}
             }
 
-        :return: None
+        :return: Tuple of (usage_report, cities_powered). usage_report is a
+            ResourceVector of the fuel burned
         """
 
-        usage_report = {
-            ResourceType.COAL : 0,
-            ResourceType.OIL : 0,
-            ResourceType.TRASH : 0,
-            ResourceType.URANIUM : 0
-        }
+        usage_report = ResourceVector()
 
         cities_powered = 0
 
@@ -201,32 +258,36 @@ class PlayerBoard(object):
 
         for plant, usage in plant_resource_map.items():
 
-            storage = self.resource_map[plant]
             plant_type = plant.get_resource_type()
 
+            if plant_type == RENEWABLE:
+                cities_powered += plant.get_output()
+                continue
 
+            if usage is None:
+                usage = {plant_type: plant.get_required_fuel()}
 
+            usage = as_vector(usage)
 
-            if plant_type == ResourceType.HYBRID:
+            storage = self.resource_map[plant]
+            plan = self.usage_plan[plant]
 
-                storage[ResourceType.COAL] -= usage[ResourceType.COAL]
-                usage_report[ResourceType.COAL] += usage[ResourceType.COAL]
-                self.usage_plan[plant][ResourceType.COAL] = 0
+            # Only burn the fuel in the plan. A plant that got no fuel this
+            # round uses none and powers no cities.
+            fuel_used = 0
+            for resource, amount in enumerate(usage):
 
-                storage[ResourceType.OIL] -= usage[ResourceType.OIL]
-                usage_report[ResourceType.OIL] += usage_report[ResourceType.OIL]
-                self.usage_plan[plant][ResourceType.OIL] = 0
+                if not amount:
+                    continue
 
-                self.resource_map[plant] = storage
+                storage[resource] -= amount
+                usage_report[resource] += amount
+                plan[resource] = 0
 
-            elif plant_type != ResourceType.RENEWABLE:
-                current_storage = storage[plant_type]
-                current_storage -= plant.get_required_fuel()
-                usage_report[plant_type] += plant.get_required_fuel()
-                self.resource_map[plant][plant_type] = current_storage
-                self.usage_plan[plant][plant_type] = 0
+                fuel_used += amount
 
-            cities_powered += plant.get_output()
+            if fuel_used >= plant.get_required_fuel():
+                cities_powered += plant.get_output()
 
         return (usage_report, cities_powered)
 
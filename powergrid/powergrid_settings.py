@@ -1,39 +1,26 @@
-import json
-from powergrid import powergrid_utils, GameStep
+from powergrid import GameStep, ResourceVector
 
 class PowerGridSettings(object):
 
-    def __init__(self, num_players, settings_file):
+    def __init__(self, num_players, config):
+        """
+        :param num_players: Number of players in the game
+        :param config: The GameConfig of the run
+        """
 
-        settings = None
-        with open(settings_file, 'r') as f:
-            settings = json.loads(f.read())
-
-        settings = settings[str(num_players)]
+        settings = config.get_settings(num_players)
 
         # Set up the easy things
-        self.num_regions = settings["Regions"]
-        self.discard_num = settings["Discard"]
-        self.max_plants = settings["MaxPlants"]
-        self.step2_trigger = settings["Step2Trigger"]
-        self.end_condition = settings["GameEnd"]
+        self.num_regions = settings.regions
+        self.discard_num = settings.discard
+        self.max_plants = settings.max_plants
+        self.step2_trigger = settings.step2_trigger
+        self.end_condition = settings.end_condition
 
-        replenish = settings["Replenish"]
+        # Payout for each number of powered cities
+        self.payout = config.payout
 
+        # Fresh vectors, so a game can't change the shared config
         self.replenish_rates = {}
-        for step, rates in replenish.items():
-
-            step_rates = {}
-            for resource, resource_rate in rates.items():
-
-                resource_type = powergrid_utils.resource_type_from_string(resource)
-                step_rates[resource_type] = resource_rate
-
-            if step == "1":
-                step_enum = GameStep.STEP1
-            elif step == "2":
-                step_enum = GameStep.STEP2
-            else:
-                step_enum = GameStep.STEP3
-
-            self.replenish_rates[step_enum] = step_rates
+        for step, rates in settings.replenish:
+            self.replenish_rates[step] = ResourceVector(dict(rates))
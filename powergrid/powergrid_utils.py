@@ -1,3 +1,4 @@
+import random
 from powergrid import ResourceType
 
 def resource_type_from_value(value):
@@ -50,4 +51,24 @@ def string_from_type(resource_type):
     elif resource_type == ResourceType.HYBRID:
         return "Hybrid"
     else:
-        return "Unknown"
\ No newline at end of file
+        return "Unknown"
+
+def stream_seed(seed, *stream):
+    """
+    Get the seed of an independent stream of a seeded run
+    :param seed: The seed of the whole run
+    :param stream: Keys of the stream, e.g. (num_players, sim_number)
+    :return: A seed for random.Random
+    """
+    return ":".join(str(int(x)) for x in (seed,) + stream)
+
+def spawn_rng(seed, *stream):
+    """
+    Create a random number generator for an independent stream of a seeded run.
+    The same seed and stream always give the same sequence, whatever else
+    has been drawn from other streams.
+    :param seed: The seed of the whole run
+    :param stream: Keys of the stream, e.g. (num_players, sim_number)
+    :return: A random.Random instance
+    """
+    return random.Random(stream_seed(seed, *stream))
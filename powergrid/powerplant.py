@@ -9,25 +9,34 @@ class Plant(object):
     a: Needed fuel
     a: Output
     a: IsStep3?
-    a: Primary storage
-    a: Secondary storage
-
-
-    m: Add resources to plant
-    m: Remove resources from plant
-    m: Get stored resources
     """
 
+    # No per-instance __dict__. Cards are built once per GameConfig and
+    # shared by every game, so they can never change.
+    __slots__ = ("value", "type", "fuel", "output", "step3", "key", "_hash")
+
     def __init__(self, value, type, fuel, output, step3=False):
 
-        self.value = value
-        self.type = type
-        self.fuel = fuel
-        self.output = output
+        set_slot = object.__setattr__
+
+        set_slot(self, "value", value)
+        set_slot(self, "type", type)
+        set_slot(self, "fuel", fuel)
+        set_slot(self, "output", output)
 
         # Determines if this is a Step 3 card or not
-        self.step3 = step3
+        set_slot(self, "step3", step3)
+
+        # Plants sort and compare by value. Every card has its own value,
+        # so the value alone identifies a card.
+        set_slot(self, "key", int(value))
+        set_slot(self, "_hash", hash(self.key))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Plant is immutable")
 
+    def __reduce__(self):
+        return (Plant, (self.value, self.type, self.fuel, self.output, self.step3))
 
     def get_value(self):
         return self.value
@@ -54,13 +63,15 @@ class Plant(object):
         return rep_str
 
     def __lt__(self, other):
-        return self.value < other.value
+        return self.key < other.key
 
     def __eq__(self, other):
-        return self.value == other.value
+        if not isinstance(other, Plant):
+            return NotImplemented
+        return self.key == other.key
 
     def __hash__(self):
-        return hash((self.value, self.step3))
+        return self._hash
 
 
 
@@ -1,48 +1,86 @@
-import csv
 import random
-from powergrid import Plant, ResourceType
+from collections import deque
 
 class PlantDeck(object):
 
 
-    def __init__(self, plant_def):
+    def __init__(self, config, rng=None):
+        """
+        :param config: The GameConfig holding the plant cards
+        :param rng: A random.Random used for shuffling and discarding.
+            A fresh unseeded one is created if not given.
+        """
+
+        if rng is None:
+            rng = random.Random()
+
+        self.rng = rng
         self.discard = []
-        self.deck = []
+
+        # Top of the deck is the left end, so drawing from the top and adding
+        # to the bottom are both O(1)
+        self.deck = deque()
         self.exile = []
         self.base_market = []
 
-        self.construct_deck(plant_def)
+        self.construct_deck(config.plants)
+
+        # Keep the starting layout, so the same cards can be reused by reset
+        self.initial_base_market = tuple(self.base_market)
+        self.initial_deck = tuple(self.deck)
+        self.step3_card = config.step3_plant
 
 
-    def construct_deck(self, plant_def_file):
+    def reset(self):
+        """
+        Put every card back where it was when the deck was constructed
         """
-        Construct the deck of power plant cards
 
-        Read the given definition file and add to the deck
-        Make exceptions for the base market
+        self.base_market[:] = self.initial_base_market
+        self.deck.clear()
+        self.deck.extend(self.initial_deck)
+        del self.discard[:]
+        del self.exile[:]
 
-        :param plant_def_file: Path to csv definition file
+
+    def snapshot(self):
+        """
+        Get the state of the deck. The rng is not part of it, so games
+        restored from the same snapshot can play out differently.
+        :return: Tuple of (deck, discard, exile, base market)
+        """
+        return tuple(self.deck), tuple(self.discard), tuple(self.exile), tuple(self.base_market)
+
+    def restore(self, state):
+        """
+        Put the deck back to a snapshot
+        :param state: A state from snapshot()
         """
 
-        with open(plant_def_file, 'r') as f:
+        deck, self.discard[:], self.exile[:], self.base_market[:] = state
 
-            PlantReader = csv.DictReader(f, delimiter=',')
+        self.deck.clear()
+        self.deck.extend(deck)
 
-            for row in PlantReader:
 
-                card = Plant(
-                        value=int(row['value']),
-                        type=self._typefromvalue(int(row['type'])),
-                        fuel=int(row['fuel']),
-                        output=int(row['output'])
-                    )
+    def construct_deck(self, plants):
+        """
+        Construct the deck of power plant cards
+
+        Add every card of the config to the deck
+        Make exceptions for the base market
+
+        :param plants: The Plant cards of the GameConfig
+        """
+
+        for card in plants:
 
-                # The values from 3--10 and 13 are special because they always
-                # form the starting market.
-                if 3 <= card.get_value() <= 10 or card.get_value() == 13:
-                    self.base_market.append(card)
-                else:
-                    self.deck.append(card)
+            # The values from 3--10 and 13 are special because they always
+            # form the starting market.
+            if 3 <= card.get_value() <= 10 or card.get_value() == 13:
+                self.base_market.append(card)
+            else:
+                self.deck.append(card)
 
 
 
@@ -54,21 +92,36 @@ class PlantDeck(object):
         :param num_discard: Number of cards to exile
         """
 
-        while num_discard > 0:
+        num_discard = min(num_discard, len(self.deck))
+        if num_discard <= 0:
+            return
 
-            card = random.choice(self.deck)
+        # Pick every card to exile with one draw from the rng, then take them
+        # out in a single pass over the deck
+        exiled = set(self.rng.sample(range(len(self.deck)), num_discard))
 
-            self.exile.append(card)
-            self.deck.remove(card)
+        cards = list(self.deck)
+        self.deck.clear()
 
-            num_discard -= 1
+        for i, card in enumerate(cards):
+            if i in exiled:
+                self.exile.append(card)
+            else:
+                self.deck.append(card)
 
 
     def shuffle(self):
         """
         Shuffle the deck of power plants
         """
-        random.shuffle(self.deck)
+
+        # Indexing into the middle of a deque is O(n), so shuffle a list.
+        # The rng draws are the same as for shuffling the deck in place.
+        cards = list(self.deck)
+        self.rng.shuffle(cards)
+
+        self.deck.clear()
+        self.deck.extend(cards)
 
 
     def setup_deck(self):
@@ -80,9 +133,10 @@ class PlantDeck(object):
 
         # Remove the #13 card from base market and put it on top of the deck
         card_13 = self.base_market.pop(-1)
-        self.deck.insert(0, card_13)
+        self.deck.appendleft(card_13)
 
-        self.deck.append(Plant(100, ResourceType.COAL, 0, 0, True))
+        # The step 3 card goes to the bottom
+        self.deck.append(self.step3_card)
 
         return self.base_market
 
@@ -110,25 +164,6 @@ class PlantDeck(object):
         :return: The next card in the deck to draw
         """
         if self.deck:
-            return self.deck.pop(0)
+            return self.deck.popleft()
         else:
             return None
-
-
-
-    def _typefromvalue(self, value):
-
-        if value == 0:
-            return ResourceType.COAL
-        elif value == 1:
-            return ResourceType.OIL
-        elif value == 2:
-            return ResourceType.TRASH
-        elif value == 3:
-            return ResourceType.URANIUM
-        elif value == 4:
-            return ResourceType.RENEWABLE
-        elif value == 5:
-            return ResourceType.HYBRID
-        else:
-            return ResourceType.COAL
@@ -1,5 +1,5 @@
-import json
-from powergrid import ResourceType, ResourcePool
+from powergrid import ResourceType, ResourcePool, ResourceVector, MARKET_RESOURCES
+from powergrid.resourcevector import as_vector, COAL, OIL, HYBRID
 
 """
 Resource Market
@@ -15,6 +15,7 @@ Resource Market
     m: Get available resources for type
     m: Buy resource type
     m: Replenish resource type
+    m: Snapshot / restore
 """
 
 class ResourceMarket(object):
@@ -31,73 +32,79 @@ class ResourceMarket(object):
     buying the resource. That is up to the moderator to enforce.
     """
 
-    def __init__(self, resource_settings):
-
-        self.resource_settings = None
-        with open(resource_settings, 'r') as f:
-            self.resource_settings = json.loads(f.read())
-
-        # Set up the resource pools
-        coal_pool = ResourcePool(
-            ResourceType.COAL,
-            self.resource_settings["Total"]["Coal"],
-            self.resource_settings["Initial"]["Coal"]
-            )
-
-
-        oil_pool = ResourcePool(
-            ResourceType.OIL,
-            self.resource_settings["Total"]["Oil"],
-            self.resource_settings["Initial"]["Oil"]
-            )
-
-        trash_pool = ResourcePool(
-            ResourceType.TRASH,
-            self.resource_settings["Total"]["Trash"],
-            self.resource_settings["Initial"]["Trash"]
-            )
-
-        uranium_pool = ResourcePool(
-            ResourceType.URANIUM,
-            self.resource_settings["Total"]["Uranium"],
-            self.resource_settings["Initial"]["Uranium"]
-            )
-
-        # Set up the market.
-        self.market = {
-            ResourceType.COAL    : coal_pool,
-            ResourceType.OIL     : oil_pool,
-            ResourceType.TRASH   : trash_pool,
-            ResourceType.URANIUM : uranium_pool
-        }
-
-        self.available_pool = {
-            ResourceType.COAL    : coal_pool.get_total_size()    - coal_pool.get_available_resources(),
-            ResourceType.OIL     : oil_pool.get_total_size()     - oil_pool.get_available_resources(),
-            ResourceType.TRASH   : trash_pool.get_total_size()   - trash_pool.get_available_resources(),
-            ResourceType.URANIUM : uranium_pool.get_total_size() - uranium_pool.get_available_resources()
-        }
+    def __init__(self, config):
+        """
+        :param config: The GameConfig holding the resource tracks
+        """
+
+        # Set up the market. Pools are indexed by the value of their
+        # ResourceType, like a ResourceVector. They fall back to the standard
+        # price schedule if the settings don't have one.
+        self.market = [None] * len(MARKET_RESOURCES)
+        for spec in config.resources:
+            self.market[spec.type] = ResourcePool(spec.type, spec.total, spec.initial, spec.prices)
+
+        self.available_pool = ResourceVector()
+        self.reset()
+
+
+    def reset(self):
+        """
+        Put every pool back to its initial fill, and everything else back in
+        the pool of resources not yet in the market
+        """
+
+        for resource, pool in enumerate(self.market):
+            pool.reset()
+            self.available_pool[resource] = pool.get_total_size() - pool.get_available_resources()
+
+
+    def snapshot(self):
+        """
+        Get the state of the market. The pools are one integer each, so the
+        state is a flat tuple of the pools followed by the available pool.
+        :return: Tuple of ints
+        """
+        return tuple([pool.available for pool in self.market] + self.available_pool)
+
+    def restore(self, state):
+        """
+        Put the market back to a snapshot
+        :param state: A state from snapshot()
+        """
+
+        num_pools = len(self.market)
+        for pool, available in zip(self.market, state):
+            pool.available = available
+
+        self.available_pool[:] = state[num_pools:]
 
 
     def replenish_market(self, replenish_rates):
         """
         Replenish each of the resources in the market
-        :param replenish_rates: A dictionary of the replenish rates
+        :param replenish_rates: A ResourceVector (or dictionary) of the replenish rates
         :return: None
         """
 
         # Always replenish based on rates, but do not do so if there are no
         # resources left for us to replenish
 
+        replenish_rates = as_vector(replenish_rates)
+
         # Iterate over replenish rates
-        for resource, rate in replenish_rates.items():
+        for resource, pool in enumerate(self.market):
+
+            rate = replenish_rates[resource]
+            if not rate:
+                continue
 
             # Determine the actual replenish rate by taking the min of the
             # settings replenish rate and the actual resources available to use
             actual_rate = min(rate, self.available_pool[resource])
 
             # Replenish the market
-            self.market[resource].replenish(actual_rate)
+            pool.replenish(actual_rate)
 
             # Since we know that the actual rate is <= available resources,
             # we can perform this operation without fear of going into the negatives.
@@ -126,6 +133,114 @@ class ResourceMarket(object):
 
         return cost
 
+    def cheapest_hybrid_purchase(self, required_fuel):
+        """
+        Find the cheapest mix of coal and oil to fuel a hybrid plant.
+
+        :param required_fuel: The amount of fuel the hybrid plant needs
+        :return: Tuple of (purchase, cost). purchase is a ResourceVector
+            ready for buy_multiple. If the market doesn't
+            have enough coal and oil, returns (None, -1).
+        """
+
+        mix = self._merge_hybrid(required_fuel, 0, 0)
+        if mix is None:
+            return None, -1
+
+        coal, oil, cost = mix
+        purchase = ResourceVector()
+        purchase[COAL] = coal
+        purchase[OIL] = oil
+
+        return purchase, cost
+
+    def cheapest_purchase(self, demand):
+        """
+        Find the cheapest way to buy a player's whole fuel demand at once.
+
+        Fixed demand has to be bought anyway and comes off the cheap end of
+        each track, so the hybrid demand is then filled from whatever coal and
+        oil is left, always taking the cheaper next resource.
+
+        :param demand: A ResourceVector (or dictionary) of resource : amount.
+            The amount under ResourceType.HYBRID can be filled with any mix of
+            coal and oil.
+        :return: Tuple of (purchase, hybrid_mix, cost). purchase is a
+            ResourceVector ready for buy_multiple, hybrid_mix
+            is the part of the coal and oil that goes to the hybrid demand.
+            If the market can't fill the demand, returns (None, None, -1).
+        """
+
+        demand = as_vector(demand)
+
+        purchase = ResourceVector()
+        cost = 0
+        for resource, pool in enumerate(self.market):
+
+            amount = demand[resource]
+            resource_cost = pool.calculate_cost(amount)
+
+            if resource_cost == -1:
+                return None, None, -1
+
+            purchase[resource] = amount
+            cost += resource_cost
+
+        mix = self._merge_hybrid(
+            demand[HYBRID],
+            purchase[COAL],
+            purchase[OIL]
+        )
+        if mix is None:
+            return None, None, -1
+
+        coal, oil, hybrid_cost = mix
+        purchase[COAL] += coal
+        purchase[OIL] += oil
+
+        hybrid_mix = ResourceVector()
+        hybrid_mix[COAL] = coal
+        hybrid_mix[OIL] = oil
+
+        return purchase, hybrid_mix, cost + hybrid_cost
+
+    def _merge_hybrid(self, required_fuel, coal_offset, oil_offset):
+        """
+        Fill hybrid demand with the cheapest coal and oil.
+
+        Both tracks are sorted by price, so walking the two sequences of
+        marginal prices and always taking the cheaper next resource gives the
+        optimal mix.
+
+        :param required_fuel: The amount of coal and oil needed
+        :param coal_offset: Amount of coal already bought from the track
+        :param oil_offset: Amount of oil already bought from the track
+        :return: Tuple of (coal, oil, cost), or None if there is not enough
+        """
+
+        coal_pool = self.market[COAL]
+        oil_pool = self.market[OIL]
+
+        coal = 0
+        oil = 0
+        cost = 0
+        for _ in range(required_fuel):
+
+            coal_price = coal_pool.get_price(coal_offset + coal)
+            oil_price = oil_pool.get_price(oil_offset + oil)
+
+            # Prefer coal on a tie, oil is the scarcer resource
+            if coal_price != -1 and (oil_price == -1 or coal_price <= oil_price):
+                cost += coal_price
+                coal += 1
+            elif oil_price != -1:
+                cost += oil_price
+                oil += 1
+            else:
+                return None
+
+        return coal, oil, cost
+
     def buy(self, resource, amount):
         """
         Buy a given amount of a given resource
@@ -139,12 +254,12 @@ class ResourceMarket(object):
     def buy_multiple(self, resource_dict):
         """
         Buy multiple resources at once through a dictionary
-        :param resource_dict: A dictionary mapping of resource : amount
+        :param resource_dict: A ResourceVector or dictionary of resource : amount
         :return: True if resources bought, false otherwise
         """
         success = True
-        for resource, amount in resource_dict.items():
-            success &= self.buy(resource, amount)
+        for pool, amount in zip(self.market, as_vector(resource_dict)):
+            success &= pool.buy(amount)
 
         return success
 
@@ -161,16 +276,28 @@ class ResourceMarket(object):
     def add_available_resources(self, usage_report):
         """
         Add resources to the available pool based on the usage report
-        :param usage_report: A dictionary of how many of each resource to add back
+        :param usage_report: A ResourceVector (or dictionary) of how many of each resource to add back
         :return: None
         """
 
-        for resource, usage in usage_report.items():
+        for resource, usage in enumerate(as_vector(usage_report)):
             self.available_pool[resource] += usage
 
+    def get_market_resources(self):
+        """
+        Get the resources currently in the market
+        :return: A ResourceVector of the available resources of each type
+        """
+
+        resources = ResourceVector()
+        for resource, pool in enumerate(self.market):
+            resources[resource] = pool.available
+
+        return resources
+
     def get_available_pool(self):
         """
         Get the pool of resources not yet in the market
-        :return: The pool of available resource as a dictionary
+        :return: The pool of available resource as a ResourceVector
         """
         return self.available_pool
\ No newline at end of file
@@ -1,4 +1,5 @@
 import math
+from itertools import accumulate
 from powergrid import ResourceType
 
 """
@@ -9,70 +10,106 @@ Resource Pool
     m: Buy resources
     m: Replenish resources
     m: Get available resources to buy 
+    m: Snapshot / restore
 """
 
 
 class ResourcePool(object):
+    """
+    The market track for one resource type.
 
-    def __init__(self, type, pool_size, initial):
+    Resources are always added to the empty slot closest to the expensive end
+    and bought from the cheapest filled slot, so the filled slots are always
+    the last :available slots of the track. That means the whole state of the
+    pool is one integer.
+    """
+
+    def __init__(self, type, pool_size, initial, prices=None):
+        """
+        :param type: The ResourceType of this pool
+        :param pool_size: Number of slots on the track
+        :param initial: Number of resources in the pool at the start
+        :param prices: Price of every slot, cheapest first. If not given, the
+            standard price schedule for the resource type is used.
+        """
 
         self.type = type
         self.total_resources = pool_size
-        self.available = self.total_resources
 
-        # Create a pool of resources according to the amount of resources available
-        self.pool = [False] * self.total_resources
-        self.pool[-initial:] = [True] * initial
+        # Number of resources currently in the pool. They occupy the slots
+        # [total_resources - available, total_resources)
+        self.initial = initial
+        self.available = min(initial, self.total_resources)
 
+        if prices is None:
+            prices = default_prices(type, pool_size)
 
-    def replenish(self, amount):
-
-        pos = -1
+        if len(prices) != pool_size:
+            raise ValueError("Expected {0:d} prices for {1}, got {2:d}".format(
+                pool_size, type, len(prices)))
 
-        # Iterate while we still need to replenish and we're not yet at max capacity
-        # Note that we iterate backwards.
-        while amount > 0 and pos >= -len(self.pool):
+        self.prices = tuple(prices)
 
-            # If the position is not full, fill it.
-            if not self.pool[pos]:
-                self.pool[pos] = True
-                amount -= 1
+        # cost_table[i] is the cost of buying every slot below slot i, so
+        # buying the slots [i, j) costs cost_table[j] - cost_table[i]
+        self.cost_table = (0,) + tuple(accumulate(self.prices))
 
-            pos -= 1
 
+    def reset(self):
+        """
+        Put the pool back to its initial fill
+        """
+        self.available = min(self.initial, self.total_resources)
 
-    def calculate_cost(self, amount):
 
-        # For most resources, the cost goes up by 1 every 3.
-        # Thus, the price of a given one is floor((pos/3)) + 1
-        # Uranium is different, it goes up by 1 every resource until 7,
-        # then it does 8, 10, 12, 14, 16
-        # (8, 10) (9, 12) (10, 14) (11, 16) -> 2x - 6
+    def snapshot(self):
+        """
+        :return: The state of the pool, the number of resources in it
+        """
+        return self.available
 
-        cost = 0
-        for i in range(len(self.pool)):
+    def restore(self, state):
+        """
+        Put the pool back to a snapshot
+        :param state: A state from snapshot()
+        """
+        self.available = state
 
-            if self.pool[i]:
 
-                if self.type == ResourceType.URANIUM:
-                    if i > 7:
-                        cost += 2 * i - 6
-                    else:
-                        cost += i
+    def replenish(self, amount):
 
-                else:
-                    cost += math.floor(i/3) + 1
+        # Fill empty slots, but never beyond max capacity
+        self.available = min(self.available + amount, self.total_resources)
 
-                amount -= 1
 
-                if not amount:
-                    break
+    def calculate_cost(self, amount):
+        """
+        Calculate the cost of buying an amount of resources
+        :param amount: The amount of the resource to buy
+        :return: The cost, or -1 if there are not enough resources in the pool
+        """
 
-        else: # We were not able to buy all the resources. :(
+        if amount > self.available:
             return -1
 
+        # The cheapest filled slot is the first one we buy
+        start = self.total_resources - self.available
 
-        return cost
+        return self.cost_table[start + amount] - self.cost_table[start]
+
+
+    def get_price(self, offset):
+        """
+        Get the price of a single resource in the pool
+        :param offset: How many resources are bought before this one, so 0 is
+            the next (cheapest) resource
+        :return: The price, or -1 if the pool doesn't have that many resources
+        """
+
+        if offset >= self.available:
+            return -1
+
+        return self.prices[self.total_resources - self.available + offset]
 
 
     def buy(self, amount):
@@ -83,27 +120,15 @@ class ResourcePool(object):
         """
 
         # Check if there are enough resources to buy this
-        available = self.get_available_resources()
-        if available < amount:
+        if self.available < amount:
             return False
 
-        removed = 0
-
-        # Remove resources from the pool until we have removed as much as we want
-        for i in range(len(self.pool)):
-
-            if self.pool[i]:
-                self.pool[i] = False
-
-                removed += 1
-
-            if removed == amount:
-                break
+        self.available -= amount
 
         return True
 
     def get_available_resources(self):
-        return self.pool.count(True)
+        return self.available
 
     def get_type(self):
         return self.type
@@ -116,17 +141,36 @@ class ResourcePool(object):
         rep_str = str(self.type)
         rep_str += ': '
 
-        for i in range(len(self.pool)):
+        for i in range(self.total_resources - self.available, self.total_resources):
+            rep_str += str(self.prices[i])
 
-            if self.pool[i]:
+        return rep_str
 
-                if self.type == ResourceType.URANIUM:
-                    if i > 7:
-                        rep_str += str(2 * i - 6)
-                    else:
-                        rep_str += str(i)
 
-                else:
-                    rep_str += str(math.floor(i/3) + 1)
+def default_prices(type, pool_size):
+    """
+    Get the standard price schedule of a resource track
+    :param type: The ResourceType of the track
+    :param pool_size: Number of slots on the track
+    :return: List of the price of each slot, cheapest first
+    """
 
-        return rep_str
+    # For most resources, the cost goes up by 1 every 3.
+    # Thus, the price of a given one is floor((pos/3)) + 1
+    # Uranium is different, it goes up by 1 every resource until 8,
+    # then it does 10, 12, 14, 16
+    # (8, 10) (9, 12) (10, 14) (11, 16) -> 2x - 6
+
+    prices = []
+    for slot in range(pool_size):
+
+        if type == ResourceType.URANIUM:
+            if slot > 7:
+                prices.append(2 * slot - 6)
+            else:
+                prices.append(slot + 1)
+
+        else:
+            prices.append(math.floor(slot/3) + 1)
+
+    return prices
@@ -0,0 +1,124 @@
+from powergrid import ResourceType
+
+# Every resource type, by integer value
+RESOURCE_TYPES = tuple(sorted(ResourceType, key=int))
+
+# The resources that have a track in the market
+MARKET_RESOURCES = (ResourceType.COAL, ResourceType.OIL, ResourceType.TRASH, ResourceType.URANIUM)
+
+# Plain int indices. Looking up a member on the enum class is slow, so hot
+# loops use these instead.
+COAL = int(ResourceType.COAL)
+OIL = int(ResourceType.OIL)
+TRASH = int(ResourceType.TRASH)
+URANIUM = int(ResourceType.URANIUM)
+RENEWABLE = int(ResourceType.RENEWABLE)
+HYBRID = int(ResourceType.HYBRID)
+
+
+class ResourceVector(list):
+    """
+    An amount for every resource type, in a fixed-width list indexed by the
+    integer value of the ResourceType.
+
+    Indexing works with ResourceType members or plain ints, and never hashes
+    the enum. Plain ints are the fastest, which is why items() gives them.
+    items(), get() and to_dict() give the parts of the dictionary
+    interface the game code needs, so a vector can be passed wherever a
+    resource : amount dictionary was read before. Reports are turned into
+    dictionaries with to_dict() when they leave the simulator.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, amounts=None):
+        """
+        :param amounts: Optional dictionary (or vector) of resource : amount
+        """
+
+        list.__init__(self, _ZEROS)
+
+        if amounts is not None:
+            for resource, amount in amounts.items():
+                self[resource] += amount
+
+    def items(self):
+        """
+        Get the resources that have a nonzero amount
+        :return: Generator of (resource value, amount)
+        """
+
+        for resource, amount in enumerate(self):
+            if amount:
+                yield resource, amount
+
+    def get(self, resource, default=0):
+        """
+        Get the amount of a resource. Every resource has an amount, so the
+        default is never used. It is there to match dict.get.
+        """
+        return self[resource]
+
+    def add(self, other):
+        """
+        Add another vector to this one, in place
+        :param other: The ResourceVector to add
+        :return: This vector
+        """
+
+        for i, amount in enumerate(other):
+            self[i] += amount
+
+        return self
+
+    def copy(self):
+        vector = ResourceVector()
+        vector[:] = self
+        return vector
+
+    def clear(self):
+        """
+        Set every amount to 0
+        """
+        self[:] = _ZEROS
+
+    def to_dict(self, resources=MARKET_RESOURCES):
+        """
+        Convert to a dictionary for reports
+        :param resources: The resources to put in the dictionary
+        :return: Dictionary of ResourceType : amount
+        """
+        return dict((resource, self[resource]) for resource in resources)
+
+
+def as_vector(amounts):
+    """
+    Turn a resource : amount dictionary into a ResourceVector. Vectors are
+    returned as they are.
+    :param amounts: A ResourceVector or dictionary
+    :return: A ResourceVector
+    """
+
+    if isinstance(amounts, ResourceVector):
+        return amounts
+
+    return ResourceVector(amounts)
+
+
+def vector_from_values(values):
+    """
+    Build a ResourceVector from a full sequence of amounts, e.g. a tuple
+    from a snapshot. Skips __init__, which makes it about twice as fast.
+    :param values: An amount for every resource type, by integer value
+    :return: A ResourceVector
+    """
+
+    vector = _new_list(ResourceVector)
+    _extend(vector, values)
+    return vector
+
+
+_ZEROS = (0,) * len(RESOURCE_TYPES)
+
+_new_list = list.__new__
+_extend = list.extend
@@ -3,5 +3,6 @@ import powergrid
 
 if __name__ == '__main__':
 
-    deck = powergrid.PlantDeck('settings/power_plants.csv')
+    config = powergrid.GameConfig('settings/powergrid_config.json')
+    deck = powergrid.PlantDeck(config)
     deck.setup_deck()
\ No newline at end of file
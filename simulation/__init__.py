@@ -1,2 +1,3 @@
+from simulation.powergrid_simulator import PowerGridSimulator
 from simulation.resource_analysis_simulator_naive import NaiveResourceAnalysisSim
-from simulation.powergrid_simulator import PowerGridSimulator
\ No newline at end of file
+from simulation.resource_analysis_simulator_auction import AuctionResourceAnalysisSim
\ No newline at end of file
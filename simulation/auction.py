@@ -0,0 +1,246 @@
+from collections import deque
+from powergrid.game_config import STEP3_VALUE
+
+"""
+    Auctions of phase 2.
+
+    In turn order, every player that hasn't bought a plant this round picks
+    a plant of the actual market and opens with its face value, or passes
+    and is done for the round. The other players still in the phase then
+    raise by one or drop out, going around until one bidder is left. The
+    winner pays with spend_elektro and leaves the phase. If nobody bought a
+    plant, the lowest plant of the market is discarded.
+
+    Players decide through a BiddingStrategy. Every strategy values the
+    plants of a config once, up front, into a tuple indexed by plant value,
+    so choosing a plant and bidding are a lookup and a comparison:
+
+        valuation(plant): The most a plant is worth to the strategy
+        choose_plant(player, market, must_buy): The plant to open an auction for
+        bid(player, plant, high_bid): A higher bid, or 0 to drop out
+"""
+
+# Elektro every player starts the game with
+STARTING_ELEKTRO = 50
+
+# No bid. Every bid is at least the face value of a plant.
+PASS = 0
+
+
+class BiddingStrategy(object):
+    """
+    Base of the bidding strategies. Values plants at their face value, opens
+    for the plant with the most value over its price and raises while a plant
+    is worth more than the bid.
+    """
+
+    def __init__(self):
+
+        self.values = None
+        self._config = None
+
+    def prepare(self, config):
+        """
+        Value the plants of a config. Strategies shared by several games of
+        the same config only do this once.
+        :param config: The GameConfig of the game
+        """
+
+        if self._config is config:
+            return
+
+        values = [0] * (STEP3_VALUE + 1)
+        for plant in config.plants:
+            values[plant.key] = self.valuation(plant)
+
+        self.values = tuple(values)
+        self._config = config
+
+    def valuation(self, plant):
+        """
+        :param plant: A plant of the config
+        :return: The most the strategy pays for the plant
+        """
+        return plant.value
+
+    def choose_plant(self, player, market, must_buy):
+        """
+        Pick the plant to open an auction for
+        :param player: The PlayerBoard of the player
+        :param market: The actual market
+        :param must_buy: True if the player can't pass
+        :return: The plant, None to pass
+        """
+
+        values = self.values
+        elektro = player.elektro
+        lowest = _lowest_replaceable(player)
+
+        best = None
+        best_surplus = 0
+        for plant in market:
+
+            key = plant.key
+            if key > elektro or key <= lowest or plant.step3:
+                continue
+
+            # The market is sorted, so ties go to the bigger plant
+            surplus = values[key] - key
+            if best is None or surplus >= best_surplus:
+                best = plant
+                best_surplus = surplus
+
+        if best is None or (best_surplus < 0 and not must_buy):
+            return None
+
+        return best
+
+    def bid(self, player, plant, high_bid):
+        """
+        Raise or drop out of an auction
+        :param player: The PlayerBoard of the player
+        :param plant: The plant being auctioned
+        :param high_bid: The highest bid so far
+        :return: The new bid, PASS to drop out
+        """
+
+        bid = high_bid + 1
+        if bid > self.values[plant.key] or bid > player.elektro or plant.key <= _lowest_replaceable(player):
+            return PASS
+
+        return bid
+
+
+class MinimumBidStrategy(BiddingStrategy):
+    """
+    Buy the biggest affordable plant at its face value and never raise, like
+    the naive players do without money
+    """
+
+    def bid(self, player, plant, high_bid):
+        return PASS
+
+
+class ValueStrategy(BiddingStrategy):
+    """
+    Pay over face value for plants that power more cities
+    """
+
+    def __init__(self, markup=0.25, output_bonus=2):
+        """
+        :param markup: Fraction over the face value the strategy pays for any plant
+        :param output_bonus: Elektro the strategy pays for every city a plant powers
+        """
+
+        BiddingStrategy.__init__(self)
+
+        self.markup = markup
+        self.output_bonus = output_bonus
+
+    def valuation(self, plant):
+        return int(plant.value * (1 + self.markup) + self.output_bonus * plant.output)
+
+
+def _lowest_replaceable(player):
+    """
+    :param player: A PlayerBoard
+    :return: Value of the plant a new one would replace, -1 if the board has room
+    """
+
+    plants = player.get_plants()
+    if len(plants) < player.max_plants:
+        return -1
+
+    return plants[0].key
+
+
+class AuctionEngine(object):
+    """
+    Runs phase 2 of a simulator with auctions between the strategies of its
+    players
+    """
+
+    def __init__(self, sim, strategies):
+        """
+        :param sim: The NaiveResourceAnalysisSim whose phase 2 to run
+        :param strategies: Dictionary of PlayerBoard : BiddingStrategy
+        """
+
+        self.sim = sim
+        self.strategies = strategies
+
+        for strategy in set(strategies.values()):
+            strategy.prepare(sim.config)
+
+    def run(self, must_buy):
+        """
+        Run the auctions of one round
+        :param must_buy: True if every player has to buy a plant (first round)
+        :return: True if the step 3 card was drawn
+        """
+
+        sim = self.sim
+        strategies = self.strategies
+        plant_market = sim.plant_market
+
+        step3_trigger = False
+        bought = False
+
+        remaining = list(sim.players)
+        while remaining:
+
+            actual_market = plant_market.get_actual_market()
+            if not actual_market:
+                break
+
+            starter = remaining[0]
+            plant = strategies[starter].choose_plant(starter, actual_market, must_buy)
+
+            if plant is None:
+                del remaining[0]
+                continue
+
+            winner, price = self.auction(plant, remaining)
+
+            if not winner.spend_elektro(price):
+                raise ValueError("{0} can't pay {1:d} for {2}".format(winner, price, plant))
+
+            remaining.remove(winner)
+            bought = True
+
+            if sim.take_plant(winner, plant):
+                step3_trigger = True
+
+        if not bought and plant_market.get_actual_market():
+            plant_market.remove_lowest()
+            if sim.draw_plant():
+                step3_trigger = True
+
+        return step3_trigger
+
+    def auction(self, plant, bidders):
+        """
+        Auction a plant. The first bidder opens with the face value.
+        :param plant: The plant
+        :param bidders: The players in the auction, in turn order
+        :return: Tuple of (winner, price)
+        """
+
+        strategies = self.strategies
+
+        high_bidder = bidders[0]
+        high_bid = plant.key
+
+        # Bidders take turns in order. Whoever is outbid gets another turn.
+        waiting = deque(bidders[1:])
+        while waiting:
+
+            bidder = waiting.popleft()
+            bid = strategies[bidder].bid(bidder, plant, high_bid)
+
+            if bid > high_bid:
+                waiting.append(high_bidder)
+                high_bidder = bidder
+                high_bid = bid
+
+        return high_bidder, high_bid
@@ -0,0 +1,579 @@
+import numpy as np
+from powergrid import PlantDeck, ResourceMarket, PowerGridSettings, GameStep
+from powergrid import MARKET_ACT_SIZE
+from powergrid.game_config import STEP3_VALUE
+from powergrid.resourcevector import MARKET_RESOURCES, COAL, OIL, HYBRID, RENEWABLE
+
+"""
+    Lockstep batch version of NaiveResourceAnalysisSim.
+
+    Instead of a graph of objects per game, the state of N games is kept in
+    NumPy arrays (one row per game) and every phase of the naive strategy is
+    run as array operations over all games at once:
+
+    a: Resource market fill levels and the pools of resources not in the market
+    a: Plant market of each game (sorted card ids)
+    a: Draw stack of each game (ring buffer of card ids)
+    a: Plants and cities of every player
+
+    Cards are identified by their index in the value-sorted plant list, so
+    sorting card ids sorts plants by value. The step 3 card and the empty
+    slot marker come after every real plant.
+
+    Every game draws its random numbers from its own random.Random, in the
+    same order as NaiveResourceAnalysisSim does. Given the same rng, a game
+    played here is the same game played by the object simulator.
+"""
+
+EMPTY_VALUE = 1000
+
+# Width of the plant market arrays. The market never holds more than
+# the actual + future market.
+MARKET_WIDTH = 8
+
+# Width of the draw stack ring buffers. Must be larger than the whole deck.
+DECK_WIDTH = 64
+
+
+class BatchNaiveResourceAnalysisSim(object):
+
+    def __init__(self, num_players, config, rngs):
+        """
+        Set up a batch of games that will be simulated in lockstep
+
+        :param num_players: Number of players in every game of the batch
+        :param config: The GameConfig shared by every game of the run
+        :param rngs: One random.Random per game. The batch has len(rngs) games.
+        """
+
+        self.num_players = num_players
+        self.num_games = len(rngs)
+        self.rngs = rngs
+
+        self.settings = PowerGridSettings(num_players, config)
+        self.num_profiles = len(config.profiles)
+
+        self._setup_cards(PlantDeck(config))
+        self._setup_resources(ResourceMarket(config))
+        self._setup_games()
+
+
+    def instrument(self, profile):
+        """
+        Record wall time and call counts of the phases and rounds of the batch
+        :param profile: The simulation.instrumentation.SimProfile to record in
+        """
+        profile.attach(self)
+
+
+    def _setup_cards(self, plant_deck):
+        """
+        Build the card tables from the plant deck
+        :param plant_deck: A freshly constructed PlantDeck
+        """
+
+        plants = sorted(plant_deck.base_market + list(plant_deck.deck))
+        card_ids = dict((plant.get_value(), i) for i, plant in enumerate(plants))
+
+        self.step3_card = len(plants)
+        self.empty_card = len(plants) + 1
+
+        # Empty slots are renewable plants that need no fuel and give nothing
+        self.card_value = np.array([p.get_value() for p in plants] + [STEP3_VALUE, EMPTY_VALUE])
+        self.card_type = np.array([int(p.get_resource_type()) for p in plants] + [RENEWABLE, RENEWABLE])
+        self.card_fuel = np.array([p.get_required_fuel() for p in plants] + [0, 0])
+        self.card_output = np.array([p.get_output() for p in plants] + [0, 0])
+
+        # setup_deck takes the last card of the base market and puts it on top
+        self.base_market = [card_ids[p.get_value()] for p in plant_deck.base_market[:-1]]
+        self.top_card = card_ids[plant_deck.base_market[-1].get_value()]
+        self.deck_cards = [card_ids[p.get_value()] for p in plant_deck.deck]
+
+
+    def _setup_resources(self, resource_market):
+        """
+        Build the price tables and initial resource state from a resource market
+        :param resource_market: A freshly constructed ResourceMarket
+        """
+
+        pools = [resource_market.market[resource] for resource in MARKET_RESOURCES]
+
+        self.capacity = np.array([pool.get_total_size() for pool in pools])
+        self.initial_available = np.array([pool.get_available_resources() for pool in pools])
+
+        available_pool = resource_market.get_available_pool()
+        self.initial_supply = np.array([available_pool[resource] for resource in MARKET_RESOURCES])
+
+        self.coal_prices = np.array(pools[COAL].prices)
+        self.oil_prices = np.array(pools[OIL].prices)
+
+        def rate_vector(step):
+            rates = self.settings.replenish_rates[step]
+            return np.array([rates.get(resource, 0) for resource in MARKET_RESOURCES])
+
+        self.step1_rates = rate_vector(GameStep.STEP1)
+        self.step3_rates = rate_vector(GameStep.STEP3)
+
+
+    def _setup_games(self):
+        """
+        Put every game of the batch in its starting state
+        """
+
+        G = self.num_games
+        P = self.num_players
+
+        self.available = np.tile(self.initial_available, (G, 1))
+        self.supply = np.tile(self.initial_supply, (G, 1))
+        self.round_usage = np.zeros((G, len(MARKET_RESOURCES)), dtype=int)
+
+        self.market = np.full((G, MARKET_WIDTH), self.empty_card, dtype=int)
+        self.market[:, :len(self.base_market)] = sorted(self.base_market)
+
+        self.deck = np.full((G, DECK_WIDTH), self.empty_card, dtype=int)
+        self.deck_head = np.zeros(G, dtype=int)
+        self.deck_tail = np.zeros(G, dtype=int)
+
+        self.plants = np.full((G, P, self.settings.max_plants), self.empty_card, dtype=int)
+        self.plant_count = np.zeros((G, P), dtype=int)
+        self.cities = np.zeros((G, P), dtype=int)
+        self.order = np.zeros((G, P), dtype=int)
+
+        self.step3 = np.zeros(G, dtype=bool)
+        self.market_step3 = np.zeros(G, dtype=bool)
+        self.step3_rates_on = np.zeros(G, dtype=bool)
+        self.active = np.ones(G, dtype=bool)
+
+        for g, rng in enumerate(self.rngs):
+
+            # Same draws as PlantDeck.setup_deck and the player profile shuffle
+            cards = list(self.deck_cards)
+            rng.shuffle(cards)
+            cards = [self.top_card] + cards + [self.step3_card]
+
+            self.deck[g, :len(cards)] = cards
+            self.deck_tail[g] = len(cards)
+
+            rng.shuffle(list(range(self.num_profiles)))
+
+
+    def simulate(self):
+        """
+        Run every game of the batch to the end
+        :return: List with the per-round report of each game, in the same
+            format as NaiveResourceAnalysisSim.simulate
+        """
+
+        usage, lengths = self.simulate_arrays()
+
+        reports = []
+        for g in range(self.num_games):
+
+            report = {}
+            for round, available in enumerate(usage[g, :lengths[g]].tolist()):
+                report[round] = dict(zip(MARKET_RESOURCES, available))
+
+            reports.append(report)
+
+        return reports
+
+
+    def simulate_arrays(self):
+        """
+        Run every game of the batch to the end
+        :return: Tuple of (usage, lengths). usage has shape
+            (games, rounds, resources) with the resources available in the
+            market after each round, lengths is the number of rounds reported
+            by each game. Rounds after the end of a game repeat its last value.
+        """
+
+        history = [self.available.copy()]
+        lengths = np.ones(self.num_games, dtype=int)
+        step3_wait = np.zeros(self.num_games, dtype=bool)
+
+        round = 0
+        while self.active.any():
+
+            round += 1
+
+            # Check to redo resupply rates if step 3 happened in phase 5
+            wait = self.step3 & step3_wait & self.active
+            self.step3_rates_on |= wait
+            self.market_step3 |= wait
+
+            self.phase_1(round == 1)
+            self.phase_2()
+            self.phase_3()
+            self.phase_4()
+
+            history.append(self.available.copy())
+            lengths[self.active] = round + 1
+
+            # Check for end of game
+            ended = self.active & (self.cities >= self.settings.end_condition).any(axis=1)
+            self.active &= ~ended
+
+            step3_wait = self.phase_5()
+
+        usage = np.stack(history, axis=1)
+
+        # Repeat the last reported round of games that ended early
+        games = np.arange(self.num_games)[:, None]
+        last = np.minimum(np.arange(usage.shape[1])[None, :], lengths[:, None] - 1)
+        usage = usage[games, last]
+
+        return usage, lengths
+
+
+    def phase_1(self, first_turn):
+        """
+        Arrange player order based on cities/plants
+        If first turn, randomly arrange players
+        """
+
+        if first_turn:
+            for g, rng in enumerate(self.rngs):
+                order = list(range(self.num_players))
+                rng.shuffle(order)
+                self.order[g] = order
+            return
+
+        # Fewest cities first, then lowest most valuable plant. The sort is
+        # stable, like list.sort, so ties keep the current order.
+        games = np.arange(self.num_games)[:, None]
+        players = np.arange(self.num_players)[None, :]
+
+        top = self.plants[games, players, np.maximum(self.plant_count - 1, 0)]
+        key = self.cities * (EMPTY_VALUE + 1) + np.where(self.plant_count > 0, self.card_value[top], -1)
+
+        ordered_key = key[games, self.order]
+        self.order = self.order[games, np.argsort(ordered_key, axis=1, kind='mergesort')]
+
+
+    def phase_2(self):
+
+        games = np.arange(self.num_games)
+        step3_trigger = np.zeros(self.num_games, dtype=bool)
+
+        for turn in range(self.num_players):
+
+            player = self.order[:, turn]
+
+            # Each player takes the most valuable plant of the actual market
+            actual_size = self._actual_size()
+            take = self.active & (actual_size > 0)
+
+            slot = np.maximum(actual_size - 1, 0)
+            plant = self.market[games, slot]
+
+            self.market[take, slot[take]] = self.empty_card
+            self.market.sort(axis=1)
+
+            self._add_plant(take, player, plant)
+
+            # Draw a replacement. The step 3 card goes in the market for now
+            card, drawn = self._draw(take)
+
+            step3_drawn = drawn & (card == self.step3_card)
+            self._shuffle_deck(step3_drawn)
+            step3_trigger |= step3_drawn
+
+            self._add_to_market(drawn, card)
+
+        if step3_trigger.any():
+
+            self._remove_lowest(step3_trigger)
+            self._remove_highest(step3_trigger)
+
+            self.step3 |= step3_trigger
+            self.step3_rates_on |= step3_trigger
+            self.market_step3 |= step3_trigger
+
+
+    def phase_3(self):
+
+        games = np.arange(self.num_games)
+        max_plants = self.settings.max_plants
+        num_fueled_options = np.arange(max_plants + 1)
+
+        for turn in reversed(range(self.num_players)):
+
+            player = self.order[:, turn]
+            plants = self.plants[games, player]
+            count = self.plant_count[games, player]
+
+            plant_type = self.card_type[plants]
+            fuel = self.card_fuel[plants]
+
+            # Fuel demand of the cheapest k plants, for every k
+            fixed = np.zeros((self.num_games, max_plants + 1, len(MARKET_RESOURCES)), dtype=int)
+            for resource in range(len(MARKET_RESOURCES)):
+                fixed[:, 1:, resource] = np.cumsum(fuel * (plant_type == resource), axis=1)
+
+            hybrid = np.zeros((self.num_games, max_plants + 1), dtype=int)
+            hybrid[:, 1:] = np.cumsum(fuel * (plant_type == HYBRID), axis=1)
+
+            # Buy the fuel for as many plants as the market allows, dropping
+            # the most valuable plants first
+            available = self.available[:, None, :]
+            spare_coal_oil = available[:, :, COAL] - fixed[:, :, COAL] + \
+                available[:, :, OIL] - fixed[:, :, OIL]
+
+            feasible = (fixed <= available).all(axis=2) & (hybrid <= spare_coal_oil)
+            feasible &= num_fueled_options[None, :] <= count[:, None]
+
+            num_fueled = max_plants - np.argmax(feasible[:, ::-1], axis=1)
+
+            purchase = fixed[games, num_fueled]
+            hybrid_coal, hybrid_oil = self._merge_hybrid(
+                hybrid[games, num_fueled], purchase[:, COAL], purchase[:, OIL])
+
+            purchase[:, COAL] += hybrid_coal
+            purchase[:, OIL] += hybrid_oil
+            purchase[~self.active] = 0
+
+            self.available -= purchase
+            self.round_usage += purchase
+
+
+    def phase_4(self):
+        """
+        Perform phase 4 actions
+        :return:
+        """
+
+        # Add dummy cities to the player based on the plants they have
+        # in their plant list
+        total_output = self.card_output[self.plants].sum(axis=2)
+        self.cities = np.where(self.active[:, None], np.maximum(self.cities, total_output), self.cities)
+
+        max_cities = self.cities.max(axis=1)
+
+        columns = np.arange(MARKET_WIDTH)[None, :]
+        while True:
+
+            # The actual market is sorted, so the plants to remove are the
+            # first few of it
+            in_actual = columns < self._actual_size()[:, None]
+            small = in_actual & (self.card_value[self.market] <= max_cities[:, None])
+            plants_removed = np.where(self.active, small.sum(axis=1), 0)
+
+            if not plants_removed.any():
+                break
+
+            self.market[columns < plants_removed[:, None]] = self.empty_card
+            self.market.sort(axis=1)
+
+            # We removed x plants, so add them back in. Check for step 3
+            for i in range(plants_removed.max()):
+
+                card, drawn = self._draw(plants_removed > i)
+
+                step3_drawn = drawn & (card == self.step3_card)
+                if step3_drawn.any():
+                    self._remove_lowest(step3_drawn)
+                    self._shuffle_deck(step3_drawn)
+
+                    self.step3 |= step3_drawn
+                    self.step3_rates_on |= step3_drawn
+                    self.market_step3 |= step3_drawn
+
+                self._add_to_market(drawn & ~step3_drawn, card)
+
+
+    def phase_5(self):
+
+        # Power plants. Everything bought in phase 3 is burned and goes back
+        # to the pool of available resources.
+        active = self.active[:, None]
+        self.supply += np.where(active, self.round_usage, 0)
+        self.round_usage[:] = 0
+
+        # Remove highest power plant, or the lowest in step 3
+        self._remove_lowest(self.active & self.step3)
+        removed_plant = self._remove_highest(self.active & ~self.step3)
+        self._add_to_bottom(removed_plant != self.empty_card, removed_plant)
+
+        # Add new plant
+        card, drawn = self._draw(self.active)
+
+        # Check for step 3
+        step3_wait = drawn & (card == self.step3_card)
+        if step3_wait.any():
+            self._remove_lowest(step3_wait)
+            self._shuffle_deck(step3_wait)
+            self.step3 |= step3_wait
+
+        self._add_to_market(drawn & ~step3_wait, card)
+
+        # Re-supply the resource market
+        rates = np.where(self.step3_rates_on[:, None], self.step3_rates, self.step1_rates)
+        rates = np.where(active, np.minimum(rates, self.supply), 0)
+
+        self.available = np.minimum(self.available + rates, self.capacity)
+        self.supply -= rates
+
+        return step3_wait
+
+
+    def _actual_size(self):
+        """
+        Get the size of the actual market of every game
+        :return: Array with the number of plants in each actual market
+        """
+
+        size = (self.market != self.empty_card).sum(axis=1)
+        return np.where(self.market_step3, size, np.minimum(size, MARKET_ACT_SIZE))
+
+
+    def _add_plant(self, mask, player, plant):
+        """
+        Add a plant to a player board, replacing the least valuable plant if
+        the board is full
+        :param mask: Games where a plant is added
+        :param player: The player of each game that gets the plant
+        :param plant: The plant of each game
+        """
+
+        games = np.nonzero(mask)[0]
+        player = player[games]
+
+        board = self.plants[games, player]
+        count = self.plant_count[games, player]
+
+        full = count >= self.settings.max_plants
+        board[np.arange(len(games)), np.where(full, 0, count)] = plant[games]
+        board.sort(axis=1)
+
+        self.plants[games, player] = board
+        self.plant_count[games, player] = np.where(full, count, count + 1)
+
+
+    def _draw(self, mask):
+        """
+        Draw a card from the top of the deck
+        :param mask: Games that draw a card
+        :return: Tuple of (card, drawn). drawn is False where the game didn't
+            draw or the deck was empty
+        """
+
+        drawn = mask & (self.deck_head < self.deck_tail)
+        card = self.deck[np.arange(self.num_games), self.deck_head % DECK_WIDTH]
+
+        self.deck_head += drawn
+
+        return np.where(drawn, card, self.empty_card), drawn
+
+
+    def _add_to_bottom(self, mask, card):
+        """
+        Add cards to the bottom of the deck
+        :param mask: Games that add a card
+        :param card: The card of each game
+        """
+
+        games = np.nonzero(mask)[0]
+        self.deck[games, self.deck_tail[games] % DECK_WIDTH] = card[games]
+        self.deck_tail += mask
+
+
+    def _shuffle_deck(self, mask):
+        """
+        Shuffle the deck of the given games with their own rng
+        :param mask: Games whose deck is shuffled
+        """
+
+        for g in np.nonzero(mask)[0]:
+
+            slots = np.arange(self.deck_head[g], self.deck_tail[g]) % DECK_WIDTH
+            cards = self.deck[g, slots].tolist()
+            self.rngs[g].shuffle(cards)
+            self.deck[g, slots] = cards
+
+
+    def _add_to_market(self, mask, card):
+        """
+        Add cards to the plant market
+        :param mask: Games that add a card
+        :param card: The card of each game
+        """
+
+        # The market is sorted, so the last slot is free if there is room
+        self.market[mask, -1] = card[mask]
+        self.market.sort(axis=1)
+
+
+    def _remove_lowest(self, mask):
+        """
+        Remove the lowest plant from the market
+        :param mask: Games that remove a plant
+        """
+
+        self.market[mask, 0] = self.empty_card
+        self.market.sort(axis=1)
+
+
+    def _remove_highest(self, mask):
+        """
+        Remove the highest plant from the market
+        :param mask: Games that remove a plant
+        :return: The removed plant of each game, the empty card where
+            nothing was removed
+        """
+
+        games = np.arange(self.num_games)
+        size = (self.market != self.empty_card).sum(axis=1)
+        mask = mask & (size > 0)
+
+        slot = np.maximum(size - 1, 0)
+        plant = self.market[games, slot]
+
+        self.market[mask, slot[mask]] = self.empty_card
+
+        return np.where(mask, plant, self.empty_card)
+
+
+    def _merge_hybrid(self, required_fuel, coal_offset, oil_offset):
+        """
+        Fill hybrid demand with the cheapest coal and oil, like
+        ResourceMarket.cheapest_purchase does
+        :param required_fuel: Hybrid fuel needed in each game
+        :param coal_offset: Coal already bought in each game
+        :param oil_offset: Oil already bought in each game
+        :return: Tuple of (coal, oil) arrays to buy for the hybrid demand
+        """
+
+        coal = np.zeros(self.num_games, dtype=int)
+        oil = np.zeros(self.num_games, dtype=int)
+
+        coal_available = self.available[:, COAL]
+        oil_available = self.available[:, OIL]
+
+        for i in range(required_fuel.max()):
+
+            needed = required_fuel > i
+
+            coal_price = self._next_price(self.coal_prices, coal_available, coal_offset + coal)
+            oil_price = self._next_price(self.oil_prices, oil_available, oil_offset + oil)
+
+            # Prefer coal on a tie
+            take_coal = needed & (coal_price <= oil_price)
+            coal += take_coal
+            oil += needed & ~take_coal
+
+        return coal, oil
+
+
+    def _next_price(self, prices, available, offset):
+        """
+        Get the price of the next resource of a track in every game
+        :param prices: Price of every slot of the track
+        :param available: Resources in the market of each game
+        :param offset: Resources already bought in each game
+        :return: The price, or a price higher than any slot if there is none left
+        """
+
+        slot = len(prices) - available + offset
+        in_pool = offset < available
+
+        return np.where(in_pool, prices[np.minimum(slot, len(prices) - 1)], EMPTY_VALUE)
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+from simulation.result_writers import result_file, JOURNAL_EXTENSION
+from simulation.parallel_runner import OBJECT_ENGINE
+
+"""
+    Checkpoints of a run, so a killed run can be resumed.
+
+    Results arrive in simulation order, so the progress of a player count is
+    the number of simulations done plus the state of its writer at that
+    point. The checkpoint is rewritten atomically, so a run killed while
+    saving keeps the previous one.
+
+    a: Seed, number of simulations, format and engine of the run
+    a: Config file of the run and a digest of its settings
+    a: Progress per player count
+
+    m: Load the checkpoint of a results directory
+    m: Record progress
+    m: Record a finished player count
+    m: Save
+"""
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+class Checkpoint(object):
+
+    def __init__(self, results_path, seed, num_sims, format, engine=OBJECT_ENGINE,
+                 config_file=None, config_digest=None, players=None):
+        """
+        :param results_path: Directory the results are stored in
+        :param seed: The seed of the run
+        :param num_sims: Number of simulations per player count
+        :param format: Format of the results, a key of WRITERS
+        :param engine: The engine that runs the simulations, one of ENGINES
+        :param config_file: Path to the config file of the run
+        :param config_digest: The settings_digest of the config file
+        :param players: Progress per player count, from an earlier run
+        """
+
+        self.results_path = results_path
+        self.seed = seed
+        self.num_sims = num_sims
+        self.format = format
+        self.engine = engine
+        self.config_file = config_file
+        self.config_digest = config_digest
+
+        # num_players : {"Done": simulations, "Writer": writer state,
+        #                "Events": event file offset or None, "Finished": bool}
+        self.players = players if players is not None else {}
+
+    def done(self, num_players):
+        """
+        :param num_players: Number of players
+        :return: Number of simulations whose results are safely written
+        """
+        return self.players.get(num_players, {}).get("Done", 0)
+
+    def writer_state(self, num_players):
+        """
+        :param num_players: Number of players
+        :return: State to resume the writer from, None to start a new one
+        """
+        return self.players.get(num_players, {}).get("Writer")
+
+    def events_offset(self, num_players):
+        """
+        :param num_players: Number of players
+        :return: Size of the event log file at the last checkpoint, None if
+            the run doesn't record events
+        """
+        return self.players.get(num_players, {}).get("Events")
+
+    def is_finished(self, num_players):
+        return self.players.get(num_players, {}).get("Finished", False)
+
+    def update(self, num_players, done, writer_state, events_offset=None):
+        """
+        Record progress and save
+        :param num_players: Number of players
+        :param done: Number of simulations written
+        :param writer_state: The state from the checkpoint() of the writer
+        :param events_offset: Size of the flushed event log file, if any
+        """
+
+        self.players[num_players] = {"Done": done, "Writer": writer_state, "Events": events_offset,
+                                     "Finished": False}
+        self.save()
+
+    def finish(self, num_players):
+        """
+        Record that the result of a player count is complete, save, and drop
+        the journal of its writer if it has one
+        :param num_players: Number of players
+        """
+
+        self.players[num_players] = {"Done": self.num_sims, "Writer": None, "Finished": True}
+        self.save()
+
+        journal_file = result_file(self.results_path, num_players, JOURNAL_EXTENSION)
+        if os.path.exists(journal_file):
+            os.remove(journal_file)
+
+    def save(self):
+        """
+        Write the checkpoint to a temporary file and move it in place
+        """
+
+        checkpoint = {
+            "Seed": self.seed,
+            "Simulations": self.num_sims,
+            "Format": self.format,
+            "Engine": self.engine,
+            "Config": self.config_file,
+            "ConfigDigest": self.config_digest,
+            "Players": self.players
+        }
+
+        path = os.path.join(self.results_path, CHECKPOINT_FILE)
+        with open(path + ".tmp", 'w') as f:
+            f.write(json.dumps(checkpoint, indent=2, sort_keys=True))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(results_path):
+    """
+    Load the checkpoint of a results directory
+    :param results_path: Directory the results are stored in
+    :return: Checkpoint
+    """
+
+    with open(os.path.join(results_path, CHECKPOINT_FILE), 'r') as f:
+        checkpoint = json.loads(f.read())
+
+    players = dict((int(num_players), progress) for num_players, progress in checkpoint["Players"].items())
+
+    return Checkpoint(results_path, checkpoint["Seed"], checkpoint["Simulations"],
+                      checkpoint["Format"], checkpoint.get("Engine", OBJECT_ENGINE),
+                      checkpoint.get("Config"), checkpoint.get("ConfigDigest"), players)
+
+
+def settings_digest(config_file):
+    """
+    Digest of the settings of a run: the config file and every file it
+    points to, so an edited settings file is caught as well
+    :param config_file: Path to the config file
+    :return: Hex digest
+    """
+
+    with open(config_file, 'rb') as f:
+        data = f.read()
+
+    digest = hashlib.sha256(data)
+
+    config_path = os.path.dirname(config_file)
+    for key, name in sorted(json.loads(data.decode("utf-8")).items()):
+        with open(os.path.join(config_path, name), 'rb') as f:
+            digest.update(key.encode("utf-8"))
+            digest.update(f.read())
+
+    return digest.hexdigest()
@@ -0,0 +1,252 @@
+import math
+from powergrid.resourcevector import MARKET_RESOURCES
+from simulation.parallel_runner import make_work_units, iter_simulations, DEFAULT_CHUNK_SIZE, OBJECT_ENGINE
+
+"""
+    Sequential early stopping for a run.
+
+    RoundStatistics keeps a running mean and variance (Welford) of the market
+    resources for every round. A run stops once the confidence interval of
+    every round and resource is narrower than a target.
+
+    Like the analyzer, a game that ended before round r counts with its
+    last reported round in round r. The statistics are kept in two parts so
+    a longer game arriving later doesn't mean revisiting the earlier ones:
+
+    a: Statistics of the rounds games actually played, per round
+    a: Statistics of the last round of games, per game length
+
+    m: Add the results of a game
+    m: Mean and confidence interval half-width per round
+    m: Check whether every interval is narrow enough
+"""
+
+# z of a two-sided 95% confidence interval
+DEFAULT_Z = 1.96
+
+# Never stop before this many simulations, so a handful of lucky games
+# can't look converged
+DEFAULT_MIN_SIMS = 100
+
+
+class RunningStats(object):
+    """
+    Count, mean and sum of squared deviations of a vector of values, updated
+    one sample at a time with Welford's method
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, width):
+        """
+        :param width: Number of values in a sample
+        """
+
+        self.count = 0
+        self.mean = [0.0] * width
+        self.m2 = [0.0] * width
+
+    def add(self, values):
+        """
+        Add a sample
+        :param values: Sequence of width values
+        """
+
+        self.count += 1
+        count = self.count
+        mean = self.mean
+        m2 = self.m2
+
+        for i, value in enumerate(values):
+            delta = value - mean[i]
+            mean[i] += delta / count
+            m2[i] += delta * (value - mean[i])
+
+    def merge(self, other):
+        """
+        Combine with the statistics of another set of samples (Chan et al.)
+        :param other: RunningStats of the same width
+        :return: This object
+        """
+
+        if other.count == 0:
+            return self
+
+        count = self.count + other.count
+        for i in range(len(self.mean)):
+            delta = other.mean[i] - self.mean[i]
+            self.mean[i] += delta * other.count / count
+            self.m2[i] += other.m2[i] + delta * delta * self.count * other.count / count
+
+        self.count = count
+        return self
+
+    def copy(self):
+        stats = RunningStats(len(self.mean))
+        stats.count = self.count
+        stats.mean = list(self.mean)
+        stats.m2 = list(self.m2)
+        return stats
+
+    def variance(self):
+        """
+        :return: List of the sample variances, 0 with fewer than two samples
+        """
+
+        if self.count < 2:
+            return [0.0] * len(self.m2)
+
+        return [m2 / (self.count - 1) for m2 in self.m2]
+
+
+class RoundStatistics(object):
+    """
+    Running statistics of the market resources of every round of a run
+    """
+
+    def __init__(self, resources=MARKET_RESOURCES):
+        """
+        :param resources: The resources to track, in order
+        """
+
+        self.resources = tuple(resources)
+        self.count = 0
+
+        # round : RunningStats of the games that played that round
+        self.played = {}
+
+        # number of rounds : RunningStats of the last round of those games
+        self.final = {}
+
+    def add(self, results):
+        """
+        Add the results of a game
+        :param results: The per-round results of the simulation, round : {resource : amount}
+        """
+
+        width = len(self.resources)
+
+        values = None
+        for round in sorted(results):
+            values = [results[round][resource] for resource in self.resources]
+            self.played.setdefault(round, RunningStats(width)).add(values)
+
+        if values is not None:
+            self.final.setdefault(len(results), RunningStats(width)).add(values)
+
+        self.count += 1
+
+    def round_stats(self):
+        """
+        Combine the played rounds with the carried forward last rounds of
+        shorter games
+        :return: Dictionary of round : RunningStats over every game
+        """
+
+        stats = {}
+        for round in sorted(self.played):
+
+            combined = self.played[round].copy()
+            for length, final in self.final.items():
+                if length <= round:
+                    combined.merge(final)
+
+            stats[round] = combined
+
+        return stats
+
+    def intervals(self, z=DEFAULT_Z):
+        """
+        :param z: z score of the confidence level
+        :return: Dictionary of round : (means, half-widths), one entry per resource
+        """
+
+        intervals = {}
+        for round, stats in self.round_stats().items():
+
+            half_widths = [
+                z * math.sqrt(variance / stats.count) if stats.count else float("inf")
+                for variance in stats.variance()
+            ]
+            intervals[round] = (list(stats.mean), half_widths)
+
+        return intervals
+
+    def max_half_width(self, z=DEFAULT_Z):
+        """
+        :param z: z score of the confidence level
+        :return: The widest half-width of any round and resource
+        """
+
+        if self.count < 2:
+            return float("inf")
+
+        return max(max(half_widths) for _, half_widths in self.intervals(z).values())
+
+    def converged(self, target, z=DEFAULT_Z):
+        """
+        :param target: Largest allowed half-width, in resource units
+        :param z: z score of the confidence level
+        :return: True if every confidence interval is narrower than the target
+        """
+        return self.max_half_width(z) <= target
+
+
+def iter_until_converged(num_players, seed, max_sims, config, target, stats=None,
+                         min_sims=DEFAULT_MIN_SIMS, z=DEFAULT_Z, chunk_size=DEFAULT_CHUNK_SIZE,
+                         engine=OBJECT_ENGINE, pool=None, workers=1, profile=None,
+                         events=0.0, event_logs=None):
+    """
+    Run simulations until every confidence interval is narrower than the
+    target, or max_sims simulations ran.
+
+    Convergence is only checked at chunk boundaries, in simulation order, so
+    the simulations that are run don't depend on the number of workers. With
+    a pool, chunks are submitted a batch of workers chunks at a time, which
+    bounds the work thrown away once the run converges.
+
+    :param num_players: Number of players in the simulations
+    :param seed: The seed of the whole run
+    :param max_sims: Most simulations to run
+    :param config: The GameConfig of the run
+    :param target: Largest allowed confidence interval half-width
+    :param stats: RoundStatistics to fill. A new one if None
+    :param min_sims: Don't stop before this many simulations
+    :param z: z score of the confidence level
+    :param chunk_size: Number of simulations per chunk
+    :param engine: The engine that runs the simulations
+    :param pool: A pool from make_pool with the same config, or None
+    :param workers: Number of workers of the pool
+    :param profile: A SimProfile to merge the profiles of the chunks into
+    :param events: Fraction of the games to record an event log of
+    :param event_logs: A dictionary to add the event logs to
+    :return: Generator of (sim_number, results)
+    """
+
+    if stats is None:
+        stats = RoundStatistics()
+
+    work_units = make_work_units(
+        num_players=num_players,
+        seed=seed,
+        num_sims=max_sims,
+        chunk_size=chunk_size,
+        engine=engine,
+        profile=profile is not None,
+        events=events
+    )
+
+    batch_size = max(1, workers) if pool is not None else 1
+
+    for first in range(0, len(work_units), batch_size):
+
+        batch = work_units[first:first + batch_size]
+        chunk_ends = set(work_unit[3] for work_unit in batch)
+
+        for sim_number, results in iter_simulations(batch, config, pool, profile, event_logs, workers):
+
+            stats.add(results)
+            yield sim_number, results
+
+            if sim_number + 1 in chunk_ends and stats.count >= min_sims and stats.converged(target, z):
+                return
@@ -0,0 +1,491 @@
+import random
+import struct
+from collections import namedtuple
+from powergrid import PlantMarket, ResourceMarket, PlayerBoard, PowerGridSettings, GameStep
+from powergrid.powergrid_utils import stream_seed
+
+"""
+    Event logs of single games.
+
+    An EventRecorder wraps the plant market, the resource market and the
+    player boards of one simulator instance, the same way SimProfile does,
+    and appends a fixed-width binary record for every change it sees:
+
+        round (uint16), phase (uint8), player (int8, -1 if none), op (uint8),
+        three int16 arguments
+
+    Cards are stored by value and resources by their ResourceType value, so
+    a game is a few kilobytes. A GameReplay applies the records to fresh
+    components and rebuilds their state at any point of the game without
+    the rng. Simulators that are not recorded pay nothing, so a run can
+    record a small sample of its games.
+
+    Event log files hold one block per recorded game: a header of
+    (simulation index, number of players, number of records) and the records.
+"""
+
+RECORD = struct.Struct("<HBbBhhh")
+HEADER = struct.Struct("<IHI")
+
+# Plant market
+PLANT_ADD = 1
+PLANT_AUCTION = 2
+PLANT_REMOVE_LOWEST = 3
+PLANT_REMOVE_HIGHEST = 4
+PLANT_REMOVE_BELOW = 5
+GAME_STEP = 6
+
+# Resource market
+RESOURCE_BUY = 7
+RESOURCE_RETURN = 8
+RESOURCE_REPLENISH = 9
+
+# Player boards
+PLAYER_ADD_PLANT = 10
+PLAYER_REPLACE_PLANT = 11
+PLAYER_STORE = 12
+PLAYER_PLAN = 13
+PLAYER_ADD_CITIES = 14
+PLAYER_POWER = 15
+PLAYER_EARN = 16
+PLAYER_SPEND = 17
+
+OP_NAMES = {
+    PLANT_ADD : "plant_add",
+    PLANT_AUCTION : "plant_auction",
+    PLANT_REMOVE_LOWEST : "plant_remove_lowest",
+    PLANT_REMOVE_HIGHEST : "plant_remove_highest",
+    PLANT_REMOVE_BELOW : "plant_remove_below",
+    GAME_STEP : "game_step",
+    RESOURCE_BUY : "resource_buy",
+    RESOURCE_RETURN : "resource_return",
+    RESOURCE_REPLENISH : "resource_replenish",
+    PLAYER_ADD_PLANT : "player_add_plant",
+    PLAYER_REPLACE_PLANT : "player_replace_plant",
+    PLAYER_STORE : "player_store",
+    PLAYER_PLAN : "player_plan",
+    PLAYER_ADD_CITIES : "player_add_cities",
+    PLAYER_POWER : "player_power",
+    PLAYER_EARN : "player_earn",
+    PLAYER_SPEND : "player_spend"
+}
+
+# Extra key of the random stream that decides which games are recorded, so
+# it never matches the stream of a game
+SAMPLE_STREAM = 1
+
+PHASES = ("phase_1", "phase_2", "phase_3", "phase_4", "phase_5")
+
+Event = namedtuple("Event", ["round", "phase", "player", "op", "args"])
+
+
+class EventRecorder(object):
+    """
+    Records the events of the game a simulator plays. Attach it after the
+    game is set up (after construction or reset): the plant market and the
+    Elektro of the players at that point are recorded as round 0.
+    """
+
+    def __init__(self):
+
+        self.buffer = bytearray()
+        self.count = 0
+
+        self.round = 0
+        self.phase = 0
+
+        # (object, name, instance attribute it replaced or None)
+        self._wrapped = []
+
+    def attach(self, sim):
+        """
+        Start recording a simulator
+        :param sim: The simulator to record
+        """
+
+        del self.buffer[:]
+        self.count = 0
+        self.round = 0
+        self.phase = 0
+
+        for plant in sim.plant_market.market:
+            self.emit(-1, PLANT_ADD, plant.value)
+
+        for seat, player in enumerate(sim.players):
+            if player.elektro:
+                self.emit(seat, PLAYER_EARN, player.elektro)
+
+        for phase, name in enumerate(PHASES, 1):
+            self._mark_phase(sim, name, phase)
+
+        self._wrap_plant_market(sim.plant_market)
+        self._wrap_resource_market(sim.resource_market)
+
+        # Seats are the order of the players when recording starts, before
+        # phase 1 shuffles them
+        for seat, player in enumerate(sim.players):
+            self._wrap_player(player, seat)
+
+    def detach(self):
+        """
+        Stop recording and put the original methods back
+        :return: The log of the game as bytes
+        """
+
+        for obj, name, previous in reversed(self._wrapped):
+            if previous is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+
+        del self._wrapped[:]
+
+        return bytes(self.buffer)
+
+    def emit(self, player, op, a=0, b=0, c=0):
+        self.buffer += RECORD.pack(self.round, self.phase, player, op, a, b, c)
+        self.count += 1
+
+    def _replace(self, obj, name, function):
+        self._wrapped.append((obj, name, obj.__dict__.get(name)))
+        setattr(obj, name, function)
+
+    def _mark_phase(self, sim, name, phase):
+        """
+        Make a phase of the simulator set the phase (and round) of the records
+        """
+
+        method = getattr(sim, name)
+        recorder = self
+
+        def marked(*args, **kwargs):
+            if phase == 1:
+                recorder.round += 1
+            recorder.phase = phase
+            return method(*args, **kwargs)
+
+        self._replace(sim, name, marked)
+
+    def _wrap_plant_market(self, plant_market):
+
+        emit = self.emit
+
+        add_plant_to_market = plant_market.add_plant_to_market
+        auction_plant = plant_market.auction_plant
+        remove_lowest = plant_market.remove_lowest
+        remove_highest = plant_market.remove_highest
+        remove_plants_below_value = plant_market.remove_plants_below_value
+        set_game_step = plant_market.set_game_step
+
+        def add(plant):
+            if plant is not None:
+                emit(-1, PLANT_ADD, plant.value)
+            return add_plant_to_market(plant)
+
+        def auction(plant):
+            emit(-1, PLANT_AUCTION, plant.value)
+            return auction_plant(plant)
+
+        def lowest():
+            emit(-1, PLANT_REMOVE_LOWEST)
+            return remove_lowest()
+
+        def highest():
+            emit(-1, PLANT_REMOVE_HIGHEST)
+            return remove_highest()
+
+        def below(value):
+            emit(-1, PLANT_REMOVE_BELOW, value)
+            return remove_plants_below_value(value)
+
+        def step(game_step):
+            emit(-1, GAME_STEP, int(game_step))
+            return set_game_step(game_step)
+
+        self._replace(plant_market, "add_plant_to_market", add)
+        self._replace(plant_market, "auction_plant", auction)
+        self._replace(plant_market, "remove_lowest", lowest)
+        self._replace(plant_market, "remove_highest", highest)
+        self._replace(plant_market, "remove_plants_below_value", below)
+        self._replace(plant_market, "set_game_step", step)
+
+    def _wrap_resource_market(self, resource_market):
+
+        emit = self.emit
+
+        buy_multiple = resource_market.buy_multiple
+        add_available_resources = resource_market.add_available_resources
+        replenish_market = resource_market.replenish_market
+
+        def per_resource(op, amounts):
+            for resource, amount in amounts.items():
+                if amount:
+                    emit(-1, op, int(resource), amount)
+
+        def buy(resource_dict):
+            per_resource(RESOURCE_BUY, resource_dict)
+            return buy_multiple(resource_dict)
+
+        def give_back(usage_report):
+            per_resource(RESOURCE_RETURN, usage_report)
+            return add_available_resources(usage_report)
+
+        def replenish(replenish_rates):
+            per_resource(RESOURCE_REPLENISH, replenish_rates)
+            return replenish_market(replenish_rates)
+
+        self._replace(resource_market, "buy_multiple", buy)
+        self._replace(resource_market, "add_available_resources", give_back)
+        self._replace(resource_market, "replenish_market", replenish)
+
+    def _wrap_player(self, player, seat):
+
+        emit = self.emit
+
+        add_plant = player.add_plant
+        replace_plant = player.replace_plant
+        add_resources_to_plant = player.add_resources_to_plant
+        add_resource_usage_to_plan = player.add_resource_usage_to_plan
+        add_cities = player.add_cities
+        power_plants = player.power_plants
+        earn_elektro = player.earn_elektro
+        spend_elektro = player.spend_elektro
+
+        # replace_plant calls add_plant, which is part of the replacement
+        replacing = [False]
+
+        def add(plant):
+            if not replacing[0]:
+                emit(seat, PLAYER_ADD_PLANT, plant.value)
+            return add_plant(plant)
+
+        def replace(new_plant, old_plant):
+            emit(seat, PLAYER_REPLACE_PLANT, new_plant.value, old_plant.value)
+            replacing[0] = True
+            try:
+                return replace_plant(new_plant, old_plant)
+            finally:
+                replacing[0] = False
+
+        def store(plant, resource_type, amount):
+            emit(seat, PLAYER_STORE, plant.value, int(resource_type), amount)
+            return add_resources_to_plant(plant, resource_type, amount)
+
+        def plan(plant, resource_type, amount):
+            emit(seat, PLAYER_PLAN, plant.value, int(resource_type), amount)
+            return add_resource_usage_to_plan(plant, resource_type, amount)
+
+        def cities(city_list):
+            emit(seat, PLAYER_ADD_CITIES, len(city_list))
+            return add_cities(city_list)
+
+        def power(plant_resource_map=None):
+            emit(seat, PLAYER_POWER)
+            return power_plants(plant_resource_map)
+
+        def earn(amount):
+            emit(seat, PLAYER_EARN, amount)
+            return earn_elektro(amount)
+
+        def spend(amount):
+            # Only payments that went through change the board
+            spent = spend_elektro(amount)
+            if spent:
+                emit(seat, PLAYER_SPEND, amount)
+            return spent
+
+        self._replace(player, "add_plant", add)
+        self._replace(player, "replace_plant", replace)
+        self._replace(player, "add_resources_to_plant", store)
+        self._replace(player, "add_resource_usage_to_plan", plan)
+        self._replace(player, "add_cities", cities)
+        self._replace(player, "power_plants", power)
+        self._replace(player, "earn_elektro", earn)
+        self._replace(player, "spend_elektro", spend)
+
+
+def record_game(sim):
+    """
+    Play a game with an EventRecorder attached
+    :param sim: A simulator that is set up for a new game
+    :return: Tuple of (results, log)
+    """
+
+    recorder = EventRecorder()
+    recorder.attach(sim)
+    try:
+        results = sim.simulate()
+    finally:
+        log = recorder.detach()
+
+    return results, log
+
+
+def should_record(seed, num_players, sim_number, rate):
+    """
+    Decide whether a game of a run is recorded. The choice only depends on
+    the game, so it is the same whichever worker plays it.
+    :param seed: The seed of the run
+    :param num_players: Number of players
+    :param sim_number: Index of the simulation
+    :param rate: Fraction of the games to record
+    :return: True if the game should be recorded
+    """
+
+    if rate <= 0:
+        return False
+
+    return random.Random(stream_seed(seed, num_players, sim_number, SAMPLE_STREAM)).random() < rate
+
+
+def iter_events(log):
+    """
+    :param log: The log of a game
+    :return: Generator of Event
+    """
+
+    for round, phase, player, op, a, b, c in RECORD.iter_unpack(log):
+        yield Event(round, phase, player, op, (a, b, c))
+
+
+def format_event(event):
+
+    player = "-" if event.player < 0 else str(event.player)
+    return "{0:>5d} {1:>5d} {2:>6s}  {3:<22s} {4}".format(
+        event.round, event.phase, player, OP_NAMES.get(event.op, str(event.op)), event.args)
+
+
+def write_event_logs(f, num_players, logs):
+    """
+    Append game logs to an open event log file
+    :param f: File opened for binary writing
+    :param num_players: Number of players of the games
+    :param logs: Dictionary of sim_number : log
+    """
+
+    for sim_number in sorted(logs):
+        log = logs[sim_number]
+        f.write(HEADER.pack(sim_number, num_players, len(log) // RECORD.size))
+        f.write(log)
+
+
+def read_event_logs(path):
+    """
+    Read an event log file
+    :param path: Path to the file
+    :return: Dictionary of sim_number : (num_players, log)
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    logs = {}
+    offset = 0
+    while offset + HEADER.size <= len(data):
+
+        sim_number, num_players, count = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+
+        logs[sim_number] = (num_players, data[offset:offset + count * RECORD.size])
+        offset += count * RECORD.size
+
+    return logs
+
+
+class GameReplay(object):
+    """
+    Rebuilds the plant market, resource market and player boards of a
+    recorded game from its log. Players are indexed by seat, their order
+    when recording started.
+    """
+
+    def __init__(self, config, num_players):
+        """
+        :param config: The GameConfig the game was played with
+        :param num_players: Number of players in the game
+        """
+
+        settings = PowerGridSettings(num_players, config)
+
+        self.plant_market = PlantMarket()
+        self.resource_market = ResourceMarket(config)
+        self.players = [PlayerBoard(settings.max_plants, seat) for seat in range(num_players)]
+
+        self.plants = dict((plant.value, plant) for plant in config.plants)
+        self.plants[config.step3_plant.value] = config.step3_plant
+
+        self.round = 0
+        self.phase = 0
+
+    def apply(self, event):
+        """
+        Apply one event
+        :param event: An Event
+        """
+
+        self.round = event.round
+        self.phase = event.phase
+
+        op = event.op
+        a, b, c = event.args
+        plants = self.plants
+
+        if op == PLANT_ADD:
+            self.plant_market.add_plant_to_market(plants[a])
+        elif op == PLANT_AUCTION:
+            self.plant_market.auction_plant(plants[a])
+        elif op == PLANT_REMOVE_LOWEST:
+            self.plant_market.remove_lowest()
+        elif op == PLANT_REMOVE_HIGHEST:
+            self.plant_market.remove_highest()
+        elif op == PLANT_REMOVE_BELOW:
+            self.plant_market.remove_plants_below_value(a)
+        elif op == GAME_STEP:
+            self.plant_market.set_game_step(GameStep(a))
+        elif op == RESOURCE_BUY:
+            self.resource_market.buy(a, b)
+        elif op == RESOURCE_RETURN:
+            self.resource_market.add_available_resources({a: b})
+        elif op == RESOURCE_REPLENISH:
+            self.resource_market.replenish_market({a: b})
+        elif op == PLAYER_ADD_PLANT:
+            self.players[event.player].add_plant(plants[a])
+        elif op == PLAYER_REPLACE_PLANT:
+            self.players[event.player].replace_plant(plants[a], plants[b])
+        elif op == PLAYER_STORE:
+            self.players[event.player].add_resources_to_plant(plants[a], b, c)
+        elif op == PLAYER_PLAN:
+            self.players[event.player].add_resource_usage_to_plan(plants[a], b, c)
+        elif op == PLAYER_ADD_CITIES:
+            self.players[event.player].add_cities([0] * a)
+        elif op == PLAYER_POWER:
+            self.players[event.player].power_plants()
+        elif op == PLAYER_EARN:
+            self.players[event.player].earn_elektro(a)
+        elif op == PLAYER_SPEND:
+            self.players[event.player].spend_elektro(a)
+        else:
+            raise ValueError("Unknown event {0:d}".format(op))
+
+    def run(self, log, round=None, phase=None):
+        """
+        Apply the events of a log up to a point of the game
+        :param log: The log of the game
+        :param round: Stop after this round. None for the whole game
+        :param phase: Stop after this phase of the last round. None for the
+            whole round
+        :return: This replay
+        """
+
+        stop = None
+        if round is not None:
+            stop = (round, phase if phase is not None else len(PHASES))
+
+        for event in iter_events(log):
+
+            if stop is not None and (event.round, event.phase) > stop:
+                break
+
+            self.apply(event)
+
+        return self
@@ -0,0 +1,67 @@
+import argparse
+from powergrid import GameConfig
+from simulation.event_log import read_event_logs, iter_events, format_event, GameReplay
+
+"""
+    Show the events of a recorded game and rebuild its state at any point.
+
+    python -m simulation.event_replay -c config.json -e 4_player_events.bin
+    python -m simulation.event_replay -c config.json -e 4_player_events.bin -g 17 -r 6 -p 3
+"""
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description="Replay recorded games", add_help=True)
+
+    parser.add_argument('-c', dest='config_file', type=str,
+                        help="Path to the config file of the run")
+    parser.add_argument('-e', dest='event_file', type=str,
+                        help="Path to an event log file")
+    parser.add_argument('-g', dest='sim_number', type=int, default=None,
+                        help="Simulation to replay. Lists the recorded games if not given")
+    parser.add_argument('-r', dest='round', type=int, default=None,
+                        help="Stop after this round")
+    parser.add_argument('-p', dest='phase', type=int, default=None,
+                        help="Stop after this phase of the round")
+    parser.add_argument('-q', dest='quiet', action='store_true',
+                        help="Only print the state, not the events")
+
+    args = parser.parse_args()
+
+    logs = read_event_logs(args.event_file)
+
+    if args.sim_number is None:
+        for sim_number in sorted(logs):
+            num_players, log = logs[sim_number]
+            print("Simulation {0:d}: {1:d} players, {2:d} events".format(
+                sim_number, num_players, sum(1 for _ in iter_events(log))))
+
+    else:
+        num_players, log = logs[args.sim_number]
+
+        replay = GameReplay(GameConfig(args.config_file), num_players)
+
+        stop = None
+        if args.round is not None:
+            stop = (args.round, args.phase if args.phase is not None else 5)
+
+        if not args.quiet:
+            print("Round Phase Player  Event                  Arguments")
+            for event in iter_events(log):
+                if stop is not None and (event.round, event.phase) > stop:
+                    break
+                print(format_event(event))
+            print("")
+
+        replay.run(log, args.round, args.phase)
+
+        print("Round {0:d}, phase {1:d}".format(replay.round, replay.phase))
+        print("Actual market: {0}".format(replay.plant_market.get_actual_market()))
+        print("Future market: {0}".format(replay.plant_market.get_future_market()))
+        print("Resource market: {0}".format(list(replay.resource_market.get_market_resources())))
+        print("Available pool: {0}".format(list(replay.resource_market.get_available_pool())))
+
+        for seat, player in enumerate(replay.players):
+            print("Seat {0:d}: {1:d} cities, {2:d} Elektro, plants {3}".format(
+                seat, len(player.get_cities()), player.elektro, player.get_plants()))
@@ -0,0 +1,196 @@
+import time
+
+"""
+    Optional timing and call counts for the simulators.
+
+    Nothing is paid unless a simulator is instrumented. SimProfile.attach
+    replaces the methods of one simulator instance (and of its markets) with
+    timed wrappers, so classes and every other instance stay untouched.
+
+    a: Calls and wall time per method
+    a: Games and wall time per round
+
+    m: Attach to a simulator
+    m: Merge the profile of another worker
+    m: Summary table
+"""
+
+# Methods timed on the simulator itself. phase_1 also marks the start of a round.
+SIM_METHODS = ("simulate", "phase_1", "phase_2", "phase_3", "phase_4", "phase_5")
+
+RESOURCE_MARKET_METHODS = (
+    "cheapest_purchase", "cheapest_hybrid_purchase", "calculate_cost", "calculate_cost_dict",
+    "buy", "buy_multiple", "replenish_market", "add_available_resources", "get_market_resources"
+)
+
+PLANT_MARKET_METHODS = (
+    "add_plant_to_market", "auction_plant", "remove_highest", "remove_lowest",
+    "remove_plants_below_value", "set_game_step"
+)
+
+
+class SimProfile(object):
+    """
+    Timings collected from instrumented simulators. A profile only holds
+    plain dictionaries, so worker profiles can be pickled back to the
+    parent and merged there.
+    """
+
+    def __init__(self):
+
+        # "phase_2", "PlantMarket.auction_plant", ... : [calls, seconds]
+        self.methods = {}
+
+        # round : [games, seconds]
+        self.rounds = {}
+
+        self._round = 0
+        self._round_start = None
+
+    def attach(self, sim):
+        """
+        Instrument a simulator and its resource and plant markets. Methods a
+        simulator doesn't have are skipped, so this works for the batch
+        engine too. The wrappers stay on the instance across resets.
+        :param sim: The simulator to instrument
+        """
+
+        for name in SIM_METHODS:
+            self._wrap(sim, name, name)
+
+        resource_market = getattr(sim, "resource_market", None)
+        if resource_market is not None:
+            for name in RESOURCE_MARKET_METHODS:
+                self._wrap(resource_market, name, "ResourceMarket." + name)
+
+        plant_market = getattr(sim, "plant_market", None)
+        if plant_market is not None:
+            for name in PLANT_MARKET_METHODS:
+                self._wrap(plant_market, name, "PlantMarket." + name)
+
+    def _wrap(self, obj, name, label):
+        """
+        Replace a method of an instance with a timed version
+        :param obj: The instance
+        :param name: Name of the method
+        :param label: Name to record the timings under
+        """
+
+        method = getattr(obj, name, None)
+        if method is None:
+            return
+
+        entry = self.methods.setdefault(label, [0, 0.0])
+        timer = time.perf_counter
+        profile = self
+
+        if name == "simulate":
+            def timed(*args, **kwargs):
+                start = timer()
+                profile._round = 0
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    end = timer()
+                    profile._end_round(end)
+                    entry[0] += 1
+                    entry[1] += end - start
+
+        elif name == "phase_1":
+            def timed(*args, **kwargs):
+                start = timer()
+                profile._end_round(start)
+                profile._round += 1
+                profile._round_start = start
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    entry[0] += 1
+                    entry[1] += timer() - start
+
+        else:
+            def timed(*args, **kwargs):
+                start = timer()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    entry[0] += 1
+                    entry[1] += timer() - start
+
+        setattr(obj, name, timed)
+
+    def _end_round(self, now):
+        """
+        Close the round in progress, if any
+        :param now: The current time
+        """
+
+        if self._round > 0 and self._round_start is not None:
+            entry = self.rounds.setdefault(self._round, [0, 0.0])
+            entry[0] += 1
+            entry[1] += now - self._round_start
+
+        self._round_start = None
+
+    def merge(self, other):
+        """
+        Add the timings of another profile to this one
+        :param other: A SimProfile, e.g. from a worker
+        :return: This profile
+        """
+
+        for table, other_table in ((self.methods, other.methods), (self.rounds, other.rounds)):
+            for key, (calls, seconds) in other_table.items():
+                entry = table.setdefault(key, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+
+        return self
+
+    def summary(self):
+        """
+        Format the timings as a table. Shares are relative to the time spent
+        in simulate. Nested calls are counted in their callers too, e.g.
+        ResourceMarket.cheapest_purchase is part of phase_3.
+        :return: The table as a string
+        """
+
+        total = self.methods.get("simulate", [0, 0.0])[1]
+
+        def share(seconds):
+            return 100.0 * seconds / total if total > 0 else 0.0
+
+        header = "{0:<42s} {1:>10s} {2:>11s} {3:>11s} {4:>7s}".format(
+            "Method", "Calls", "Total (s)", "Mean (us)", "Share")
+        lines = [header, "-" * len(header)]
+
+        def sort_key(label):
+            return (label.count("."), label)
+
+        for label in sorted(self.methods, key=sort_key):
+
+            calls, seconds = self.methods[label]
+            if not calls:
+                continue
+
+            mean = 1e6 * seconds / calls if calls else 0.0
+
+            lines.append("{0:<42s} {1:>10d} {2:>11.3f} {3:>11.1f} {4:>6.1f}%".format(
+                label, calls, seconds, mean, share(seconds)))
+
+        if self.rounds:
+
+            lines.append("")
+            header = "{0:<42s} {1:>10s} {2:>11s} {3:>11s} {4:>7s}".format(
+                "Round", "Games", "Total (s)", "Mean (us)", "Share")
+            lines.extend([header, "-" * len(header)])
+
+            for round in sorted(self.rounds):
+
+                games, seconds = self.rounds[round]
+                mean = 1e6 * seconds / games if games else 0.0
+
+                lines.append("{0:<42d} {1:>10d} {2:>11.3f} {3:>11.1f} {4:>6.1f}%".format(
+                    round, games, seconds, mean, share(seconds)))
+
+        return "\n".join(lines)
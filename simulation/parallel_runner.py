@@ -0,0 +1,232 @@
+import pickle
+import multiprocessing
+from collections import deque
+from functools import partial
+from powergrid.powergrid_utils import spawn_rng, stream_seed
+from simulation.resource_analysis_simulator_naive import NaiveResourceAnalysisSim
+from simulation.resource_analysis_simulator_auction import AuctionResourceAnalysisSim
+from simulation.batch_simulator_naive import BatchNaiveResourceAnalysisSim
+from simulation.instrumentation import SimProfile
+from simulation.event_log import record_game, should_record
+
+"""
+    Helpers to spread simulations over a pool of worker processes.
+
+    Work is handed out in chunks of consecutive simulation indices. Every
+    simulation gets its own random stream keyed by (seed, number of players,
+    simulation index), so the result of a simulation does not depend on which
+    worker ran it or in what order. Chunks are consumed in order, which means that a parallel run
+    produces exactly the same report as a serial one.
+
+    The GameConfig is not part of the work units. Workers of a pool from
+    make_pool unpickle it once when they start.
+"""
+
+DEFAULT_CHUNK_SIZE = 64
+
+# Chunks submitted to a pool per worker at any time. Finished chunks wait in
+# the parent until they are consumed, so a slow writer must not let them
+# pile up.
+CHUNKS_PER_WORKER = 2
+
+# Engines that can run the naive strategy. The batch engine runs a whole
+# chunk in lockstep and plays exactly the same games as the object engine.
+# The auction engine plays the naive games with money and phase 2 auctions.
+OBJECT_ENGINE = "object"
+BATCH_ENGINE = "batch"
+AUCTION_ENGINE = "auction"
+ENGINES = (OBJECT_ENGINE, BATCH_ENGINE, AUCTION_ENGINE)
+
+# Simulator of every engine that plays games one by one
+SIMULATORS = {
+    OBJECT_ENGINE : NaiveResourceAnalysisSim,
+    AUCTION_ENGINE : AuctionResourceAnalysisSim
+}
+
+# The GameConfig of a worker process, set by init_worker
+_worker_config = None
+
+
+def init_worker(pickled_config):
+    """
+    Pool initializer. Unpickle the config every chunk of this worker will use.
+    :param pickled_config: The pickled GameConfig
+    """
+
+    global _worker_config
+    _worker_config = pickle.loads(pickled_config)
+
+
+def make_pool(workers, config):
+    """
+    Create a pool of workers that all hold the config
+    :param workers: Number of worker processes
+    :param config: The GameConfig of the run
+    :return: A multiprocessing pool for iter_simulations
+    """
+
+    pickled_config = pickle.dumps(config, pickle.HIGHEST_PROTOCOL)
+    return multiprocessing.Pool(workers, initializer=init_worker, initargs=(pickled_config,))
+
+
+def run_simulation(num_players, config, seed, sim_number):
+    """
+    Run one seeded simulation. The simulation gets its own random stream,
+    so any single game of a run can be replayed by calling this directly.
+    :param num_players: Number of players in the simulation
+    :param config: The GameConfig of the run
+    :param seed: The seed of the whole run
+    :param sim_number: Index of the simulation
+    :return: The per-round results of the simulation
+    """
+
+    sim = NaiveResourceAnalysisSim(
+        num_players=num_players,
+        config=config,
+        rng=spawn_rng(seed, num_players, sim_number)
+    )
+
+    return sim.simulate()
+
+
+def run_chunk(work_unit, config=None):
+    """
+    Run a chunk of consecutive simulations. This is what the workers execute.
+    :param work_unit: Tuple of (num_players, seed, start, stop, engine, profile, events)
+    :param config: The GameConfig of the run. Defaults to the one of the worker.
+    :return: Tuple of (results, profile, event_logs). results is a list of
+        (sim_number, results) for the chunk, profile is a SimProfile of the
+        chunk if the work unit asks for one, None otherwise. event_logs is a
+        dictionary of sim_number : event log of the games that were recorded.
+    """
+
+    if config is None:
+        config = _worker_config
+
+    num_players, seed, start, stop, engine, profile, events = work_unit
+
+    profile = SimProfile() if profile else None
+    event_logs = {}
+
+    if engine == BATCH_ENGINE:
+        sim = BatchNaiveResourceAnalysisSim(
+            num_players=num_players,
+            config=config,
+            rngs=[spawn_rng(seed, num_players, i) for i in range(start, stop)]
+        )
+        if profile is not None:
+            sim.instrument(profile)
+
+        # Games played in lockstep have no components to record
+        return list(zip(range(start, stop), sim.simulate())), profile, event_logs
+
+    # One simulator plays every game of the chunk. Reseeding it with the
+    # stream of each game gives the same games as fresh simulators.
+    sim_class = SIMULATORS[engine]
+    sim = None
+    results = []
+    for sim_number in range(start, stop):
+
+        if sim is None:
+            sim = sim_class(
+                num_players=num_players,
+                config=config,
+                rng=spawn_rng(seed, num_players, sim_number)
+            )
+            if profile is not None:
+                sim.instrument(profile)
+        else:
+            sim.reset(stream_seed(seed, num_players, sim_number))
+
+        if should_record(seed, num_players, sim_number, events):
+            game, event_logs[sim_number] = record_game(sim)
+        else:
+            game = sim.simulate()
+
+        results.append((sim_number, game))
+
+    return results, profile, event_logs
+
+
+def make_work_units(num_players, seed, num_sims, chunk_size=DEFAULT_CHUNK_SIZE,
+                    engine=OBJECT_ENGINE, profile=False, start=0, events=0.0):
+    """
+    Split a run into chunks of consecutive simulation indices
+    :param num_players: Number of players in the simulations
+    :param seed: The seed of the whole run
+    :param num_sims: Number of simulations to run
+    :param chunk_size: Number of simulations per chunk
+    :param engine: The engine that runs the simulations, one of ENGINES
+    :param profile: If True, every chunk is instrumented and returns a SimProfile
+    :param start: Index of the first simulation, e.g. to resume a run
+    :param events: Fraction of the games to record an event log of. Only the
+        object engine records games.
+    :return: List of work units for run_chunk
+    """
+
+    chunk_size = max(1, chunk_size)
+
+    work_units = []
+    for first in range(start, num_sims, chunk_size):
+        stop = min(first + chunk_size, num_sims)
+        work_units.append((num_players, seed, first, stop, engine, profile, events))
+
+    return work_units
+
+
+def imap_bounded(pool, function, items, in_flight):
+    """
+    Like pool.imap, but with at most in_flight items submitted and not yet
+    consumed. The next item is only submitted once the oldest result is
+    taken, so memory stays bounded however slowly results are consumed.
+    :param pool: A pool from make_pool
+    :param function: The function to apply
+    :param items: Iterable of arguments of the function
+    :param in_flight: Most items submitted at once
+    :return: Generator of the results, in the order of the items
+    """
+
+    in_flight = max(1, in_flight)
+
+    pending = deque()
+    for item in items:
+
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+
+        pending.append(pool.apply_async(function, (item,)))
+
+    while pending:
+        yield pending.popleft().get()
+
+
+def iter_simulations(work_units, config, pool=None, profile=None, event_logs=None, workers=1):
+    """
+    Run the work units and yield the results in simulation order
+    :param work_units: The work units from make_work_units
+    :param config: The GameConfig of the run
+    :param pool: A pool from make_pool with the same config. If None, run
+        everything in this process
+    :param profile: A SimProfile to merge the profiles of the chunks into
+    :param event_logs: A dictionary to add the event logs of the chunks to
+    :param workers: Number of workers of the pool
+    :return: Generator of (sim_number, results)
+    """
+
+    if pool is None:
+        chunks = map(partial(run_chunk, config=config), work_units)
+    else:
+        # Chunks come back in submission order, whichever worker finishes
+        # first, with a few chunks per worker in flight.
+        chunks = imap_bounded(pool, run_chunk, work_units, CHUNKS_PER_WORKER * workers)
+
+    for chunk, chunk_profile, chunk_event_logs in chunks:
+
+        if profile is not None and chunk_profile is not None:
+            profile.merge(chunk_profile)
+
+        if event_logs is not None:
+            event_logs.update(chunk_event_logs)
+
+        for sim_number, results in chunk:
+            yield sim_number, results
@@ -0,0 +1,263 @@
+import itertools
+import json
+from functools import partial
+from powergrid import powergrid_utils
+from powergrid import GameStep
+from powergrid.game_config import STEPS
+from simulation import parallel_runner
+from simulation.parallel_runner import make_work_units, run_chunk, imap_bounded, DEFAULT_CHUNK_SIZE, OBJECT_ENGINE
+from simulation.parallel_runner import CHUNKS_PER_WORKER
+from simulation.early_stopping import RoundStatistics, DEFAULT_Z
+
+"""
+    Parameter sweeps over the settings of one number of players.
+
+    A point of a sweep is a dictionary of parameter : value. Parameters are
+    named like the keys of settings.json:
+
+        MaxPlants, GameEnd
+        Replenish.<step>.<resource> of steps 1 and 3, e.g. Replenish.3.coal
+
+    The engines don't play step 2 or the initial discards, so Regions,
+    Discard, Step2Trigger and the step 2 rates would give the same games at
+    every point. They are rejected.
+
+    Every point is run as a GameConfig variant from GameConfig.with_settings.
+    The variants share the plant cards, resource tracks and payout of the run,
+    and workers only get the parameters of a point, not a config. Every point
+    plays with the same seed, so points are compared on the same random
+    streams.
+
+    Each point is summarized with RoundStatistics and written as one line of
+    JSON keyed by its parameters.
+"""
+
+# settings.json key : PlayerSettings field
+SETTINGS_FIELDS = {
+    "MaxPlants" : "max_plants",
+    "GameEnd" : "end_condition"
+}
+
+# Settings no engine plays by
+IGNORED_SETTINGS = ("Regions", "Discard", "Step2Trigger")
+
+REPLENISH = "Replenish"
+
+# Steps whose replenish rates the engines use
+REPLENISH_STEPS = (GameStep.STEP1, GameStep.STEP3)
+
+# Variants made by this process, by number of players and parameters
+_variants = {}
+
+
+def apply_parameters(config, num_players, parameters):
+    """
+    Make the config of a point
+    :param config: The GameConfig of the run
+    :param num_players: Number of players the parameters are for
+    :param parameters: Dictionary of parameter : value
+    :return: A GameConfig variant
+    """
+
+    settings = config.get_settings(num_players)
+
+    fields = {}
+    replenish = [(step, list(rates)) for step, rates in settings.replenish]
+
+    for name, value in parameters.items():
+
+        if name in SETTINGS_FIELDS:
+            fields[SETTINGS_FIELDS[name]] = value
+            continue
+
+        if name in IGNORED_SETTINGS:
+            raise ValueError("Sweep parameter {0:s} is not used by the engines".format(name))
+
+        parts = name.split(".")
+        if len(parts) != 3 or parts[0] != REPLENISH or parts[1] not in STEPS:
+            raise ValueError("Unknown sweep parameter {0:s}".format(name))
+
+        step = STEPS[parts[1]]
+        if step not in REPLENISH_STEPS:
+            raise ValueError("Sweep parameter {0:s} is not used by the engines".format(name))
+
+        resource = powergrid_utils.resource_type_from_string(parts[2])
+
+        for replenish_step, rates in replenish:
+            if replenish_step != step:
+                continue
+
+            for i, (rate_resource, _) in enumerate(rates):
+                if rate_resource == resource:
+                    rates[i] = (resource, value)
+                    break
+            else:
+                rates.append((resource, value))
+
+    fields["replenish"] = tuple((step, tuple(rates)) for step, rates in replenish)
+
+    return config.with_settings(num_players, **fields)
+
+
+def grid_design(grid):
+    """
+    Every combination of the values of a grid
+    :param grid: Dictionary of parameter : list of values
+    :return: List of points
+    """
+
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_design(ranges, num_points, rng):
+    """
+    Points drawn uniformly from integer ranges
+    :param ranges: Dictionary of parameter : [low, high], both included
+    :param num_points: Number of points to draw
+    :param rng: random.Random to draw with
+    :return: List of points
+    """
+
+    names = sorted(ranges)
+    return [dict((name, rng.randint(*ranges[name])) for name in names) for _ in range(num_points)]
+
+
+def point_key(parameters):
+    """
+    :param parameters: Dictionary of parameter : value
+    :return: Hashable, order independent key of a point
+    """
+    return tuple(sorted(parameters.items()))
+
+
+def run_sweep_chunk(sweep_unit, config=None):
+    """
+    Run a chunk of simulations of one point. This is what the workers execute.
+    :param sweep_unit: Tuple of (point index, parameters, work unit)
+    :param config: The GameConfig of the run. Defaults to the one of the worker.
+    :return: Tuple of (point index, results, profile, event_logs) as for run_chunk
+    """
+
+    point, parameters, work_unit = sweep_unit
+
+    if config is None:
+        config = parallel_runner._worker_config
+
+    # A point is split into several chunks, so keep its variant around
+    key = (id(config), work_unit[0], point_key(parameters))
+    variant = _variants.get(key)
+    if variant is None:
+        _variants.clear()
+        variant = apply_parameters(config, work_unit[0], parameters)
+        _variants[key] = variant
+
+    results, profile, event_logs = run_chunk(work_unit, variant)
+    return point, results, profile, event_logs
+
+
+def make_sweep_units(num_players, seed, num_sims, points, chunk_size=DEFAULT_CHUNK_SIZE,
+                     engine=OBJECT_ENGINE):
+    """
+    Split a sweep into chunks
+    :param num_players: Number of players in the simulations
+    :param seed: The seed of the whole run. Every point uses it.
+    :param num_sims: Number of simulations per point
+    :param points: List of points
+    :param chunk_size: Number of simulations per chunk
+    :param engine: The engine that runs the simulations
+    :return: List of sweep units for run_sweep_chunk
+    """
+
+    sweep_units = []
+    for point, parameters in enumerate(points):
+        for work_unit in make_work_units(num_players, seed, num_sims, chunk_size, engine):
+            sweep_units.append((point, parameters, work_unit))
+
+    return sweep_units
+
+
+def iter_sweep(sweep_units, config, pool=None, workers=1):
+    """
+    Run a sweep and summarize every point
+    :param sweep_units: The sweep units from make_sweep_units
+    :param config: The GameConfig of the run
+    :param pool: A pool from make_pool with the same config. If None, run
+        everything in this process
+    :param workers: Number of workers of the pool
+    :return: Generator of (point index, parameters, RoundStatistics), in point order
+    """
+
+    if pool is None:
+        chunks = map(partial(run_sweep_chunk, config=config), sweep_units)
+    else:
+        chunks = imap_bounded(pool, run_sweep_chunk, sweep_units, CHUNKS_PER_WORKER * workers)
+
+    # Chunks come back in order, so a point is done when the next one starts
+    parameters = dict((point, unit_parameters) for point, unit_parameters, _ in sweep_units)
+
+    current = None
+    stats = None
+    for point, results, _, _ in chunks:
+
+        if point != current:
+            if current is not None:
+                yield current, parameters[current], stats
+            current = point
+            stats = RoundStatistics()
+
+        for _, game in results:
+            stats.add(game)
+
+    if current is not None:
+        yield current, parameters[current], stats
+
+
+def summary_record(num_players, seed, parameters, stats, z=DEFAULT_Z):
+    """
+    :param num_players: Number of players in the simulations
+    :param seed: The seed of the run
+    :param parameters: Dictionary of parameter : value of the point
+    :param stats: RoundStatistics of the point
+    :param z: z score of the confidence intervals
+    :return: JSON serializable summary of a point
+    """
+
+    mean = {}
+    half_width = {}
+    for round, (round_mean, round_half_width) in stats.intervals(z).items():
+        mean[round] = round_mean
+        half_width[round] = round_half_width
+
+    return {
+        "Players": num_players,
+        "Seed": seed,
+        "Parameters": parameters,
+        "Simulations": stats.count,
+        "Resources": [int(resource) for resource in stats.resources],
+        "Mean": mean,
+        "HalfWidth": half_width
+    }
+
+
+def read_design(design_file, rng):
+    """
+    Read a sweep design. The file holds either a grid or a random design:
+
+        {"Players": [3, 4], "Grid": {"MaxPlants": [3, 4], "Replenish.1.coal": [3, 4]}}
+        {"Players": [4], "Random": {"Points": 500, "Ranges": {"GameEnd": [15, 21]}}}
+
+    :param design_file: Path to the design file
+    :param rng: random.Random for random designs
+    :return: Tuple of (list of numbers of players, list of points)
+    """
+
+    with open(design_file, 'r') as f:
+        design = json.loads(f.read())
+
+    if "Grid" in design:
+        points = grid_design(design["Grid"])
+    else:
+        points = random_design(design["Random"]["Ranges"], design["Random"]["Points"], rng)
+
+    return design["Players"], points
@@ -1,64 +1,144 @@
-import json
-import os
-from random import shuffle
+import random
 from powergrid import PlayerBoard, PlantDeck, PlantMarket, ResourceType, ResourceMarket, PowerGridSettings, GameStep
 
+
 class PowerGridSimulator(object):
 
-    def __init__(self, num_players, config_file):
+    def __init__(self, num_players, config, rng=None):
         """
         The simulator that will track resource usage and cost over time
 
         :param num_players: Number of players in this simulation
-        :param settings_file: Path to the game settings file
-        :param resource_file: Path to resource file
-        :param plant_deck_file: Path to the plant deck file
-        :param player_file: Path to the player names file (optional)
+        :param config: The GameConfig shared by every game of the run
+        :param rng: The random.Random driving every random decision of this
+            game. Use powergrid_utils.spawn_rng for reproducible runs.
         """
 
-        config_path = os.path.dirname(config_file)
-        with open(config_file, 'r') as f:
-            config_map = json.loads(f.read())
+        if rng is None:
+            rng = random.Random()
 
-            settings_file = os.path.join(config_path, config_map["MainSettings"])
-            resource_file = os.path.join(config_path, config_map["InitResources"])
-            plant_deck_file = os.path.join(config_path, config_map["PlantDeck"])
-            player_file = os.path.join(config_path, config_map["Players"])
-            payout_file = os.path.join(config_path, config_map["Payout"])
+        self.rng = rng
 
+        self.config = config
         self.num_players = num_players
 
-        self.settings = PowerGridSettings(num_players, settings_file)
-
-        self.resource_file = resource_file
+        self.settings = PowerGridSettings(num_players, config)
 
-        self.plant_deck = PlantDeck(plant_deck_file)
+        self.plant_deck = PlantDeck(config, self.rng)
         self.plant_market = PlantMarket()
+        self.resource_market = ResourceMarket(config)
+
+        self.players = []
+        for _ in range(num_players):
+            self.players.append(PlayerBoard(self.settings.max_plants))
+
+        self.start_game()
+
+
+    def reset(self, seed=None):
+        """
+        Put the simulator back to the start of a new game. Every object is
+        reused, so a worker can play game after game without rebuilding them.
+
+        :param seed: Reseed the rng with this before setting up the game. A
+            simulator reset with powergrid_utils.stream_seed(...) plays the
+            same game as a fresh one built with spawn_rng(...). If None, the
+            rng just carries on.
+        """
+
+        if seed is not None:
+            self.rng.seed(seed)
+
+        self.plant_deck.reset()
+        self.plant_market.reset()
+        self.resource_market.reset()
+
+        self.start_game()
+
+
+    def start_game(self):
+        """
+        Set up the plant market and the players for the first round
+        """
 
         self.current_step = GameStep.STEP1
         self.replenish_rates = self.settings.replenish_rates[self.current_step]
 
-        self.resource_market = ResourceMarket(resource_file)
         self.initialize_plant_market()
 
         # These players don't actually mean anything, but we need it to know which
         # player was which.
-        player_list = list(range(num_players))
-        if player_file is not None:
-            with open(player_file, 'r') as f:
-                profiles = json.loads(f.read())
+        player_list = list(range(self.num_players))
+        if self.config.profiles:
 
-                # Shuffle the players around then get the first few
-                shuffle(profiles)
-                player_list = profiles[0:num_players]
+            # Shuffle the players around then get the first few
+            profiles = list(self.config.profiles)
+            self.rng.shuffle(profiles)
+            player_list = profiles[0:self.num_players]
 
-        self.players = []
-        for player in player_list:
-            self.players.append(PlayerBoard(self.settings.max_plants, player))
+        for player, player_id in zip(self.players, player_list):
+            player.reset(player_id)
 
         self.results = {}
 
 
+    def snapshot(self, rng=False):
+        """
+        Get the state of the game, e.g. to explore moves from it and come
+        back. The state holds immutable encodings of every component, so it
+        stays valid however the game goes on, and can be restored many times.
+
+        :param rng: Include the state of the rng. Without it, games restored
+            from the same snapshot can play out differently.
+        :return: The state
+        """
+
+        return (
+            self.plant_deck.snapshot(),
+            self.plant_market.snapshot(),
+            self.resource_market.snapshot(),
+            tuple(self.players),
+            tuple([player.snapshot() for player in self.players]),
+            self.current_step,
+            self.replenish_rates,
+            tuple(self.results.items()),
+            self.rng.getstate() if rng else None
+        )
+
+    def restore(self, state):
+        """
+        Put the game back to a snapshot of this simulator
+        :param state: A state from snapshot()
+        """
+
+        (deck, plant_market, resource_market, players, player_states,
+         self.current_step, self.replenish_rates, results, rng_state) = state
+
+        self.plant_deck.restore(deck)
+        self.plant_market.restore(plant_market)
+        self.resource_market.restore(resource_market)
+
+        # The turn order is the order of the board objects
+        self.players[:] = players
+        for player, player_state in zip(players, player_states):
+            player.restore(player_state)
+
+        self.results = dict(results)
+
+        if rng_state is not None:
+            self.rng.setstate(rng_state)
+
+
+    def instrument(self, profile):
+        """
+        Record wall time and call counts of the phases, the markets and every
+        round in a profile. Only this instance is changed, so simulators that
+        are not instrumented run at full speed.
+        :param profile: The simulation.instrumentation.SimProfile to record in
+        """
+        profile.attach(self)
+
+
     def initialize_plant_market(self):
 
         base_market = self.plant_deck.setup_deck()
@@ -107,32 +187,6 @@ class PowerGridSimulator(object):
             self.replenish_rates = self.settings.replenish_rates[GameStep.STEP3]
 
 
-    def determine_hybrid_combinations(self, required_fuel):
-        """
-        Determine all combinations of fuel that will satisfy the hybrid fuel requirement
-        :param required_fuel: The amount of fuel needed to power the plant
-        :return: All combinations of conditions to satisfy the fuel reqs
-        """
-
-        hybrid_combinations =  []
-        rsc_usage = {
-            ResourceType.COAL: 0,
-            ResourceType.OIL: 0
-        }
-        for coal_usage in range(1, required_fuel + 1):
-
-            rsc_usage[ResourceType.COAL] = coal_usage
-            rsc_usage[ResourceType.OIL] = required_fuel - coal_usage
-            hybrid_combinations.append(rsc_usage)
-
-            if coal_usage != required_fuel - coal_usage:
-                rsc_usage[ResourceType.COAL] = required_fuel - coal_usage
-                rsc_usage[ResourceType.OIL] = coal_usage
-                hybrid_combinations.append(rsc_usage)
-
-        return hybrid_combinations
-
-
     def check_game_end(self):
         """
         Check if condition met to end the game
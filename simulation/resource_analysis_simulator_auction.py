@@ -0,0 +1,53 @@
+from simulation.resource_analysis_simulator_naive import NaiveResourceAnalysisSim
+from simulation.auction import AuctionEngine, ValueStrategy, STARTING_ELEKTRO
+
+
+class AuctionResourceAnalysisSim(NaiveResourceAnalysisSim):
+
+    # Players pay for plants and resources and earn income
+    use_money = True
+
+    def __init__(self, num_players, config, rng=None, strategies=None):
+        """
+        The naive simulator with phase 2 auctions between bidding strategies
+
+        :param num_players: Number of players in this simulation
+        :param config: The GameConfig shared by every game of the run
+        :param rng: The random.Random driving every random decision of this game
+        :param strategies: List of a BiddingStrategy per player. Every player
+            uses the same ValueStrategy if None.
+        """
+
+        if strategies is None:
+            strategies = [ValueStrategy()] * num_players
+
+        if len(strategies) != num_players:
+            raise ValueError("Expected {0:d} strategies, got {1:d}".format(num_players, len(strategies)))
+
+        self.strategies = strategies
+        self.first_turn = True
+
+        NaiveResourceAnalysisSim.__init__(self, num_players, config, rng)
+
+        # Boards are reused by every game, so the strategies stick to them
+        self.auction_engine = AuctionEngine(self, dict(zip(self.players, strategies)))
+
+
+    def start_game(self):
+
+        NaiveResourceAnalysisSim.start_game(self)
+
+        for player in self.players:
+            player.earn_elektro(STARTING_ELEKTRO)
+
+
+    def phase_1(self, first_turn):
+
+        self.first_turn = first_turn
+        NaiveResourceAnalysisSim.phase_1(self, first_turn)
+
+
+    def phase_2(self):
+
+        # Everybody has to buy a plant in the first round
+        self.finish_phase_2(self.auction_engine.run(self.first_turn))
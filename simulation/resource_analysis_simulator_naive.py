@@ -1,22 +1,25 @@
 import json
 import os
-from random import shuffle
 from powergrid import PlayerBoard, PlantDeck, PlantMarket, ResourceType, ResourceMarket, PowerGridSettings, GameStep
+from powergrid import ResourceVector
+from powergrid.resourcevector import COAL, OIL, RENEWABLE, HYBRID
 from simulation import PowerGridSimulator
 
 class NaiveResourceAnalysisSim(PowerGridSimulator):
 
-    def __init__(self, num_players, config_file):
+    # Whether players pay for resources and earn income. The naive players
+    # assume they always have enough Elektro.
+    use_money = False
+
+    def __init__(self, num_players, config, rng=None):
         """
         The simulator that will track resource usage and cost over time
 
         :param num_players: Number of players in this simulation
-        :param settings_file: Path to the game settings file
-        :param resource_file: Path to resource file
-        :param plant_deck_file: Path to the plant deck file
-        :param player_file: Path to the player names file (optional)
+        :param config: The GameConfig shared by every game of the run
+        :param rng: The random.Random driving every random decision of this game
         """
-        PowerGridSimulator.__init__(num_players, config_file)
+        PowerGridSimulator.__init__(self, num_players, config, rng)
 
 
     def simulate(self):
@@ -27,17 +30,8 @@ class NaiveResourceAnalysisSim(PowerGridSimulator):
         step_3_wait = False
         round = 0
 
-        cost_report = {
-            ResourceType.COAL : 0,
-            ResourceType.OIL : 0,
-            ResourceType.TRASH : 0,
-            ResourceType.URANIUM : 0
-        }
-
-        for resource, cost in cost_report.items():
-            cost_report[resource] = self.resource_market.get_available_resources(resource)
-
-        self.results[round] = cost_report.copy()
+        # Reports only become dictionaries here, on their way out
+        self.results[round] = self.resource_market.get_market_resources().to_dict()
 
 
 
@@ -73,11 +67,7 @@ class NaiveResourceAnalysisSim(PowerGridSimulator):
             self.phase_4()
 
 
-            for resource, cost in cost_report.items():
-                cost_report[
-                    resource] = self.resource_market.get_available_resources(
-                    resource)
-            self.results[round] = cost_report.copy()
+            self.results[round] = self.resource_market.get_market_resources().to_dict()
 
             # Check for end of game
             if self.check_game_end():
@@ -101,7 +91,7 @@ class NaiveResourceAnalysisSim(PowerGridSimulator):
         If first turn, randomly arrange players
         """
         if first_turn:
-            shuffle(self.players)
+            self.rng.shuffle(self.players)
         else:
             self.players.sort()
 
@@ -121,28 +111,61 @@ class NaiveResourceAnalysisSim(PowerGridSimulator):
 
             plant = actual_market[-1]
 
-            self.plant_market.auction_plant(plant)
+            if self.take_plant(player, plant):
+                step3_trigger = True
 
-            # First try to add the plant
-            if len(player.get_plants()) < self.settings.max_plants:
-                player.add_plant(plant)
-            else:
-                # If we can't add it, we have to replace. Replace
-                # the least valuable plant.
-                current_plants = player.get_plants()
-                old_plant = current_plants[0]
+        self.finish_phase_2(step3_trigger)
 
-                player.replace_plant(plant, old_plant)
 
-            # Draw a replacement
-            card = self.plant_deck.draw()
+    def take_plant(self, player, plant):
+        """
+        Move a plant from the market to a player's board and draw a
+        replacement
+        :param player: The player that bought the plant
+        :param plant: The plant
+        :return: True if the replacement was the step 3 card
+        """
 
-            # Again, step 3 check.
-            if card is not None and card.is_step3():
-                self.plant_deck.shuffle()
-                step3_trigger = True
+        self.plant_market.auction_plant(plant)
+
+        # First try to add the plant
+        if len(player.get_plants()) < self.settings.max_plants:
+            player.add_plant(plant)
+        else:
+            # If we can't add it, we have to replace. Replace
+            # the least valuable plant.
+            current_plants = player.get_plants()
+            old_plant = current_plants[0]
 
-            self.plant_market.add_plant_to_market(card)
+            player.replace_plant(plant, old_plant)
+
+        return self.draw_plant()
+
+
+    def draw_plant(self):
+        """
+        Draw a plant from the deck into the market
+        :return: True if it was the step 3 card
+        """
+
+        card = self.plant_deck.draw()
+
+        # Step 3 check
+        step3_trigger = False
+        if card is not None and card.is_step3():
+            self.plant_deck.shuffle()
+            step3_trigger = True
+
+        self.plant_market.add_plant_to_market(card)
+
+        return step3_trigger
+
+
+    def finish_phase_2(self, step3_trigger):
+        """
+        Move to step 3 if the step 3 card came up during phase 2
+        :param step3_trigger: True if it did
+        """
 
         if step3_trigger:
 
@@ -158,53 +181,70 @@ class NaiveResourceAnalysisSim(PowerGridSimulator):
 
         for player in reversed(self.players):
 
-            # For each plant in a player's board, we want to add minimum needed fuel
-            for plant in player.get_plants():
+            # Buy the fuel for all plants at once, so the player gets the
+            # cheapest combination of resources. If the market can't fuel every
+            # plant, drop the most valuable ones until it can.
+            plants = player.get_plants()
+            num_fueled = len(plants)
+            purchase = None
+            while num_fueled > 0:
 
-                # Check fuel type and required fuel (handle hybrids later)
-                resource_type = plant.get_resource_type()
-                fuel_required = plant.get_required_fuel()
+                demand = player.get_fuel_demand(plants[:num_fueled])
+                purchase, hybrid_mix, cost = self.resource_market.cheapest_purchase(demand)
 
-                plant_cost = 0
+                if purchase is not None:
+                    if not self.use_money or player.spend_elektro(cost):
+                        break
+                    purchase = None
 
-                if resource_type == ResourceType.HYBRID:
+                num_fueled -= 1
 
-                    hybrid_sols = self.determine_hybrid_combinations(fuel_required)
+            # If it is not possible to buy them, do not.
+            if purchase is None:
+                continue
 
-                    # find the lowest cost of all solutions
-                    min_cost = 1000
-                    used_solution = {}
-                    for solution in hybrid_sols:
+            # Actually buy the resources to remove them from the market
+            self.resource_market.buy_multiple(purchase)
 
-                        cost = self.resource_market.calculate_cost_dict(solution)
+            # Hand out the hybrid share of coal and oil, coal first
+            hybrid_coal = hybrid_mix[COAL]
 
-                        if cost < min_cost:
-                            used_solution = solution
-                            min_cost = cost
+            for plant in plants[:num_fueled]:
 
-                    self.resource_market.buy_multiple(used_solution)
+                resource_type = plant.get_resource_type()
+                fuel_required = plant.get_required_fuel()
+
+                if resource_type == HYBRID:
+
+                    coal = min(hybrid_coal, fuel_required)
+                    hybrid_coal -= coal
 
-                    # Now that we have the solution to use, just add it to the plant
-                    for resource, amount in used_solution.items():
+                    fuel = ((COAL, coal), (OIL, fuel_required - coal))
 
-                        player.add_resources_to_plant(plant, resource, amount)
-                        player.add_resource_usage_to_plan(plant, resource, amount)
+                elif resource_type != RENEWABLE:
 
-                    plant_cost = min_cost
+                    fuel = ((resource_type, fuel_required),)
 
-                elif resource_type != ResourceType.RENEWABLE:
+                else:
+                    continue
 
-                    # Note the cost for analysis
-                    plant_cost = self.resource_market.calculate_cost(resource_type, fuel_required)
+                # Add to storage
+                for resource, amount in fuel:
 
-                    # Actually buy the resources to remove them from the market
-                    self.resource_market.buy(resource_type, fuel_required)
+                    player.add_resources_to_plant(plant, resource, amount)
+                    player.add_resource_usage_to_plan(plant, resource, amount)
 
-                    # Add to storage
-                    player.add_resources_to_plant(plant, resource_type, fuel_required)
-                    player.add_resource_usage_to_plan(plant, resource_type, fuel_required)
 
+    def income(self, player, cities_powered):
+        """
+        Get the income of a player in phase 5
+        :param player: The player
+        :param cities_powered: Number of cities the player's plants can power
+        :return: The payout for the cities the player owns and powers
+        """
 
+        payout = self.settings.payout
+        return payout[min(cities_powered, player.get_num_cities(), len(payout) - 1)]
 
 
     def phase_4(self):
@@ -252,21 +292,17 @@ class NaiveResourceAnalysisSim(PowerGridSimulator):
     def phase_5(self):
 
         step_3_wait = False
-        usage_report = {
-            ResourceType.COAL: 0,
-            ResourceType.OIL: 0,
-            ResourceType.TRASH: 0,
-            ResourceType.URANIUM: 0
-        }
+        usage_report = ResourceVector()
         for player in self.players:
 
             # Use previously generated usage plans to power plants
             report, cities_powered = player.power_plants()
-            # player.earn_elektro(self.settings.payout[cities_powered])
+
+            if self.use_money:
+                player.earn_elektro(self.income(player, cities_powered))
 
             # Update how many resources can go back in the pool
-            for resource, usage in report.items():
-                usage_report[resource] += usage
+            usage_report.add(report)
 
         # Remove highest power plant
         if self.current_step == GameStep.STEP3:
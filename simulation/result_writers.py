@@ -0,0 +1,361 @@
+import json
+import os
+import numpy as np
+from powergrid import ResourceType
+
+"""
+    Writers that store the per-round reports of a run, one writer per
+    number of players.
+
+    m: Write the report of one simulation
+    m: Checkpoint (state to resume from)
+    m: Close (finish the file)
+
+    Resuming: checkpoint() flushes everything written so far and returns a
+    small JSON serializable state. A writer created with resume=state picks
+    up exactly there, and drops whatever a killed run wrote after it. The
+    JSON and npy writers only write their result when they are closed, so
+    they journal every record to an NDJSON file next to the result and
+    replay it on resume.
+"""
+
+DEFAULT_FLUSH_EVERY = 100
+
+# Extension of the journal of the JSON and npy writers
+JOURNAL_EXTENSION = "journal"
+
+# Extension of the scratch file the npy writer streams rounds to
+ROWS_EXTENSION = "rows"
+
+# Games padded at once when the npy writer assembles its result
+PAD_BLOCK = 4096
+
+# Order of the resource axis of the binary result arrays
+RESOURCES = (ResourceType.COAL, ResourceType.OIL, ResourceType.TRASH, ResourceType.URANIUM)
+
+
+class JournaledResultWriter(object):
+    """
+    Base of the writers that only write their result when closed. With
+    journal=True every record is also streamed to {n}_player_usage.journal,
+    which is what checkpoints point into. Closing the writer keeps the
+    journal: a run removes it once its checkpoint records the result as
+    finished, so a run killed in between can still resume.
+    """
+
+    def __init__(self, results_path, num_players, seed, journal=False, resume=None):
+        """
+        :param results_path: Directory to store results in
+        :param num_players: Number of players in the simulations
+        :param seed: The seed of the run
+        :param journal: Journal every record so the writer can be checkpointed
+        :param resume: State from checkpoint() of an earlier run to continue
+        """
+
+        self.journal = None
+        if journal or resume is not None:
+
+            journal_file = result_file(results_path, num_players, JOURNAL_EXTENSION)
+            for sim_number, results in read_journal(journal_file, resume):
+                self.add(sim_number, results)
+
+            self.journal = NdjsonResultWriter(
+                results_path, num_players, seed, resume=resume, report_file=journal_file)
+
+    def write(self, sim_number, results):
+        """
+        Add the report of a simulation
+        :param sim_number: Index of the simulation
+        :param results: The per-round results of the simulation
+        """
+
+        self.add(sim_number, results)
+
+        if self.journal is not None:
+            self.journal.write(sim_number, results)
+
+    def checkpoint(self):
+        """
+        :return: The state of the journal
+        """
+
+        if self.journal is None:
+            raise ValueError("Only a writer with a journal can be checkpointed")
+
+        return self.journal.checkpoint()
+
+    def close(self):
+        """
+        Write the result and close the journal
+        """
+
+        self.finish()
+
+        if self.journal is not None:
+            self.journal.close()
+
+
+class JsonResultWriter(JournaledResultWriter):
+    """
+    Collect every simulation and write {n}_player_usage.json at the end,
+    as one indented JSON document.
+    """
+
+    extension = "json"
+
+    def __init__(self, results_path, num_players, seed, journal=False, resume=None):
+        """
+        :param results_path: Directory to store results in
+        :param num_players: Number of players in the simulations
+        :param seed: The seed of the run
+        :param journal: Journal every record so the writer can be checkpointed
+        :param resume: State from checkpoint() of an earlier run to continue
+        """
+
+        self.report_file = result_file(results_path, num_players, self.extension)
+
+        self.full_report = {}
+        self.full_report["Players"] = num_players
+        self.full_report["Seed"] = seed
+        self.full_report["Results"] = {}
+
+        JournaledResultWriter.__init__(self, results_path, num_players, seed, journal, resume)
+
+    def add(self, sim_number, results):
+        self.full_report["Results"][sim_number] = results
+
+    def finish(self):
+        """
+        Write everything to disk
+        """
+
+        with open(self.report_file, 'w') as f:
+            f.write(json.dumps(self.full_report, indent=2))
+
+
+class NdjsonResultWriter(object):
+    """
+    Append one compact JSON record per simulation to {n}_player_usage.ndjson
+    as soon as it finishes. Nothing is kept in memory, and a run that gets
+    killed keeps every record flushed so far.
+
+    Each line looks like
+        {"Players": 3, "Seed": 7, "Simulation": 0, "Results": {"0": {...}, ...}}
+    """
+
+    extension = "ndjson"
+
+    def __init__(self, results_path, num_players, seed, flush_every=DEFAULT_FLUSH_EVERY,
+                 journal=False, resume=None, report_file=None):
+        """
+        :param results_path: Directory to store results in
+        :param num_players: Number of players in the simulations
+        :param seed: The seed of the run
+        :param flush_every: Flush the file after this many records
+        :param journal: Unused. The file is its own journal.
+        :param resume: State from checkpoint() of an earlier run to continue
+        :param report_file: Write to this file instead of {n}_player_usage.ndjson
+        """
+
+        if report_file is None:
+            report_file = result_file(results_path, num_players, self.extension)
+
+        self.report_file = report_file
+
+        self.num_players = num_players
+        self.seed = seed
+        self.flush_every = max(1, flush_every)
+        self.unflushed = 0
+
+        if resume is None:
+            self.file = open(self.report_file, 'w')
+        else:
+            # Drop anything written after the checkpoint
+            self.file = open(self.report_file, 'r+')
+            self.file.truncate(resume["Offset"])
+            self.file.seek(resume["Offset"])
+
+    def write(self, sim_number, results):
+        """
+        Append the report of a simulation
+        :param sim_number: Index of the simulation
+        :param results: The per-round results of the simulation
+        """
+
+        record = {
+            "Players": self.num_players,
+            "Seed": self.seed,
+            "Simulation": sim_number,
+            "Results": results
+        }
+
+        self.file.write(json.dumps(record, separators=(',', ':')))
+        self.file.write('\n')
+
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.file.flush()
+            self.unflushed = 0
+
+    def checkpoint(self):
+        """
+        Flush every record written so far
+        :return: State to resume from
+        """
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unflushed = 0
+
+        return {"Offset": self.file.tell()}
+
+    def close(self):
+        """
+        Flush and close the file
+        """
+        self.file.close()
+
+
+class NpyResultWriter(JournaledResultWriter):
+    """
+    Store the results as dense integer arrays that can be memory-mapped:
+
+        {n}_player_usage.npy   int16, (simulations x rounds x resources).
+                               Rounds after the end of a game repeat its
+                               last round.
+        {n}_player_rounds.npy  int16, number of rounds reported by each game
+        {n}_player_meta.json   Players, seed, shapes and axis order
+
+    The rounds of every game are streamed to a {n}_player_usage.rows scratch
+    file as they arrive, so only the game lengths stay in memory. Closing
+    the writer pads them into the usage array, a block of games at a time,
+    and removes the scratch file.
+    """
+
+    extension = "npy"
+    dtype = np.int16
+
+    def __init__(self, results_path, num_players, seed, journal=False, resume=None):
+        """
+        :param results_path: Directory to store results in
+        :param num_players: Number of players in the simulations
+        :param seed: The seed of the run
+        :param journal: Journal every record so the writer can be checkpointed
+        :param resume: State from checkpoint() of an earlier run to continue
+        """
+
+        self.report_file = result_file(results_path, num_players, self.extension)
+        self.rounds_file = os.path.join(results_path, "{0:d}_player_rounds.npy".format(num_players))
+        self.meta_file = os.path.join(results_path, "{0:d}_player_meta.json".format(num_players))
+
+        self.rows_file = result_file(results_path, num_players, ROWS_EXTENSION)
+
+        self.num_players = num_players
+        self.seed = seed
+
+        # Number of rounds of every game, in the order of the rows file
+        self.lengths = []
+        self.rows = open(self.rows_file, 'wb')
+
+        JournaledResultWriter.__init__(self, results_path, num_players, seed, journal, resume)
+
+    def add(self, sim_number, results):
+
+        rounds = [[results[round][resource] for resource in RESOURCES] for round in sorted(results)]
+        self.rows.write(np.array(rounds, dtype=self.dtype).tobytes())
+        self.lengths.append(len(rounds))
+
+    def finish(self):
+        """
+        Pad every game to the longest one and write the arrays to disk
+        """
+
+        self.rows.close()
+
+        lengths = np.array(self.lengths, dtype=self.dtype)
+        num_games = len(lengths)
+        max_rounds = int(lengths.max()) if num_games else 0
+        shape = (num_games, max_rounds, len(RESOURCES))
+
+        if num_games == 0:
+            np.save(self.report_file, np.empty(shape, dtype=self.dtype))
+        else:
+            rows = np.memmap(self.rows_file, dtype=self.dtype, mode='r',
+                             shape=(int(lengths.sum(dtype=np.int64)), len(RESOURCES)))
+            usage = np.lib.format.open_memmap(self.report_file, mode='w+', dtype=self.dtype, shape=shape)
+
+            # First row of every game, and the rows of its rounds with the
+            # last one repeated past its end
+            starts = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)[:-1]))
+            offsets = np.arange(max_rounds)
+
+            for first in range(0, num_games, PAD_BLOCK):
+                block = slice(first, first + PAD_BLOCK)
+                index = starts[block, None] + np.minimum(offsets, lengths[block, None] - 1)
+                usage[block] = rows[index]
+
+            usage.flush()
+            del usage, rows
+
+        os.remove(self.rows_file)
+
+        np.save(self.rounds_file, lengths)
+
+        meta = {
+            "Players": self.num_players,
+            "Seed": self.seed,
+            "Simulations": shape[0],
+            "Rounds": shape[1],
+            "Resources": [int(resource) for resource in RESOURCES],
+            "Padding": "last"
+        }
+
+        with open(self.meta_file, 'w') as f:
+            f.write(json.dumps(meta, indent=2))
+
+
+WRITERS = {
+    JsonResultWriter.extension : JsonResultWriter,
+    NdjsonResultWriter.extension : NdjsonResultWriter,
+    NpyResultWriter.extension : NpyResultWriter
+}
+
+
+def result_file(results_path, num_players, extension):
+    """
+    Get the path of the result file for a number of players
+    :param results_path: Directory to store results in
+    :param num_players: Number of players in the simulations
+    :param extension: File extension of the format
+    :return: Path of the result file
+    """
+    return os.path.join(results_path, "{0:d}_player_usage.{1:s}".format(num_players, extension))
+
+
+def read_journal(journal_file, resume):
+    """
+    Read the records of a journal up to a checkpoint. Rounds and resources
+    come back as ints, which index the same as the ResourceType keys of the
+    simulators.
+    :param journal_file: Path to the journal
+    :param resume: State from checkpoint(), None for a new journal
+    :return: Generator of (sim_number, results)
+    """
+
+    if resume is None:
+        return
+
+    # The offset counts bytes
+    with open(journal_file, 'rb') as f:
+        data = f.read(resume["Offset"]).decode("utf-8")
+
+    for line in data.splitlines():
+
+        record = json.loads(line)
+
+        results = dict(
+            (int(round), dict((int(resource), amount) for resource, amount in usage.items()))
+            for round, usage in record["Results"].items()
+        )
+        yield record["Simulation"], results
+
@@ -1,7 +1,15 @@
 import json
 import argparse
-from simulation import NaiveResourceAnalysisSim
-from powergrid import Plant, ResourceType
+import os
+import random
+from simulation.parallel_runner import make_work_units, make_pool, iter_simulations, DEFAULT_CHUNK_SIZE
+from simulation.parallel_runner import ENGINES, OBJECT_ENGINE, BATCH_ENGINE
+from simulation.result_writers import WRITERS, JsonResultWriter
+from simulation.instrumentation import SimProfile
+from simulation.event_log import write_event_logs
+from simulation.checkpoint import Checkpoint, load_checkpoint, settings_digest
+from simulation.early_stopping import iter_until_converged, DEFAULT_MIN_SIMS, DEFAULT_Z
+from powergrid import GameConfig
 
 if __name__ == '__main__':
 
@@ -14,32 +22,199 @@ if __name__ == '__main__':
                         help="Path to the config file")
     parser.add_argument('-o', dest='results_path', type=str,
                         help="Path to store results")
+    parser.add_argument('-s', '--seed', dest='seed', type=int, default=None,
+                        help="Seed for the run (random if not given)")
+    parser.add_argument('--workers', dest='workers', type=int, default=1,
+                        help="Number of worker processes")
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int,
+                        default=DEFAULT_CHUNK_SIZE,
+                        help="Number of simulations handed to a worker at once")
+    parser.add_argument('--engine', dest='engine', choices=ENGINES,
+                        default=None,
+                        help="Run games one by one, chunks of games in lockstep, "
+                             "or games one by one with money and auctions. "
+                             "Defaults to object, or the engine of a resumed run")
+    parser.add_argument('--format', dest='format', choices=sorted(WRITERS),
+                        default=JsonResultWriter.extension,
+                        help="json writes each file at the end, ndjson streams "
+                             "one record per simulation as it finishes")
+    parser.add_argument('--profile', dest='profile', action='store_true',
+                        help="Time the phases, markets and rounds and print a "
+                             "summary at the end")
+    parser.add_argument('--ci-target', dest='ci_target', type=float, default=None,
+                        help="Stop a player count once the confidence interval of "
+                             "every round and resource is narrower than +/- this "
+                             "many resources. -n is then the most simulations to run")
+    parser.add_argument('--min-sims', dest='min_sims', type=int, default=DEFAULT_MIN_SIMS,
+                        help="Fewest simulations to run with --ci-target")
+    parser.add_argument('--events', dest='events', type=float, default=0.0,
+                        help="Record an event log of this fraction of the games, "
+                             "e.g. 0.01, to {n}_player_events.bin")
+    parser.add_argument('--checkpoint-every', dest='checkpoint_every', type=int, default=0,
+                        help="Save a checkpoint every this many simulations, so a "
+                             "killed run can be resumed")
+    parser.add_argument('--resume', dest='resume', action='store_true',
+                        help="Resume the run whose checkpoint is in the results path")
+    parser.add_argument('--z', dest='z', type=float, default=DEFAULT_Z,
+                        help="z score of the confidence intervals, 1.96 for 95%%")
 
 
 
     args = parser.parse_args()
 
-    for num_player in range(2, 7):
+    checkpoint = None
+    if args.resume:
 
-        full_report = {}
-        report_file = args.results_path
-        report_file += "/{0:d}_player_usage.json".format(num_player)
+        if args.ci_target is not None:
+            parser.error("--resume can't be combined with --ci-target")
 
-        full_report["Players"] = num_player
+        # The seed, number of simulations, format, engine and settings are
+        # the ones of the run being resumed
+        checkpoint = load_checkpoint(args.results_path)
+        args.seed = checkpoint.seed
+        args.num_sims = checkpoint.num_sims
+        args.format = checkpoint.format
 
-        usage = {}
-        for sim_number in range(args.num_sims):
+        if args.engine is not None and args.engine != checkpoint.engine:
+            parser.error("--engine {0:s} doesn't match the {1:s} engine of the run being resumed".format(
+                args.engine, checkpoint.engine))
+        args.engine = checkpoint.engine
 
+        if args.config_file is None:
+            args.config_file = checkpoint.config_file
+        if args.config_file is None:
+            parser.error("-c is needed to resume this run")
 
-            sim = NaiveResourceAnalysisSim(
-                num_players=num_player,
-                config_file=args.config_file
-            )
+        if checkpoint.config_digest is not None and settings_digest(args.config_file) != checkpoint.config_digest:
+            parser.error("The settings of {0:s} aren't the ones of the run being resumed".format(args.config_file))
 
-            results = sim.simulate()
-            usage[sim_number] = results
+        if args.checkpoint_every <= 0:
+            args.checkpoint_every = args.chunk_size
 
-        full_report["Results"] = usage
+    if args.engine is None:
+        args.engine = OBJECT_ENGINE
 
-        with open(report_file, 'w') as f:
-            f.write(json.dumps(full_report, indent=2))
\ No newline at end of file
+    seed = args.seed
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+
+    if checkpoint is None and args.checkpoint_every > 0:
+
+        if args.ci_target is not None:
+            parser.error("--checkpoint-every can't be combined with --ci-target")
+
+        checkpoint = Checkpoint(args.results_path, seed, args.num_sims, args.format, args.engine,
+                                os.path.abspath(args.config_file), settings_digest(args.config_file))
+        checkpoint.save()
+
+    if args.events > 0 and args.engine == BATCH_ENGINE:
+        parser.error("--events can't be recorded with the {0:s} engine".format(BATCH_ENGINE))
+
+    # Parse the settings once for the whole run
+    config = GameConfig(args.config_file)
+
+    profile = SimProfile() if args.profile else None
+
+    pool = None
+    if args.workers > 1:
+        pool = make_pool(args.workers, config)
+
+    try:
+        for num_player in range(2, 7):
+
+            start = 0
+            if checkpoint is None:
+                writer = WRITERS[args.format](args.results_path, num_player, seed)
+
+            elif checkpoint.is_finished(num_player):
+                continue
+
+            else:
+                start = checkpoint.done(num_player)
+                writer = WRITERS[args.format](args.results_path, num_player, seed, journal=True,
+                                              resume=checkpoint.writer_state(num_player))
+
+            event_logs = None
+            if args.events > 0:
+                event_logs = {}
+                event_path = os.path.join(args.results_path, "{0:d}_player_events.bin".format(num_player))
+
+                # Like the writers, drop whatever was written after the
+                # checkpoint, including a torn last block
+                events_offset = checkpoint.events_offset(num_player) if start > 0 else None
+                if events_offset is None:
+                    event_file = open(event_path, 'wb')
+                else:
+                    event_file = open(event_path, 'r+b')
+                    event_file.truncate(events_offset)
+                    event_file.seek(events_offset)
+
+            if args.ci_target is None:
+                work_units = make_work_units(
+                    num_players=num_player,
+                    seed=seed,
+                    num_sims=args.num_sims,
+                    chunk_size=args.chunk_size,
+                    engine=args.engine,
+                    profile=args.profile,
+                    start=start,
+                    events=args.events
+                )
+                simulations = iter_simulations(work_units, config, pool, profile, event_logs, args.workers)
+
+            else:
+                simulations = iter_until_converged(
+                    num_players=num_player,
+                    seed=seed,
+                    max_sims=args.num_sims,
+                    config=config,
+                    target=args.ci_target,
+                    min_sims=args.min_sims,
+                    z=args.z,
+                    chunk_size=args.chunk_size,
+                    engine=args.engine,
+                    pool=pool,
+                    workers=args.workers,
+                    profile=profile,
+                    events=args.events,
+                    event_logs=event_logs
+                )
+
+            num_run = 0
+            for sim_number, results in simulations:
+                writer.write(sim_number, results)
+                num_run += 1
+
+                # Logs arrive a chunk at a time. Write them game by game so
+                # the file never runs ahead of the results.
+                if event_logs and sim_number in event_logs:
+                    write_event_logs(event_file, num_player, {sim_number: event_logs.pop(sim_number)})
+
+                if checkpoint is not None and (sim_number + 1) % args.checkpoint_every == 0:
+
+                    events_offset = None
+                    if event_logs is not None:
+                        event_file.flush()
+                        os.fsync(event_file.fileno())
+                        events_offset = event_file.tell()
+
+                    checkpoint.update(num_player, sim_number + 1, writer.checkpoint(), events_offset)
+
+            if args.ci_target is not None:
+                print("{0:d} players: {1:d} simulations".format(num_player, num_run))
+
+            writer.close()
+
+            if event_logs is not None:
+                event_file.close()
+
+            if checkpoint is not None:
+                checkpoint.finish(num_player)
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if profile is not None:
+        print(profile.summary())
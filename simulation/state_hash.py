@@ -0,0 +1,565 @@
+import hashlib
+from collections import OrderedDict
+
+"""
+    Incremental 64-bit hashes of game states, and a transposition table to
+    memoize evaluations by them.
+
+    A StateHasher wraps the components of one simulator instance, the same
+    way SimProfile and EventRecorder do, and keeps the hash of the game up
+    to date as it changes. Every feature of the state has a random key:
+
+        a resource pool holding n resources
+        n resources of a type not yet in the market
+        a card in the plant market, the step of the market
+        a card on a seat's board, n cities on a seat's board
+        n Elektro on a seat's board
+        n resources of a type stored on a card of a seat
+        a seat at a position of the turn order
+
+    and the hash is the XOR of the keys of the features that hold, so every
+    change is two XORs. The deck is a sequence, whose order matters, so it
+    is hashed as a polynomial of the keys of its cards from the top. Drawing
+    from the top, putting a card on either end and changing a single amount
+    are all O(1). Shuffles and resets rehash what they touch, which costs as
+    much as the operation itself.
+
+    Keys come from a hash of the feature, so they are the same in every
+    process and need no table up front.
+
+    The simulator's current_step and replenish_rates are plain attributes
+    and not part of the hash. Seats are the order of the players when the
+    hasher is attached.
+"""
+
+MASK = (1 << 64) - 1
+
+# Base of the deck polynomial and its inverse modulo 2^64. The units modulo
+# 2^64 form a group of order 2^63, so the inverse of an odd base is
+# base^(2^63 - 1).
+DECK_BASE = 0x9E3779B97F4A7C15
+DECK_BASE_INV = pow(DECK_BASE, (1 << 63) - 1, 1 << 64)
+
+DEFAULT_TABLE_SIZE = 100000
+
+_keys = {}
+
+
+def feature_key(*feature):
+    """
+    Get the random key of a feature
+    :param feature: Tuple of ints naming the feature
+    :return: 64-bit key
+    """
+
+    key = _keys.get(feature)
+    if key is None:
+        digest = hashlib.blake2b(repr(feature).encode("ascii"), digest_size=8).digest()
+        key = _keys[feature] = int.from_bytes(digest, "little")
+
+    return key
+
+
+# First element of the features
+POOL, AVAILABLE, MARKET, STEP, DECK, PLANT, CITIES, STORAGE, ORDER, ELEKTRO = range(10)
+
+
+def deck_hash(cards):
+    """
+    Hash a deck from the top
+    :param cards: The cards, top first
+    :return: Tuple of (hash, DECK_BASE^len(cards))
+    """
+
+    value = 0
+    power = 1
+    for card in cards:
+        value = (value + feature_key(DECK, card.value) * power) & MASK
+        power = (power * DECK_BASE) & MASK
+
+    return value, power
+
+
+def seat_hash(seat, player):
+    """
+    Hash the plants, cities, storage and Elektro of a board
+    :param seat: The seat of the board
+    :param player: The PlayerBoard
+    :return: Hash of the board
+    """
+
+    value = 0
+    for plant in player.plants:
+        value ^= feature_key(PLANT, seat, plant.value)
+
+    cities = len(player.cities)
+    if cities:
+        value ^= feature_key(CITIES, seat, cities)
+
+    if player.elektro:
+        value ^= feature_key(ELEKTRO, seat, player.elektro)
+
+    for plant, storage in player.resource_map.items():
+        for resource, amount in enumerate(storage):
+            if amount:
+                value ^= feature_key(STORAGE, seat, plant.value, resource, amount)
+
+    return value
+
+
+def state_hash(sim, seats=None):
+    """
+    Hash the state of a simulator from scratch. This is what a StateHasher
+    keeps up to date.
+    :param sim: The simulator
+    :param seats: The boards by seat. Defaults to the current turn order.
+    :return: 64-bit hash
+    """
+
+    if seats is None:
+        seats = list(sim.players)
+
+    value = 0
+
+    for resource, pool in enumerate(sim.resource_market.market):
+        value ^= feature_key(POOL, resource, pool.available)
+        value ^= feature_key(AVAILABLE, resource, sim.resource_market.available_pool[resource])
+
+    for plant in sim.plant_market.market:
+        value ^= feature_key(MARKET, plant.value)
+    value ^= feature_key(STEP, int(sim.plant_market.game_step))
+
+    for seat, player in enumerate(seats):
+        value ^= seat_hash(seat, player)
+
+    for position, player in enumerate(sim.players):
+        value ^= feature_key(ORDER, position, seats.index(player))
+
+    return value ^ deck_hash(sim.plant_deck.deck)[0]
+
+
+class StateHasher(object):
+    """
+    Keeps the hash of the game of one simulator up to date. Read it with
+    value(). Simulators that are not hashed pay nothing.
+    """
+
+    def __init__(self):
+
+        # XOR of the feature keys, and the deck polynomial
+        self.features = 0
+        self.deck = 0
+        self.deck_power = 1
+
+        self.seats = []
+        self._order = []
+
+        # Set while a simulator resets or restores, which rehashes once at the end
+        self._suspended = False
+
+        # (object, name, instance attribute it replaced or None)
+        self._wrapped = []
+
+    def value(self):
+        """
+        :return: The 64-bit hash of the current state
+        """
+        return self.features ^ self.deck
+
+    def attach(self, sim):
+        """
+        Start hashing a simulator
+        :param sim: The simulator to hash
+        """
+
+        self.sim = sim
+        self.seats = list(sim.players)
+
+        for resource, pool in enumerate(sim.resource_market.market):
+            self._wrap_pool(pool, resource)
+
+        self._wrap_resource_market(sim.resource_market)
+        self._wrap_plant_market(sim.plant_market)
+        self._wrap_deck(sim.plant_deck)
+
+        for seat, player in enumerate(self.seats):
+            self._wrap_player(player, seat)
+
+        self._wrap_sim(sim)
+
+        self.rehash()
+
+    def detach(self):
+        """
+        Stop hashing and put the original methods back
+        """
+
+        for obj, name, previous in reversed(self._wrapped):
+            if previous is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+
+        del self._wrapped[:]
+
+    def rehash(self):
+        """
+        Hash the whole state again
+        """
+
+        sim = self.sim
+        self.deck, self.deck_power = deck_hash(sim.plant_deck.deck)
+        self.features = state_hash(sim, self.seats) ^ self.deck
+        self._order = list(sim.players)
+
+    def _replace(self, obj, name, function):
+        self._wrapped.append((obj, name, obj.__dict__.get(name)))
+        setattr(obj, name, function)
+
+    def _wrap_pool(self, pool, resource):
+
+        hasher = self
+        buy = pool.buy
+        replenish = pool.replenish
+
+        def change(before):
+            if pool.available != before:
+                hasher.features ^= feature_key(POOL, resource, before) ^ feature_key(POOL, resource, pool.available)
+
+        def hashed_buy(amount):
+            before = pool.available
+            result = buy(amount)
+            change(before)
+            return result
+
+        def hashed_replenish(amount):
+            before = pool.available
+            result = replenish(amount)
+            change(before)
+            return result
+
+        self._replace(pool, "buy", hashed_buy)
+        self._replace(pool, "replenish", hashed_replenish)
+
+    def _wrap_resource_market(self, resource_market):
+
+        hasher = self
+        available_pool = resource_market.available_pool
+
+        def track(method):
+
+            def hashed(*args, **kwargs):
+                before = list(available_pool)
+                result = method(*args, **kwargs)
+                for resource, (old, new) in enumerate(zip(before, available_pool)):
+                    if old != new:
+                        hasher.features ^= feature_key(AVAILABLE, resource, old) ^ feature_key(AVAILABLE, resource, new)
+                return result
+
+            return hashed
+
+        # Pools are hashed on their own, these only move the available pool
+        for name in ("replenish_market", "add_available_resources"):
+            self._replace(resource_market, name, track(getattr(resource_market, name)))
+
+        for name in ("reset", "restore"):
+            self._replace(resource_market, name, self._rehashing(getattr(resource_market, name)))
+
+    def _wrap_plant_market(self, plant_market):
+
+        hasher = self
+
+        add_plant_to_market = plant_market.add_plant_to_market
+        auction_plant = plant_market.auction_plant
+        remove_lowest = plant_market.remove_lowest
+        remove_highest = plant_market.remove_highest
+        remove_plants_below_value = plant_market.remove_plants_below_value
+        set_game_step = plant_market.set_game_step
+
+        def add(plant):
+            if plant is not None:
+                hasher.features ^= feature_key(MARKET, plant.value)
+            return add_plant_to_market(plant)
+
+        def auction(plant):
+            result = auction_plant(plant)
+            hasher.features ^= feature_key(MARKET, plant.value)
+            return result
+
+        def lowest():
+            plant = remove_lowest()
+            hasher.features ^= feature_key(MARKET, plant.value)
+            return plant
+
+        def highest():
+            plant = remove_highest()
+            hasher.features ^= feature_key(MARKET, plant.value)
+            return plant
+
+        def below(value):
+            # Only plants of the actual market can go, a handful at most
+            actual = plant_market.market[:len(plant_market.actual)]
+            num_removed = remove_plants_below_value(value)
+            for plant in actual[:num_removed]:
+                hasher.features ^= feature_key(MARKET, plant.value)
+            return num_removed
+
+        def step(game_step):
+            hasher.features ^= feature_key(STEP, int(plant_market.game_step)) ^ feature_key(STEP, int(game_step))
+            return set_game_step(game_step)
+
+        self._replace(plant_market, "add_plant_to_market", add)
+        self._replace(plant_market, "auction_plant", auction)
+        self._replace(plant_market, "remove_lowest", lowest)
+        self._replace(plant_market, "remove_highest", highest)
+        self._replace(plant_market, "remove_plants_below_value", below)
+        self._replace(plant_market, "set_game_step", step)
+
+        for name in ("reset", "restore"):
+            self._replace(plant_market, name, self._rehashing(getattr(plant_market, name)))
+
+    def _wrap_deck(self, plant_deck):
+
+        hasher = self
+
+        draw = plant_deck.draw
+        add_to_bottom = plant_deck.add_to_bottom
+
+        def hashed_draw():
+            card = draw()
+            if card is not None:
+                # Drop the top term and shift everything up one place
+                key = feature_key(DECK, card.value)
+                hasher.deck = ((hasher.deck - key) * DECK_BASE_INV) & MASK
+                hasher.deck_power = (hasher.deck_power * DECK_BASE_INV) & MASK
+            return card
+
+        def hashed_add_to_bottom(plant):
+            hasher.deck = (hasher.deck + feature_key(DECK, plant.value) * hasher.deck_power) & MASK
+            hasher.deck_power = (hasher.deck_power * DECK_BASE) & MASK
+            return add_to_bottom(plant)
+
+        self._replace(plant_deck, "draw", hashed_draw)
+        self._replace(plant_deck, "add_to_bottom", hashed_add_to_bottom)
+
+        for name in ("shuffle", "discard_cards", "setup_deck", "reset", "restore"):
+            self._replace(plant_deck, name, self._rehashing(getattr(plant_deck, name), deck_only=True))
+
+    def _wrap_player(self, player, seat):
+
+        hasher = self
+
+        add_plant = player.add_plant
+        replace_plant = player.replace_plant
+        add_resources_to_plant = player.add_resources_to_plant
+        add_cities = player.add_cities
+        add_city = player.add_city
+        earn_elektro = player.earn_elektro
+        spend_elektro = player.spend_elektro
+
+        def hashed_add_plant(plant):
+            before = len(player.plants)
+            result = add_plant(plant)
+            if len(player.plants) != before:
+                hasher.features ^= feature_key(PLANT, seat, plant.value)
+            return result
+
+        def hashed_replace_plant(new_plant, old_plant):
+            # The new plant goes through add_plant
+            hasher.features ^= feature_key(PLANT, seat, old_plant.value)
+            for resource, amount in enumerate(player.resource_map[old_plant]):
+                if amount:
+                    hasher.features ^= feature_key(STORAGE, seat, old_plant.value, resource, amount)
+            return replace_plant(new_plant, old_plant)
+
+        def hashed_add_resources(plant, resource_type, amount):
+            before = player.resource_map[plant][resource_type]
+            result = add_resources_to_plant(plant, resource_type, amount)
+            hasher._storage(seat, plant, int(resource_type), before, before + amount)
+            return result
+
+        def cities(method):
+
+            def hashed(*args, **kwargs):
+                before = len(player.cities)
+                result = method(*args, **kwargs)
+                hasher._cities(seat, before, len(player.cities))
+                return result
+
+            return hashed
+
+        def hashed_power_plants(*args, **kwargs):
+            before = seat_hash(seat, player)
+            result = power_plants(*args, **kwargs)
+            hasher.features ^= before ^ seat_hash(seat, player)
+            return result
+
+        power_plants = player.power_plants
+
+        def hashed_earn_elektro(amount):
+            before = player.elektro
+            result = earn_elektro(amount)
+            hasher._elektro(seat, before, player.elektro)
+            return result
+
+        def hashed_spend_elektro(amount):
+            before = player.elektro
+            spent = spend_elektro(amount)
+            if spent:
+                hasher._elektro(seat, before, player.elektro)
+            return spent
+
+        self._replace(player, "add_plant", hashed_add_plant)
+        self._replace(player, "replace_plant", hashed_replace_plant)
+        self._replace(player, "add_resources_to_plant", hashed_add_resources)
+        self._replace(player, "add_cities", cities(add_cities))
+        self._replace(player, "add_city", cities(add_city))
+        self._replace(player, "power_plants", hashed_power_plants)
+        self._replace(player, "earn_elektro", hashed_earn_elektro)
+        self._replace(player, "spend_elektro", hashed_spend_elektro)
+
+        for name in ("reset", "restore"):
+            self._replace(player, name, self._rehashing(getattr(player, name)))
+
+    def _wrap_sim(self, sim):
+
+        hasher = self
+        phase_1 = sim.phase_1
+
+        def hashed_phase_1(*args, **kwargs):
+            result = phase_1(*args, **kwargs)
+            hasher.rehash_order()
+            return result
+
+        self._replace(sim, "phase_1", hashed_phase_1)
+
+        # Resets and restores touch every component. Rehash once at the end.
+        for name in ("reset", "restore"):
+            self._replace(sim, name, self._rehashing(getattr(sim, name), suspend=True))
+
+    def _storage(self, seat, plant, resource, before, after):
+        if before:
+            self.features ^= feature_key(STORAGE, seat, plant.value, resource, before)
+        if after:
+            self.features ^= feature_key(STORAGE, seat, plant.value, resource, after)
+
+    def _cities(self, seat, before, after):
+        if before != after:
+            if before:
+                self.features ^= feature_key(CITIES, seat, before)
+            if after:
+                self.features ^= feature_key(CITIES, seat, after)
+
+    def _elektro(self, seat, before, after):
+        if before != after:
+            if before:
+                self.features ^= feature_key(ELEKTRO, seat, before)
+            if after:
+                self.features ^= feature_key(ELEKTRO, seat, after)
+
+    def rehash_order(self):
+        """
+        Hash the turn order again, e.g. after phase 1 rearranged the players
+        """
+
+        for position, player in enumerate(self._order):
+            self.features ^= feature_key(ORDER, position, self.seats.index(player))
+
+        self._order = list(self.sim.players)
+
+        for position, player in enumerate(self._order):
+            self.features ^= feature_key(ORDER, position, self.seats.index(player))
+
+    def _rehashing(self, method, deck_only=False, suspend=False):
+        """
+        Wrap a method that changes too much to track, so the hash is
+        computed again afterwards
+        :param method: The method
+        :param deck_only: Only the deck changes
+        :param suspend: Don't rehash in the methods this one calls
+        """
+
+        hasher = self
+
+        def rehashed(*args, **kwargs):
+
+            if hasher._suspended:
+                return method(*args, **kwargs)
+
+            if suspend:
+                hasher._suspended = True
+                try:
+                    result = method(*args, **kwargs)
+                finally:
+                    hasher._suspended = False
+            else:
+                result = method(*args, **kwargs)
+
+            if deck_only:
+                hasher.deck, hasher.deck_power = deck_hash(hasher.sim.plant_deck.deck)
+            else:
+                hasher.rehash()
+
+            return result
+
+        return rehashed
+
+
+class TranspositionTable(object):
+    """
+    A bounded map from state hashes to values, e.g. evaluations of
+    positions. When it is full, the least recently used entry goes.
+    """
+
+    def __init__(self, capacity=DEFAULT_TABLE_SIZE):
+        """
+        :param capacity: Most entries to keep
+        """
+
+        self.capacity = max(1, capacity)
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Look up a state
+        :param key: The hash of the state
+        :param default: Returned if the state isn't in the table
+        :return: The stored value, or default
+        """
+
+        entries = self.entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """
+        Store the value of a state
+        :param key: The hash of the state
+        :param value: The value to store
+        """
+
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
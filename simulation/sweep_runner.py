@@ -0,0 +1,78 @@
+import json
+import argparse
+import os
+import random
+from simulation.parallel_runner import make_pool, DEFAULT_CHUNK_SIZE, ENGINES, OBJECT_ENGINE
+from simulation.parameter_sweep import read_design, make_sweep_units, iter_sweep, summary_record, apply_parameters
+from powergrid import GameConfig
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description="Run a parameter sweep over the settings", add_help=True)
+
+    parser.add_argument('-n', dest='num_sims', type=int,
+                        help="Number of simulations per point")
+    parser.add_argument('-c', dest='config_file', type=str,
+                        help="Path to the config file")
+    parser.add_argument('-d', dest='design_file', type=str,
+                        help="Path to the sweep design")
+    parser.add_argument('-o', dest='results_path', type=str,
+                        help="Path to store results")
+    parser.add_argument('-s', '--seed', dest='seed', type=int, default=None,
+                        help="Seed for the run (random if not given)")
+    parser.add_argument('--workers', dest='workers', type=int, default=1,
+                        help="Number of worker processes")
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int,
+                        default=DEFAULT_CHUNK_SIZE,
+                        help="Number of simulations handed to a worker at once")
+    parser.add_argument('--engine', dest='engine', choices=ENGINES,
+                        default=OBJECT_ENGINE,
+                        help="Run games one by one, chunks of games in lockstep, "
+                             "or games one by one with money and auctions")
+
+    args = parser.parse_args()
+
+    seed = args.seed
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 32)
+
+    config = GameConfig(args.config_file)
+    player_counts, points = read_design(args.design_file, random.Random(seed))
+
+    # Fail before running anything if a point can't be played
+    for num_player in player_counts:
+        for parameters in points:
+            try:
+                apply_parameters(config, num_player, parameters)
+            except (ValueError, KeyError) as e:
+                parser.error("Bad sweep design: {0}".format(e))
+
+    pool = None
+    if args.workers > 1:
+        pool = make_pool(args.workers, config)
+
+    try:
+        for num_player in player_counts:
+
+            sweep_units = make_sweep_units(
+                num_players=num_player,
+                seed=seed,
+                num_sims=args.num_sims,
+                points=points,
+                chunk_size=args.chunk_size,
+                engine=args.engine
+            )
+
+            sweep_file = os.path.join(args.results_path, "{0:d}_player_sweep.ndjson".format(num_player))
+            with open(sweep_file, 'w') as f:
+                for point, parameters, stats in iter_sweep(sweep_units, config, pool, args.workers):
+                    record = summary_record(num_player, seed, parameters, stats)
+                    f.write(json.dumps(record, separators=(',', ':')))
+                    f.write('\n')
+                    f.flush()
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
@@ -0,0 +1,101 @@
+import unittest
+from powergrid import GameConfig, PlayerBoard
+from powergrid.powergrid_utils import spawn_rng
+from simulation import NaiveResourceAnalysisSim, AuctionResourceAnalysisSim
+from simulation.auction import MinimumBidStrategy, ValueStrategy, STARTING_ELEKTRO, PASS
+from simulation.parallel_runner import make_work_units, run_chunk, AUCTION_ENGINE, OBJECT_ENGINE
+
+class TestAuction(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_valuations(self):
+
+        strategy = ValueStrategy(markup=0.5, output_bonus=1)
+        strategy.prepare(self.config)
+
+        for plant in self.config.plants:
+            self.assertEqual(strategy.values[plant.key], int(plant.value * 1.5 + plant.output))
+
+        # Plants are valued once per config
+        values = strategy.values
+        strategy.prepare(self.config)
+        self.assertIs(strategy.values, values)
+
+    def test_choose_and_bid(self):
+
+        strategy = MinimumBidStrategy()
+        strategy.prepare(self.config)
+
+        market = sorted(self.config.plants[:4])
+        player = PlayerBoard(3)
+        player.earn_elektro(market[2].key)
+
+        # The biggest plant it can afford, never raising
+        self.assertIs(strategy.choose_plant(player, market, True), market[2])
+        self.assertEqual(strategy.bid(player, market[2], market[2].key), PASS)
+
+        strategy = ValueStrategy()
+        strategy.prepare(self.config)
+        plant = market[0]
+
+        self.assertEqual(strategy.bid(player, plant, plant.key), plant.key + 1)
+        self.assertEqual(strategy.bid(player, plant, strategy.values[plant.key]), PASS)
+
+        # A full board doesn't bid on plants that wouldn't replace anything
+        for owned in self.config.plants[10:13]:
+            player.add_plant(owned)
+        self.assertIsNone(strategy.choose_plant(player, market, False))
+        self.assertEqual(strategy.bid(player, plant, plant.key), PASS)
+
+    def test_first_round(self):
+
+        sim = AuctionResourceAnalysisSim(4, self.config, spawn_rng(5, 4, 0))
+        for player in sim.players:
+            self.assertEqual(player.elektro, STARTING_ELEKTRO)
+
+        sim.phase_1(True)
+        sim.phase_2()
+
+        # Everybody bought a plant and paid at least its face value
+        for player in sim.players:
+            self.assertEqual(len(player.get_plants()), 1)
+            self.assertLessEqual(player.elektro, STARTING_ELEKTRO - player.get_plants()[0].key)
+            self.assertGreaterEqual(player.elektro, 0)
+
+    def test_games(self):
+
+        for num_players in range(2, 7):
+            for i in range(20):
+
+                strategies = [MinimumBidStrategy(), ValueStrategy()] * 3
+                sim = AuctionResourceAnalysisSim(num_players, self.config, spawn_rng(7, num_players, i),
+                                                 strategies[:num_players])
+                results = sim.simulate()
+
+                self.assertGreater(len(results), 1)
+                for player in sim.players:
+                    self.assertGreaterEqual(player.elektro, 0)
+
+    def test_engine(self):
+
+        work_units = make_work_units(3, 11, 10, chunk_size=5, engine=AUCTION_ENGINE)
+
+        results = []
+        for work_unit in work_units:
+            results.extend(run_chunk(work_unit, self.config)[0])
+
+        # Reused simulators play the same games as fresh ones
+        for sim_number, game in results:
+            sim = AuctionResourceAnalysisSim(3, self.config, spawn_rng(11, 3, sim_number))
+            self.assertEqual(sim.simulate(), game)
+
+        # The naive games don't change
+        naive = run_chunk(make_work_units(3, 11, 5, engine=OBJECT_ENGINE)[0], self.config)[0]
+        for sim_number, game in naive:
+            sim = NaiveResourceAnalysisSim(3, self.config, spawn_rng(11, 3, sim_number))
+            self.assertEqual(sim.simulate(), game)
@@ -0,0 +1,45 @@
+import unittest
+from powergrid import GameConfig
+from powergrid.powergrid_utils import spawn_rng
+from simulation import NaiveResourceAnalysisSim
+from simulation.batch_simulator_naive import BatchNaiveResourceAnalysisSim
+
+class TestBatchSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_matches_object_simulator(self):
+
+        for num_players in range(2, 7):
+
+            # Same rng streams, so both engines must play the same games
+            batch = BatchNaiveResourceAnalysisSim(
+                num_players, self.config,
+                [spawn_rng(11, num_players, i) for i in range(20)])
+
+            batch_results = batch.simulate()
+
+            for i in range(20):
+                sim = NaiveResourceAnalysisSim(
+                    num_players, self.config, spawn_rng(11, num_players, i))
+
+                self.assertEqual(batch_results[i], sim.simulate())
+
+    def test_arrays_repeat_last_round(self):
+
+        batch = BatchNaiveResourceAnalysisSim(
+            4, self.config, [spawn_rng(3, 4, i) for i in range(10)])
+
+        usage, lengths = batch.simulate_arrays()
+
+        self.assertEqual(usage.shape[0], 10)
+        self.assertEqual(usage.shape[1], lengths.max())
+        self.assertEqual(usage.shape[2], 4)
+
+        for game, length in enumerate(lengths):
+            for round in range(length, usage.shape[1]):
+                self.assertEqual(usage[game, round].tolist(), usage[game, length - 1].tolist())
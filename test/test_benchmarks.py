@@ -0,0 +1,26 @@
+import unittest
+from powergrid import GameConfig
+from benchmarks.run_benchmarks import run_benchmarks, compare
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_report_and_compare(self):
+
+        config = GameConfig("../powergrid/settings/powergrid_config.json")
+        report = run_benchmarks(config, warmup=0, repeat=1, pattern="ResourcePool")
+
+        self.assertEqual(sorted(report["Benchmarks"]), [
+            "micro.ResourcePool.buy_replenish",
+            "micro.ResourcePool.calculate_cost"
+        ])
+
+        baseline = {"Benchmarks": {}}
+        for name, timing in report["Benchmarks"].items():
+            baseline["Benchmarks"][name] = dict(timing)
+
+        # Make one benchmark look twice as fast in the baseline
+        baseline["Benchmarks"]["micro.ResourcePool.buy_replenish"]["min_us"] /= 2.0
+
+        rows = dict((row[0], row[-1]) for row in compare(report, baseline, tolerance=0.2))
+        self.assertTrue(rows["micro.ResourcePool.buy_replenish"])
+        self.assertFalse(rows["micro.ResourcePool.calculate_cost"])
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from powergrid import GameConfig
+from analysis.resource_usage_analyzer import results_to_arrays
+from simulation.parallel_runner import make_work_units, iter_simulations
+from simulation.early_stopping import RoundStatistics, iter_until_converged
+
+class TestEarlyStopping(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_statistics_match_padded_arrays(self):
+
+        work_units = make_work_units(4, 11, 40, chunk_size=16)
+        games = list(iter_simulations(work_units, self.config))
+
+        stats = RoundStatistics()
+        for _, results in games:
+            stats.add(results)
+
+        # Same layout as a report, with the rounds as strings
+        report = dict((str(sim), dict((str(round), dict((str(int(r)), a) for r, a in usage.items()))
+                                      for round, usage in results.items()))
+                      for sim, results in games)
+        usage, _ = results_to_arrays(report)
+
+        round_stats = stats.round_stats()
+        self.assertEqual(sorted(round_stats), list(range(usage.shape[1])))
+
+        for round, round_stat in round_stats.items():
+            self.assertEqual(round_stat.count, 40)
+            np.testing.assert_allclose(round_stat.mean, usage[:, round].mean(axis=0))
+            np.testing.assert_allclose(round_stat.variance(), usage[:, round].var(axis=0, ddof=1), atol=1e-9)
+
+    def test_stops_at_a_chunk_boundary(self):
+
+        stats = RoundStatistics()
+        adaptive = list(iter_until_converged(3, 5, 200, self.config, target=100.0, stats=stats,
+                                             min_sims=20, chunk_size=16))
+
+        # Every interval is narrower than 100 resources right away, so the
+        # run stops at the first chunk boundary after min_sims
+        self.assertEqual(len(adaptive), 32)
+        self.assertEqual(stats.count, 32)
+        self.assertTrue(stats.converged(100.0))
+
+        fixed = list(iter_simulations(make_work_units(3, 5, 32, chunk_size=16), self.config))
+        self.assertEqual(adaptive, fixed)
+
+    def test_runs_max_sims_without_convergence(self):
+
+        adaptive = list(iter_until_converged(2, 5, 24, self.config, target=0.0, min_sims=1, chunk_size=8))
+        self.assertEqual([sim for sim, _ in adaptive], list(range(24)))
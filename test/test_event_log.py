@@ -0,0 +1,90 @@
+import unittest
+from powergrid import GameConfig
+from powergrid.powergrid_utils import spawn_rng
+from simulation import NaiveResourceAnalysisSim, AuctionResourceAnalysisSim
+from simulation.parallel_runner import make_work_units, iter_simulations
+from simulation.event_log import record_game, GameReplay, iter_events, PLANT_ADD
+
+class TestEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_replay_rebuilds_the_game(self):
+
+        for num_players in range(2, 7):
+
+            plain = NaiveResourceAnalysisSim(num_players, self.config, spawn_rng(8, num_players, 0))
+            expected = plain.simulate()
+
+            sim = NaiveResourceAnalysisSim(num_players, self.config, spawn_rng(8, num_players, 0))
+            seats = list(sim.players)
+            results, log = record_game(sim)
+
+            # Recording doesn't change the game, and is removed afterwards
+            self.assertEqual(results, expected)
+            self.assertNotIn("add_plant", seats[0].__dict__)
+            self.assertNotIn("phase_1", sim.__dict__)
+
+            replay = GameReplay(self.config, num_players).run(log)
+
+            self.assertEqual(replay.plant_market.market, sim.plant_market.market)
+            self.assertEqual(replay.resource_market.get_market_resources(),
+                             sim.resource_market.get_market_resources())
+            self.assertEqual(replay.resource_market.get_available_pool(),
+                             sim.resource_market.get_available_pool())
+
+            for replayed, player in zip(replay.players, seats):
+                self.assertEqual(replayed.get_plants(), player.get_plants())
+                self.assertEqual(len(replayed.get_cities()), len(player.get_cities()))
+                self.assertEqual(replayed.get_resources_on_plants(), player.get_resources_on_plants())
+
+            # The market after phase 4 is what the results report
+            for round in range(1, len(results)):
+                replay = GameReplay(self.config, num_players).run(log, round, 4)
+                self.assertEqual(replay.resource_market.get_market_resources().to_dict(), results[round])
+
+    def test_replay_rebuilds_the_money(self):
+
+        for num_players in range(2, 7):
+
+            sim = AuctionResourceAnalysisSim(num_players, self.config, spawn_rng(8, num_players, 0))
+            seats = list(sim.players)
+            _, log = record_game(sim)
+
+            self.assertNotIn("spend_elektro", seats[0].__dict__)
+
+            replay = GameReplay(self.config, num_players).run(log)
+            self.assertEqual([player.elektro for player in replay.players], [player.elektro for player in seats])
+
+            # Everybody starts with the same money
+            start = GameReplay(self.config, num_players).run(log, 0)
+            self.assertEqual(len(set(player.elektro for player in start.players)), 1)
+            self.assertGreater(start.players[0].elektro, 0)
+
+    def test_initial_market_is_recorded(self):
+
+        sim = NaiveResourceAnalysisSim(3, self.config, spawn_rng(1, 3, 0))
+        _, log = record_game(sim)
+
+        setup = [event for event in iter_events(log) if event.round == 0]
+        self.assertEqual([event.op for event in setup], [PLANT_ADD] * 8)
+
+    def test_sampled_runs_match(self):
+
+        event_logs = {}
+        recorded = list(iter_simulations(make_work_units(4, 3, 40, chunk_size=8, events=0.25),
+                                         self.config, event_logs=event_logs))
+        plain = list(iter_simulations(make_work_units(4, 3, 40, chunk_size=8), self.config))
+
+        self.assertEqual(recorded, plain)
+        self.assertTrue(0 < len(event_logs) < 40)
+
+        # The sample doesn't depend on the chunking
+        other_logs = {}
+        list(iter_simulations(make_work_units(4, 3, 40, chunk_size=5, events=0.25),
+                              self.config, event_logs=other_logs))
+        self.assertEqual(other_logs, event_logs)
@@ -0,0 +1,48 @@
+import pickle
+import unittest
+from powergrid import GameConfig
+from powergrid.powergrid_utils import spawn_rng
+from simulation import NaiveResourceAnalysisSim
+from simulation.instrumentation import SimProfile
+from simulation.parallel_runner import make_work_units, iter_simulations
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def test_results_unchanged(self):
+
+        profile = SimProfile()
+
+        sim = NaiveResourceAnalysisSim(3, self.config, spawn_rng(1, 3, 0))
+        sim.instrument(profile)
+        results = sim.simulate()
+
+        plain = NaiveResourceAnalysisSim(3, self.config, spawn_rng(1, 3, 0))
+        self.assertEqual(results, plain.simulate())
+
+        # One phase_1 per round, every round after the initial report
+        self.assertEqual(profile.methods["simulate"][0], 1)
+        self.assertEqual(profile.methods["phase_1"][0], len(results) - 1)
+        self.assertEqual(sorted(profile.rounds), list(range(1, len(results))))
+        self.assertGreater(profile.methods["ResourceMarket.cheapest_purchase"][0], 0)
+
+        # Other instances are not instrumented
+        self.assertNotIn("phase_1", plain.__dict__)
+
+    def test_profiles_merge_across_chunks(self):
+
+        profile = SimProfile()
+        work_units = make_work_units(4, 2, 6, chunk_size=2, profile=True)
+
+        results = dict(iter_simulations(work_units, self.config, profile=profile))
+
+        self.assertEqual(profile.methods["simulate"][0], 6)
+        self.assertEqual(profile.rounds[1][0], 6)
+        self.assertEqual(len(results), 6)
+
+        # Worker profiles come back through pickling
+        copy = pickle.loads(pickle.dumps(profile))
+        self.assertEqual(copy.methods, profile.methods)
+        self.assertIn("phase_3", profile.summary())
@@ -0,0 +1,89 @@
+import unittest
+import pickle
+from powergrid import GameConfig
+from powergrid.powergrid_utils import spawn_rng, stream_seed
+from simulation import NaiveResourceAnalysisSim
+from simulation.parallel_runner import make_work_units, make_pool, iter_simulations, run_simulation, imap_bounded
+
+class TestParallelRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_work_units_cover_all_simulations(self):
+
+        work_units = make_work_units(3, 1, 10, chunk_size=4)
+
+        self.assertEqual(len(work_units), 3)
+        self.assertEqual(work_units[0][2:4], (0, 4))
+        self.assertEqual(work_units[-1][2:4], (8, 10))
+
+    def test_serial_is_reproducible(self):
+
+        work_units = make_work_units(4, 42, 6, chunk_size=2)
+
+        first = list(iter_simulations(work_units, self.config))
+        second = list(iter_simulations(work_units, self.config))
+
+        self.assertEqual(first, second)
+        self.assertEqual([sim for sim, _ in first], list(range(6)))
+
+    def test_parallel_matches_serial(self):
+
+        serial_units = make_work_units(3, 7, 8, chunk_size=8)
+        parallel_units = make_work_units(3, 7, 8, chunk_size=3)
+
+        serial = list(iter_simulations(serial_units, self.config))
+
+        pool = make_pool(2, self.config)
+        try:
+            parallel = list(iter_simulations(parallel_units, self.config, pool, workers=2))
+        finally:
+            pool.close()
+            pool.join()
+
+        self.assertEqual(serial, parallel)
+
+    def test_imap_bounded(self):
+
+        pool = make_pool(2, self.config)
+        try:
+            # Results stay in order with fewer items in flight than workers
+            self.assertEqual(list(imap_bounded(pool, abs, range(-5, 0), in_flight=1)), [5, 4, 3, 2, 1])
+            self.assertEqual(list(imap_bounded(pool, abs, range(-5, 0), in_flight=4)), [5, 4, 3, 2, 1])
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_replay_single_simulation(self):
+
+        work_units = make_work_units(5, 3, 6, chunk_size=6)
+        full_run = dict(iter_simulations(work_units, self.config))
+
+        # Any simulation of a run can be replayed on its own
+        self.assertEqual(run_simulation(5, self.config, 3, 4), full_run[4])
+
+    def test_config_survives_pickling(self):
+
+        config = pickle.loads(pickle.dumps(self.config, pickle.HIGHEST_PROTOCOL))
+
+        self.assertEqual(config.plants, self.config.plants)
+        self.assertEqual(config.get_settings(3), self.config.get_settings(3))
+        self.assertEqual(run_simulation(3, config, 9, 2), run_simulation(3, self.config, 9, 2))
+
+        with self.assertRaises(AttributeError):
+            config.plants = ()
+
+    def test_reset_matches_fresh_simulator(self):
+
+        sim = NaiveResourceAnalysisSim(4, self.config, spawn_rng(5, 4, 0))
+        sim.simulate()
+
+        for sim_number in range(1, 6):
+            sim.reset(stream_seed(5, 4, sim_number))
+            fresh = NaiveResourceAnalysisSim(4, self.config, spawn_rng(5, 4, sim_number))
+
+            self.assertEqual(sim.simulate(), fresh.simulate())
@@ -0,0 +1,77 @@
+import pickle
+import unittest
+from powergrid import GameConfig, GameStep, ResourceType
+from simulation.parallel_runner import make_work_units, iter_simulations
+from simulation.early_stopping import RoundStatistics
+from simulation.parameter_sweep import apply_parameters, grid_design, make_sweep_units, iter_sweep
+
+class TestParameterSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_apply_parameters(self):
+
+        variant = apply_parameters(self.config, 3, {"GameEnd": 12, "Replenish.3.coal": 9})
+
+        settings = variant.get_settings(3)
+        self.assertEqual(settings.end_condition, 12)
+        self.assertEqual(dict(dict(settings.replenish)[GameStep.STEP3])[ResourceType.COAL], 9)
+
+        # Other player counts, and the original config, are untouched
+        self.assertEqual(variant.get_settings(4), self.config.get_settings(4))
+        self.assertNotEqual(self.config.get_settings(3).end_condition, 12)
+
+        # The cards are shared
+        self.assertIs(variant.plants, self.config.plants)
+
+        with self.assertRaises(ValueError):
+            apply_parameters(self.config, 3, {"Replenish.4.coal": 1})
+
+        # Settings the engines don't play by would give the same games at every point
+        for parameters in ({"Step2Trigger": 3}, {"Discard": 0}, {"Regions": 5}, {"Replenish.2.coal": 9}):
+            with self.assertRaises(ValueError):
+                apply_parameters(self.config, 3, parameters)
+
+    def test_with_settings(self):
+
+        variant = self.config.with_settings(4, max_plants=4)
+
+        self.assertEqual(variant.get_settings(4).max_plants, 4)
+        self.assertEqual(self.config.get_settings(4).max_plants, 3)
+        self.assertEqual(variant.get_player_counts(), self.config.get_player_counts())
+
+        # Settings can't be changed behind the back of a shared config
+        with self.assertRaises(AttributeError):
+            self.config.max_plants = 4
+        with self.assertRaises(TypeError):
+            self.config._settings[0] = None
+
+        self.assertEqual(pickle.loads(pickle.dumps(variant)).get_settings(4), variant.get_settings(4))
+
+    def test_grid_design(self):
+
+        points = grid_design({"GameEnd": [10, 12], "MaxPlants": [2, 3, 4]})
+
+        self.assertEqual(len(points), 6)
+        self.assertEqual(points[0], {"GameEnd": 10, "MaxPlants": 2})
+        self.assertEqual(points[-1], {"GameEnd": 12, "MaxPlants": 4})
+
+    def test_sweep_matches_plain_run(self):
+
+        points = [{}, {"GameEnd": 10}]
+        sweep = list(iter_sweep(make_sweep_units(4, 9, 12, points, chunk_size=5), self.config))
+
+        self.assertEqual([point for point, _, _ in sweep], [0, 1])
+
+        # The point without parameters plays the games of a plain run
+        plain = RoundStatistics()
+        for _, results in iter_simulations(make_work_units(4, 9, 12), self.config):
+            plain.add(results)
+
+        self.assertEqual(sweep[0][2].count, 12)
+        self.assertEqual(sweep[0][2].intervals(), plain.intervals())
+        self.assertNotEqual(sweep[1][2].intervals(), plain.intervals())
@@ -0,0 +1,48 @@
+import random
+import unittest
+from powergrid import PlantDeck, GameConfig
+
+class TestPlantDeck(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def test_setup_and_draw(self):
+
+        deck = PlantDeck(self.config, random.Random(1))
+        deck.setup_deck()
+
+        # The 13 is on top and the step 3 card at the bottom
+        self.assertEqual(deck.draw().get_value(), 13)
+        self.assertTrue(deck.deck[-1].is_step3())
+
+        card = deck.draw()
+        deck.add_to_bottom(card)
+        self.assertIs(deck.deck[-1], card)
+
+    def test_discard_is_seeded(self):
+
+        first = PlantDeck(self.config, random.Random(5))
+        second = PlantDeck(self.config, random.Random(5))
+        size = len(first.deck)
+
+        first.discard_cards(8)
+        second.discard_cards(8)
+
+        self.assertEqual(len(first.exile), 8)
+        self.assertEqual(len(first.deck), size - 8)
+        self.assertEqual(first.exile, second.exile)
+        self.assertEqual(list(first.deck), list(second.deck))
+        self.assertFalse(set(first.exile) & set(first.deck))
+
+    def test_reset(self):
+
+        deck = PlantDeck(self.config, random.Random(2))
+        initial = list(deck.deck)
+
+        deck.setup_deck()
+        deck.discard_cards(4)
+        deck.reset()
+
+        self.assertEqual(list(deck.deck), initial)
+        self.assertEqual(deck.exile, [])
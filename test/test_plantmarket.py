@@ -1,6 +1,6 @@
 import unittest
 from nose import with_setup
-from powergrid import PlantMarket, Plant, ResourceType, PlantDeck
+from powergrid import PlantMarket, Plant, ResourceType, PlantDeck, GameStep, GameConfig
 
 class TestPlantMarket(object):
 
@@ -19,3 +19,78 @@ class TestPlantMarket(object):
         assert market.get_market_size() == 0
 
         # market.add_plant_to_market()
+
+    def test_plant_equality(self):
+
+        plant = Plant(3, ResourceType.COAL, 2, 1)
+
+        assert plant == Plant(3, ResourceType.OIL, 2, 1)
+        assert plant != Plant(4, ResourceType.COAL, 2, 1)
+        assert plant != None
+        assert plant != 3
+
+    def test_layout_after_removal(self):
+
+        market = PlantMarket()
+        for value in range(3, 11):
+            market.add_plant_to_market(Plant(value, ResourceType.COAL, 2, 1))
+
+        assert [p.get_value() for p in market.get_actual_market()] == [3, 4, 5, 6]
+        assert [p.get_value() for p in market.get_future_market()] == [7, 8, 9, 10]
+
+        # The views never show plants that already left the market
+        market.remove_lowest()
+        assert [p.get_value() for p in market.get_actual_market()] == [4, 5, 6, 7]
+
+        # In step 3 every plant is in the actual market
+        market.set_game_step(GameStep.STEP3)
+        assert len(market.get_actual_market()) == 7
+
+    def test_decks_share_cards(self):
+
+        config = GameConfig("../powergrid/settings/powergrid_config.json")
+        first = PlantDeck(config)
+        second = PlantDeck(config)
+
+        assert all(a is b for a, b in zip(first.deck, second.deck))
+        assert first.step3_card is second.step3_card
+
+        plant = first.deck[0]
+        assert plant == Plant(plant.get_value(), ResourceType.COAL, 0, 0)
+        assert hash(plant) == hash(plant.get_value())
+
+        try:
+            plant.value = 0
+            assert False
+        except AttributeError:
+            pass
+
+    def test_sorted_insert_and_views(self):
+
+        market = PlantMarket()
+        actual = market.get_actual_market()
+
+        for value in [10, 4, 7, 3, 9, 5, 8, 6]:
+            market.add_plant_to_market(Plant(value, ResourceType.OIL, 2, 1))
+
+        assert [p.get_value() for p in market.market] == list(range(3, 11))
+        assert market.layout()
+
+        # The views follow the market without being rebuilt
+        assert actual is market.get_actual_market()
+        assert actual[-1].get_value() == 6
+        assert [p.get_value() for p in market.get_future_market()[1:3]] == [8, 9]
+
+        market.auction_plant(Plant(6, ResourceType.OIL, 2, 1))
+        assert actual[-1].get_value() == 7
+
+        try:
+            market.auction_plant(Plant(6, ResourceType.OIL, 2, 1))
+            assert False
+        except ValueError:
+            pass
+
+        # Only plants of the actual market are removed
+        assert market.remove_plants_below_value(20) == 4
+        assert [p.get_value() for p in actual] == [8, 9, 10]
+        assert len(market.get_future_market()) == 0
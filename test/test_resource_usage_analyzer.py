@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from analysis.resource_usage_analyzer import results_to_arrays, parse_result
+
+
+class TestResourceUsageAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+
+        self.report = {
+            "Players": 3,
+            "Seed": 7,
+            "Results": {
+                "0": {
+                    "0": {"0": 24, "1": 18, "2": 6, "3": 2},
+                    "1": {"0": 20, "1": 16, "2": 6, "3": 2}
+                },
+                "1": {
+                    "0": {"0": 22, "1": 14, "2": 4, "3": 0}
+                }
+            }
+        }
+
+    def test_forward_fill(self):
+
+        usage, rounds = results_to_arrays(self.report["Results"])
+
+        self.assertEqual(usage.shape, (2, 2, 4))
+        self.assertEqual(rounds.tolist(), [2, 1])
+        self.assertEqual(usage[0, 1].tolist(), [20, 16, 6, 2])
+
+        # The short game repeats its last round
+        self.assertEqual(usage[1, 1].tolist(), [22, 14, 4, 0])
+
+    def test_statistics(self):
+
+        num_players, plot_data = parse_result(self.report)
+
+        self.assertEqual(num_players, 3)
+        self.assertEqual(plot_data["rounds"], [0, 1])
+        self.assertEqual(plot_data["coal"], [23.0, 21.0])
+        self.assertEqual(plot_data["coal_error"], [1.0, 1.0])
+        self.assertEqual(plot_data["oil_p50"], [16.0, 15.0])
+        self.assertTrue(np.allclose(plot_data["uranium"], [1.0, 1.0]))
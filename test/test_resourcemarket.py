@@ -1,13 +1,13 @@
 import unittest
 from nose import with_setup
-from powergrid import ResourcePool, ResourceType, ResourceMarket
+from powergrid import ResourcePool, ResourceType, ResourceMarket, GameConfig
 
 class TestResourceMarket(unittest.TestCase):
 
 
     def setUp(self):
         self.market = ResourceMarket(
-            resource_settings="../powergrid/settings/initial_resources.json")
+            GameConfig("../powergrid/settings/powergrid_config.json"))
 
         self.replenish_rates = {
             ResourceType.COAL: 3,
@@ -100,3 +100,73 @@ class TestResourceMarket(unittest.TestCase):
 
             for resource, available in pool.items():
                 self.assertGreaterEqual(available, 0)
+
+
+    def test_cheapest_hybrid_purchase(self):
+
+        # Make oil cheaper than coal at the margin
+        self.market.buy(ResourceType.COAL, 10)
+
+        for required_fuel in range(0, 8):
+
+            purchase, cost = self.market.cheapest_hybrid_purchase(required_fuel)
+
+            # Compare against every possible coal/oil split
+            best = min(
+                self.market.calculate_cost(ResourceType.COAL, coal) +
+                self.market.calculate_cost(ResourceType.OIL, required_fuel - coal)
+                for coal in range(required_fuel + 1))
+
+            self.assertEqual(cost, best)
+            self.assertEqual(purchase[ResourceType.COAL] + purchase[ResourceType.OIL], required_fuel)
+            self.assertEqual(self.market.calculate_cost_dict(purchase), cost)
+
+    def test_cheapest_hybrid_purchase_not_enough_fuel(self):
+
+        self.market.buy(ResourceType.COAL, 23)
+        self.market.buy(ResourceType.OIL, 17)
+
+        purchase, cost = self.market.cheapest_hybrid_purchase(3)
+        self.assertIsNone(purchase)
+        self.assertEqual(cost, -1)
+
+        purchase, cost = self.market.cheapest_hybrid_purchase(2)
+        self.assertEqual(purchase.to_dict(), {
+            ResourceType.COAL: 1,
+            ResourceType.OIL: 1,
+            ResourceType.TRASH: 0,
+            ResourceType.URANIUM: 0
+        })
+
+    def test_cheapest_purchase(self):
+
+        self.market.buy(ResourceType.COAL, 12)
+
+        demand = {
+            ResourceType.COAL: 2,
+            ResourceType.OIL: 3,
+            ResourceType.URANIUM: 1,
+            ResourceType.HYBRID: 4
+        }
+
+        purchase, hybrid_mix, cost = self.market.cheapest_purchase(demand)
+
+        # Compare against every possible split of the hybrid demand
+        best = min(
+            self.market.calculate_cost_dict({
+                ResourceType.COAL: 2 + coal,
+                ResourceType.OIL: 3 + 4 - coal,
+                ResourceType.URANIUM: 1
+            })
+            for coal in range(5))
+
+        self.assertEqual(cost, best)
+        self.assertEqual(self.market.calculate_cost_dict(purchase), cost)
+        self.assertEqual(hybrid_mix[ResourceType.COAL] + hybrid_mix[ResourceType.OIL], 4)
+        self.assertEqual(purchase[ResourceType.COAL], 2 + hybrid_mix[ResourceType.COAL])
+        self.assertEqual(purchase[ResourceType.TRASH], 0)
+
+        # Uranium is short, so nothing can be bought
+        purchase, hybrid_mix, cost = self.market.cheapest_purchase({ResourceType.URANIUM: 3})
+        self.assertIsNone(purchase)
+        self.assertEqual(cost, -1)
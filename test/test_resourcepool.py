@@ -30,3 +30,46 @@ class TestResourcePool(object):
         # Since we didn't fully replenish, expect prices to go up
         assert oil.calculate_cost(3) == 10
         assert oil.calculate_cost(4) == 14
+
+    def test_uranium_pool(self):
+
+        uranium = ResourcePool(ResourceType.URANIUM, 12, 2)
+
+        # The last two slots are the most expensive ones
+        assert uranium.calculate_cost(1) == 14
+        assert uranium.calculate_cost(2) == 30
+
+        # Can't buy more than what is there
+        assert uranium.calculate_cost(3) == -1
+        assert not uranium.buy(3)
+        assert uranium.get_available_resources() == 2
+
+        # Replenishing never goes beyond the size of the track
+        uranium.replenish(20)
+        assert uranium.get_available_resources() == 12
+
+    def test_buy_nothing(self):
+
+        coal = ResourcePool(ResourceType.COAL, 24, 24)
+
+        # Buying nothing is free and leaves the pool alone
+        assert coal.calculate_cost(0) == 0
+        assert coal.buy(0)
+        assert coal.get_available_resources() == 24
+
+    def test_custom_prices(self):
+
+        trash = ResourcePool(ResourceType.TRASH, 4, 3, prices=[1, 2, 4, 8])
+
+        assert trash.calculate_cost(1) == 2
+        assert trash.calculate_cost(3) == 14
+
+        trash.buy(2)
+        assert trash.calculate_cost(1) == 8
+
+        # Every slot needs a price
+        try:
+            ResourcePool(ResourceType.TRASH, 4, 3, prices=[1, 2])
+            assert False
+        except ValueError:
+            pass
@@ -0,0 +1,37 @@
+import unittest
+from powergrid import ResourceType, ResourceVector
+
+class TestResourceVector(unittest.TestCase):
+
+    def test_indexing(self):
+
+        vector = ResourceVector({ResourceType.OIL: 2, ResourceType.HYBRID: 3})
+
+        self.assertEqual(vector[ResourceType.OIL], 2)
+        self.assertEqual(vector[int(ResourceType.HYBRID)], 3)
+        self.assertEqual(vector.get(ResourceType.COAL), 0)
+        self.assertEqual(list(vector.items()), [(1, 2), (5, 3)])
+
+    def test_add_and_copy(self):
+
+        vector = ResourceVector({ResourceType.COAL: 1})
+        copy = vector.copy()
+        copy.add(ResourceVector({ResourceType.COAL: 2, ResourceType.TRASH: 1}))
+
+        self.assertIsInstance(copy, ResourceVector)
+        self.assertEqual(vector[ResourceType.COAL], 1)
+        self.assertEqual(copy[ResourceType.COAL], 3)
+
+        copy.clear()
+        self.assertEqual(list(copy.items()), [])
+
+    def test_to_dict(self):
+
+        vector = ResourceVector({ResourceType.URANIUM: 4})
+
+        self.assertEqual(vector.to_dict(), {
+            ResourceType.COAL: 0,
+            ResourceType.OIL: 0,
+            ResourceType.TRASH: 0,
+            ResourceType.URANIUM: 4
+        })
@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from simulation.result_writers import JsonResultWriter, NdjsonResultWriter, NpyResultWriter
+from simulation.checkpoint import Checkpoint, load_checkpoint, settings_digest
+
+class TestResultWriters(unittest.TestCase):
+
+    def setUp(self):
+        self.results_path = tempfile.mkdtemp()
+        self.results = [
+            {0: {0: 24, 1: 18, 2: 6, 3: 2}, 1: {0: 21, 1: 16, 2: 6, 3: 2}},
+            {0: {0: 24, 1: 18, 2: 6, 3: 2}}
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.results_path)
+
+    def test_json_writer(self):
+
+        writer = JsonResultWriter(self.results_path, 3, 7)
+        for sim_number, results in enumerate(self.results):
+            writer.write(sim_number, results)
+        writer.close()
+
+        with open(os.path.join(self.results_path, "3_player_usage.json"), 'r') as f:
+            report = json.loads(f.read())
+
+        self.assertEqual(report["Players"], 3)
+        self.assertEqual(report["Seed"], 7)
+        self.assertEqual(report["Results"]["0"]["1"]["1"], 16)
+
+    def test_ndjson_writer_streams_records(self):
+
+        writer = NdjsonResultWriter(self.results_path, 3, 7, flush_every=1)
+        writer.write(0, self.results[0])
+
+        # The first record is on disk before the writer is closed
+        report_file = os.path.join(self.results_path, "3_player_usage.ndjson")
+        with open(report_file, 'r') as f:
+            lines = f.readlines()
+
+        self.assertEqual(len(lines), 1)
+
+        writer.write(1, self.results[1])
+        writer.close()
+
+        with open(report_file, 'r') as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual([r["Simulation"] for r in records], [0, 1])
+        self.assertEqual(records[0]["Results"]["1"]["0"], 21)
+        self.assertEqual(records[1]["Seed"], 7)
+
+    def test_npy_writer(self):
+
+        writer = NpyResultWriter(self.results_path, 3, 7)
+        for sim_number, results in enumerate(self.results):
+            writer.write(sim_number, results)
+        writer.close()
+
+        usage = np.load(os.path.join(self.results_path, "3_player_usage.npy"), mmap_mode='r')
+        rounds = np.load(os.path.join(self.results_path, "3_player_rounds.npy"))
+
+        with open(os.path.join(self.results_path, "3_player_meta.json"), 'r') as f:
+            meta = json.loads(f.read())
+
+        self.assertEqual(usage.shape, (2, 2, 4))
+        self.assertEqual(rounds.tolist(), [2, 1])
+        self.assertEqual(meta["Seed"], 7)
+        self.assertEqual(meta["Resources"], [0, 1, 2, 3])
+
+        self.assertEqual(usage[0, 1].tolist(), [21, 16, 6, 2])
+
+        # The short game repeats its last round
+        self.assertEqual(usage[1, 1].tolist(), [24, 18, 6, 2])
+
+        # The rounds were streamed to a scratch file, which is gone
+        self.assertFalse(os.path.exists(os.path.join(self.results_path, "3_player_usage.rows")))
+
+    def test_npy_writer_without_games(self):
+
+        NpyResultWriter(self.results_path, 3, 7).close()
+
+        usage = np.load(os.path.join(self.results_path, "3_player_usage.npy"))
+        self.assertEqual(usage.shape, (0, 0, 4))
+
+    def test_ndjson_writer_resumes_at_checkpoint(self):
+
+        writer = NdjsonResultWriter(self.results_path, 3, 7)
+        writer.write(0, self.results[0])
+        state = writer.checkpoint()
+
+        # Written after the checkpoint, then the run dies
+        writer.write(1, self.results[1])
+        writer.close()
+
+        writer = NdjsonResultWriter(self.results_path, 3, 7, resume=state)
+        writer.write(1, self.results[1])
+        writer.close()
+
+        with open(os.path.join(self.results_path, "3_player_usage.ndjson"), 'r') as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual([r["Simulation"] for r in records], [0, 1])
+
+    def test_json_writer_replays_journal(self):
+
+        uninterrupted = JsonResultWriter(self.results_path, 3, 7)
+        for sim_number, results in enumerate(self.results):
+            uninterrupted.write(sim_number, results)
+        uninterrupted.close()
+
+        report_file = os.path.join(self.results_path, "3_player_usage.json")
+        with open(report_file, 'r') as f:
+            expected = f.read()
+        os.remove(report_file)
+
+        writer = JsonResultWriter(self.results_path, 3, 7, journal=True)
+        writer.write(0, self.results[0])
+        state = writer.checkpoint()
+        writer.write(1, self.results[1])
+
+        # Never closed, like a killed run
+        writer = JsonResultWriter(self.results_path, 3, 7, resume=state)
+        writer.write(1, self.results[1])
+        writer.close()
+
+        with open(report_file, 'r') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_checkpoint_keeps_engine_and_settings(self):
+
+        config_file = os.path.join(self.results_path, "config.json")
+        settings_file = os.path.join(self.results_path, "settings.json")
+        with open(config_file, 'w') as f:
+            f.write(json.dumps({"MainSettings": "settings.json"}))
+        with open(settings_file, 'w') as f:
+            f.write("{}")
+
+        digest = settings_digest(config_file)
+        Checkpoint(self.results_path, 7, 10, "ndjson", "auction", config_file, digest).save()
+
+        checkpoint = load_checkpoint(self.results_path)
+        self.assertEqual(checkpoint.engine, "auction")
+        self.assertEqual(checkpoint.config_file, config_file)
+        self.assertEqual(checkpoint.config_digest, digest)
+
+        # Editing a file the config points to changes the digest
+        with open(settings_file, 'w') as f:
+            f.write('{"3": {}}')
+        self.assertNotEqual(settings_digest(config_file), digest)
+
+    def test_checkpoint_keeps_event_offset(self):
+
+        checkpoint = Checkpoint(self.results_path, 7, 10, "ndjson")
+        checkpoint.update(3, 4, {"Offset": 120}, 512)
+        checkpoint.update(4, 2, {"Offset": 60})
+
+        checkpoint = load_checkpoint(self.results_path)
+        self.assertEqual(checkpoint.done(3), 4)
+        self.assertEqual(checkpoint.events_offset(3), 512)
+        self.assertIsNone(checkpoint.events_offset(4))
+        self.assertIsNone(checkpoint.events_offset(5))
@@ -0,0 +1,82 @@
+import unittest
+from powergrid import GameConfig, PlayerBoard, ResourceType
+from powergrid.powergrid_utils import spawn_rng
+from simulation import NaiveResourceAnalysisSim
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def play_round(self, sim, first_turn=False):
+        sim.phase_1(first_turn)
+        sim.phase_2()
+        sim.phase_3()
+        sim.phase_4()
+        sim.phase_5()
+
+    def state(self, sim):
+        """
+        Everything a snapshot should bring back, in plain containers
+        """
+        return (
+            list(sim.plant_deck.deck),
+            list(sim.plant_market.market),
+            list(sim.resource_market.get_market_resources()),
+            list(sim.resource_market.get_available_pool()),
+            [(player.get_id(), list(player.get_plants()), len(player.get_cities()),
+              dict(player.get_resources_on_plants()), dict(player.usage_plan)) for player in sim.players],
+            sim.current_step
+        )
+
+    def test_restore_mid_game(self):
+
+        sim = NaiveResourceAnalysisSim(4, self.config, spawn_rng(6, 4, 0))
+        self.play_round(sim, first_turn=True)
+        self.play_round(sim)
+
+        before = self.state(sim)
+        snapshot = sim.snapshot()
+
+        # Play on, then come back, twice
+        for _ in range(2):
+            for _ in range(3):
+                self.play_round(sim)
+
+            self.assertNotEqual(self.state(sim), before)
+
+            sim.restore(snapshot)
+            self.assertEqual(self.state(sim), before)
+
+    def test_restore_with_rng_replays_the_game(self):
+
+        sim = NaiveResourceAnalysisSim(5, self.config, spawn_rng(2, 5, 0))
+        snapshot = sim.snapshot(rng=True)
+
+        first = sim.simulate()
+        end = self.state(sim)
+
+        sim.restore(snapshot)
+        self.assertEqual(sim.simulate(), first)
+        self.assertEqual(self.state(sim), end)
+
+    def test_player_board_restore_keeps_copies(self):
+
+        board = PlayerBoard(3, 1)
+        plant = self.config.plants[0]
+        board.add_plant(plant)
+        board.add_resources_to_plant(plant, ResourceType.OIL, 2)
+
+        snapshot = board.snapshot()
+
+        board.add_resources_to_plant(plant, ResourceType.OIL, 1)
+        board.restore(snapshot)
+        self.assertEqual(board.get_resources_on_plants()[plant][ResourceType.OIL], 2)
+
+        # Changing the restored board doesn't change the snapshot
+        board.add_resources_to_plant(plant, ResourceType.OIL, 5)
+        board.restore(snapshot)
+        self.assertEqual(board.get_resources_on_plants()[plant][ResourceType.OIL], 2)
@@ -0,0 +1,108 @@
+import unittest
+from powergrid import GameConfig
+from powergrid.powergrid_utils import spawn_rng, stream_seed
+from simulation import NaiveResourceAnalysisSim, AuctionResourceAnalysisSim
+from simulation.state_hash import StateHasher, TranspositionTable, state_hash
+
+class TestStateHash(unittest.TestCase):
+
+    def setUp(self):
+        self.config = GameConfig("../powergrid/settings/powergrid_config.json")
+
+    def tearDown(self):
+        pass
+
+    def test_incremental_hash_matches_full_hash(self):
+        self.check_incremental_hash(NaiveResourceAnalysisSim)
+
+    def test_incremental_hash_tracks_money(self):
+        self.check_incremental_hash(AuctionResourceAnalysisSim)
+
+        # States that only differ in Elektro hash differently
+        sim = AuctionResourceAnalysisSim(3, self.config, spawn_rng(4, 3, 0))
+        hasher = StateHasher()
+        hasher.attach(sim)
+
+        before = hasher.value()
+        sim.players[0].earn_elektro(5)
+        self.assertNotEqual(hasher.value(), before)
+        self.assertEqual(hasher.value(), state_hash(sim, hasher.seats))
+
+        # A payment that doesn't go through changes nothing
+        paid = hasher.value()
+        self.assertFalse(sim.players[0].spend_elektro(1000))
+        self.assertEqual(hasher.value(), paid)
+
+        self.assertTrue(sim.players[0].spend_elektro(5))
+        self.assertEqual(hasher.value(), before)
+
+    def check_incremental_hash(self, sim_class):
+
+        for num_players in range(2, 7):
+
+            sim = sim_class(num_players, self.config, spawn_rng(4, num_players, 0))
+            hasher = StateHasher()
+            hasher.attach(sim)
+
+            for game in range(3):
+
+                sim.reset(stream_seed(4, num_players, game))
+                self.assertEqual(hasher.value(), state_hash(sim, hasher.seats))
+
+                for round in range(40):
+
+                    sim.phase_1(round == 0)
+                    self.assertEqual(hasher.value(), state_hash(sim, hasher.seats))
+
+                    for phase in (sim.phase_2, sim.phase_3, sim.phase_4, sim.phase_5):
+                        phase()
+                        self.assertEqual(hasher.value(), state_hash(sim, hasher.seats))
+
+                    if sim.check_game_end():
+                        break
+
+    def test_restore_gives_the_same_hash(self):
+
+        sim = NaiveResourceAnalysisSim(4, self.config, spawn_rng(9, 4, 0))
+        hasher = StateHasher()
+        hasher.attach(sim)
+
+        sim.phase_1(True)
+        sim.phase_2()
+
+        snapshot = sim.snapshot()
+        before = hasher.value()
+
+        sim.phase_3()
+        sim.phase_4()
+        self.assertNotEqual(hasher.value(), before)
+
+        sim.restore(snapshot)
+        self.assertEqual(hasher.value(), before)
+
+    def test_detach_restores_methods(self):
+
+        sim = NaiveResourceAnalysisSim(3, self.config, spawn_rng(9, 3, 0))
+        hasher = StateHasher()
+        hasher.attach(sim)
+        hasher.detach()
+
+        self.assertNotIn("buy", sim.resource_market.market[0].__dict__)
+        self.assertNotIn("draw", sim.plant_deck.__dict__)
+        self.assertNotIn("phase_1", sim.__dict__)
+
+    def test_transposition_table_is_lru(self):
+
+        table = TranspositionTable(capacity=2)
+        table.put(1, "a")
+        table.put(2, "b")
+
+        # Using 1 makes 2 the oldest entry
+        self.assertEqual(table.get(1), "a")
+        table.put(3, "c")
+
+        self.assertIn(1, table)
+        self.assertNotIn(2, table)
+        self.assertEqual(len(table), 2)
+        self.assertIsNone(table.get(2))
+        self.assertEqual((table.hits, table.misses), (1, 1))